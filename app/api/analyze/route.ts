@@ -2,6 +2,7 @@ import { NextRequest, NextResponse } from 'next/server'
 import { spawn } from 'child_process'
 import path from 'path'
 import fs from 'fs'
+import { extractMetrics, reportMetrics } from '@/lib/metrics'
 
 const SYSTEM_PROMPT = `You are an expert legal transcript analyzer specializing in criminal defense contexts. You analyze recorded evidence including police body cam footage, suspect interviews, witness interviews, and jailhouse recordings. Your task is to produce an informational analysis to help criminal defense attorneys quickly understand the content. You do not provide legal advice, strategy, or opinions on guilt/innocence—only factual observations, summaries, and organizational details.
 
@@ -57,24 +58,42 @@ const ANALYSIS_TYPE_PROMPTS: Record<AnalysisType, string> = {
   speakers: `Additionally, analyze power dynamics between speakers. Identify any instances of leading questions, persistent questioning loops, or intimidation tactics. Note if any speaker significantly alters their statement after pressure. Do not interpret motivations—only report factual observations with exact timestamps.`
 }
 
+function typePrompt(analysisType?: string) {
+  return analysisType && (analysisType in ANALYSIS_TYPE_PROMPTS)
+    ? ANALYSIS_TYPE_PROMPTS[analysisType as AnalysisType]
+    : ''
+}
+
 export async function POST(request: NextRequest) {
   try {
-    const { transcript, analysisType } = await request.json()
+    const { transcript, analysisType, analysisTypes, bypassCache } = await request.json()
 
     if (!transcript) {
       return NextResponse.json({ error: 'No transcript provided' }, { status: 400 })
     }
 
+    if (analysisTypes !== undefined && (!Array.isArray(analysisTypes) || analysisTypes.length === 0)) {
+      return NextResponse.json({ error: 'analysisTypes must be a non-empty array' }, { status: 400 })
+    }
+
     // Create a temporary file to store the analysis data
     const tempDataPath = path.join(process.cwd(), 'public', 'uploads', `${Date.now()}-analysis-data.json`)
     fs.writeFileSync(tempDataPath, JSON.stringify({
       transcript,
-      analysis_type: analysisType,
       system_prompt: SYSTEM_PROMPT,
       base_prompt: BASE_PROMPT,
-      type_prompt: analysisType && (analysisType in ANALYSIS_TYPE_PROMPTS) 
-        ? ANALYSIS_TYPE_PROMPTS[analysisType as AnalysisType] 
-        : ''
+      bypass_cache: Boolean(bypassCache),  // Force a fresh analysis instead of a cached one
+      ...(analysisTypes
+        // Several types in one run: results come back keyed by type ('base' for no type)
+        ? {
+            type_prompts: Object.fromEntries(
+              analysisTypes.map((type: string) => [type, typePrompt(type)])
+            )
+          }
+        : {
+            analysis_type: analysisType,
+            type_prompt: typePrompt(analysisType)
+          })
     }))
 
     // Run the Python script for analysis
@@ -103,9 +122,12 @@ export async function POST(request: NextRequest) {
     // Clean up temporary file
     fs.unlinkSync(tempDataPath)
 
+    const { metrics, log } = extractMetrics(errorData)
+    reportMetrics('analyze', metrics)
+
     if (exitCode !== 0) {
-      console.error('Python script failed:', errorData)
-      throw new Error(`Python script failed with error: ${errorData}`)
+      console.error('Python script failed:', log)
+      throw new Error(`Python script failed with error: ${log}`)
     }
 
     try {
@@ -0,0 +1,373 @@
+import asyncio
+import copy
+import hashlib
+import json
+import logging
+import os
+from typing import Any, Dict, List, Optional, Tuple
+from common import http, metrics
+from common.disk_cache import DiskCache
+from common.paths import data_path
+from knowledge.chunking import CHUNK_TOKENS, CHUNKER_VERSION, OVERLAP_TOKENS, chunk_transcript
+from knowledge.tokens import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# Transcripts whose context exceeds this many tokens are analyzed with map-reduce
+MAP_REDUCE_THRESHOLD_TOKENS = int(os.environ.get('ANALYSIS_MAP_REDUCE_THRESHOLD_TOKENS', '24000'))
+# Size of each window sent to the model in the map step
+MAP_WINDOW_TOKENS = int(os.environ.get('ANALYSIS_MAP_WINDOW_TOKENS', '12000'))
+# Windows analyzed at the same time
+MAP_CONCURRENCY = int(os.environ.get('ANALYSIS_MAP_CONCURRENCY', '8'))
+# Analysis types run at the same time by analyze_many
+ANALYSIS_TYPE_CONCURRENCY = int(os.environ.get('ANALYSIS_TYPE_CONCURRENCY', '4'))
+# Attempts per window before the analysis fails
+MAP_ATTEMPTS = 2
+# Free-text fields combined by the reduce call instead of being concatenated
+NARRATIVE_KEYS = ("RecordingName", "Description", "Summary")
+
+ANALYSIS_MODEL = "openai/gpt-4-turbo-preview"
+ANALYSIS_TEMPERATURE = 0.3
+ANALYSIS_MAX_TOKENS = 4000
+ANALYSIS_TIMEOUT = http.endpoint_timeout(60.0)
+# Finished analyses are reused for identical requests within the TTL
+ANALYSIS_CACHE_TTL_HOURS = float(os.environ.get('ANALYSIS_CACHE_TTL_HOURS', '168'))
+ANALYSIS_CACHE_MAX_MB = int(os.environ.get('ANALYSIS_CACHE_MAX_MB', '64'))
+
+class AnalysisService:
+    def __init__(self):
+        self.openrouter_api_key = os.environ.get('OPENROUTER_API_KEY')
+        if not self.openrouter_api_key:
+            raise ValueError("OPENROUTER_API_KEY environment variable is not set")
+        
+        # Finished analyses by request, so reruns skip the LLM
+        self.result_cache = DiskCache(
+            data_path('analysis_cache.sqlite3'),
+            max_bytes=ANALYSIS_CACHE_MAX_MB * 1024 * 1024,
+            ttl=ANALYSIS_CACHE_TTL_HOURS * 3600
+        )
+        
+        # Headers for OpenRouter API
+        self.headers = {
+            "Authorization": f"Bearer {self.openrouter_api_key}",
+            "HTTP-Referer": os.environ.get('SITE_URL', 'http://localhost:3000'),
+            "X-Title": os.environ.get('SITE_NAME', 'Law Transcribe'),
+            "Content-Type": "application/json"
+        }
+
+    async def analyze_transcript(self, transcript: str, system_prompt: str, base_prompt: str, type_prompt: str = "", use_cache: bool = True) -> dict:
+        """
+        Analyze transcript using RAG with OpenRouter
+
+        Args:
+            use_cache: Return a stored result for an identical earlier request
+                if there is one; a fresh result is stored either way
+        """
+        try:
+            cache_key = analysis_cache_key(transcript, system_prompt, base_prompt, type_prompt)
+            if use_cache:
+                cached = self._cached_result(cache_key)
+                if cached is not None:
+                    logger.info(f"Returning cached analysis {cache_key[:12]}")
+                    return cached
+            
+            chunks = self._prepare_context(transcript)
+            return await self._analyze_chunks(chunks, system_prompt, base_prompt, type_prompt, cache_key, asyncio.Semaphore(MAP_CONCURRENCY))
+                
+        except Exception as e:
+            logger.error(f"Error in analysis: {str(e)}")
+            raise
+
+    async def analyze_many(self, transcript: str, system_prompt: str, base_prompt: str, type_prompts: Dict[str, str], use_cache: bool = True) -> Dict[str, dict]:
+        """
+        Run several analysis types against one transcript
+
+        The transcript is chunked and indexed once, and the analyses run
+        concurrently, at most ANALYSIS_TYPE_CONCURRENCY at a time, so the
+        total time is close to that of the slowest one.
+
+        Args:
+            type_prompts: Type prompt of each analysis, by analysis name
+            use_cache: Return stored results for identical earlier requests
+
+        Returns:
+            Results by analysis name, shaped like analyze_transcript's;
+            an analysis that failed maps to {"error": message}
+        """
+        cache_keys = {
+            name: analysis_cache_key(transcript, system_prompt, base_prompt, type_prompt)
+            for name, type_prompt in type_prompts.items()
+        }
+        results: Dict[str, dict] = {}
+        if use_cache:
+            for name, cache_key in cache_keys.items():
+                cached = self._cached_result(cache_key)
+                if cached is not None:
+                    results[name] = cached
+        pending = [name for name in type_prompts if name not in results]
+        logger.info(f"Analyses requested: {len(type_prompts)}, cached: {len(results)}, to run: {len(pending)}")
+        if not pending:
+            return results
+        
+        chunks = self._prepare_context(transcript)
+        type_slots = asyncio.Semaphore(ANALYSIS_TYPE_CONCURRENCY)
+        # Windows of every map-reduce analysis share one limit on in-flight calls
+        window_slots = asyncio.Semaphore(MAP_CONCURRENCY)
+        
+        async def run(name: str) -> dict:
+            async with type_slots:
+                logger.info(f"Running analysis: {name or 'base'}")
+                return await self._analyze_chunks(chunks, system_prompt, base_prompt, type_prompts[name], cache_keys[name], window_slots)
+        
+        outcomes = await asyncio.gather(*(run(name) for name in pending), return_exceptions=True)
+        
+        for name, outcome in zip(pending, outcomes):
+            if isinstance(outcome, Exception):
+                logger.error(f"Analysis {name or 'base'} failed: {str(outcome)}")
+                results[name] = {"error": str(outcome)}
+            else:
+                results[name] = outcome
+        return {name: results[name] for name in type_prompts}
+
+    def _prepare_context(self, transcript: str) -> List[str]:
+        """
+        Split the transcript into the chunks the analysis prompts are built from
+
+        Analysis reads every chunk in order and never searches them, so the
+        chunks are not embedded or stored in ChromaDB.
+        """
+        with metrics.span('chunking') as timed:
+            chunks = [chunk.text for chunk in chunk_transcript(transcript)]
+            timed.add(chunks=len(chunks), chars=len(transcript))
+        if not chunks:
+            raise Exception("No chunks found in transcript")
+        logger.info(f"Prepared {len(chunks)} chunks for analysis")
+        return chunks
+
+    async def _analyze_chunks(self, chunks: List[str], system_prompt: str, base_prompt: str, type_prompt: str,
+                              cache_key: str, window_slots: asyncio.Semaphore) -> dict:
+        """
+        Analyze prepared transcript chunks with one type prompt and store the result
+        """
+        context = "\n\n".join(chunks)
+        
+        # Transcripts beyond the threshold are analyzed piecewise and merged
+        if estimate_tokens(context) > MAP_REDUCE_THRESHOLD_TOKENS:
+            content, finish_reason = await self._map_reduce(chunks, system_prompt, base_prompt, type_prompt, window_slots)
+        else:
+            content, finish_reason = await self._complete_json(
+                self._analysis_messages(system_prompt, base_prompt, type_prompt, context)
+            )
+
+        # Return the raw content directly
+        formatted_response = {
+            "choices": [{
+                "message": {
+                    "content": content
+                },
+                "finish_reason": finish_reason
+            }]
+        }
+
+        # Log a preview; complete analyses can run to many kilobytes
+        logger.info(f"Formatted Response: {metrics.preview(formatted_response)}")
+
+        # Truncated output is not worth repeating, so only complete results are kept
+        if finish_reason == 'stop':
+            self._store_result(cache_key, formatted_response)
+        formatted_response["metadata"] = {"cached": False}
+        return formatted_response
+
+    def _cached_result(self, cache_key: str) -> Optional[dict]:
+        try:
+            value = self.result_cache.get(cache_key)
+        except Exception as e:
+            logger.error(f"Error reading analysis cache: {str(e)}")
+            return None
+        if value is None:
+            return None
+        result = json.loads(value)
+        result["metadata"] = {"cached": True}
+        return result
+
+    def _store_result(self, cache_key: str, result: dict):
+        try:
+            self.result_cache.set(cache_key, json.dumps(result).encode('utf-8'))
+        except Exception as e:
+            logger.error(f"Error writing analysis cache: {str(e)}")
+
+    def _analysis_messages(self, system_prompt: str, base_prompt: str, type_prompt: str, context: str, part_note: str = "") -> List[Dict[str, str]]:
+        """
+        Build the chat messages for analyzing a piece of transcript context
+        """
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": f"{base_prompt}\n\n{type_prompt}\n\n{part_note}Transcript Context:\n{context}\n\nImportant: Base your response ONLY on the exact content provided in the context. If you're mentioning specific quotes or timestamps, they MUST be present in the provided context. Do not make assumptions or fill in missing information."}
+        ]
+
+    async def _complete_json(self, messages: List[Dict[str, str]], max_tokens: int = ANALYSIS_MAX_TOKENS) -> Tuple[Dict[str, Any], str]:
+        """
+        Send messages to OpenRouter and parse the JSON object it returns
+
+        Returns:
+            The parsed content and the finish reason
+        """
+        logger.info("Sending request to OpenRouter API")
+        
+        # Make request to OpenRouter API
+        with metrics.span('llm', purpose='analysis') as timed:
+            response = await http.request(
+                "POST",
+                "https://openrouter.ai/api/v1/chat/completions",
+                headers=self.headers,
+                json={
+                    "model": ANALYSIS_MODEL,
+                    "messages": messages,
+                    "temperature": ANALYSIS_TEMPERATURE,
+                    "max_tokens": max_tokens,
+                    "response_format": { "type": "json_object" }
+                },
+                timeout=ANALYSIS_TIMEOUT
+            )
+                
+            if response.status_code != 200:
+                raise Exception(f"OpenRouter API error: {metrics.preview(response.text)}")
+            
+            result = response.json()
+            timed.add(**metrics.token_usage(result))
+        
+        # Get the raw content from the API response
+        raw_content = result['choices'][0]['message']['content']
+        
+        # Log a preview of the raw response
+        logger.info(f"Raw API Response: {metrics.preview(raw_content)}")
+        
+        # Parse the content if it's a string
+        try:
+            content = json.loads(raw_content) if isinstance(raw_content, str) else raw_content
+        except json.JSONDecodeError as e:
+            logger.error(f"Failed to parse API response content: {e}")
+            raise Exception("Invalid response format from API")
+
+        return content, result['choices'][0].get('finish_reason', 'stop')
+
+    async def _map_reduce(self, chunks: List[str], system_prompt: str, base_prompt: str, type_prompt: str,
+                          semaphore: asyncio.Semaphore) -> Tuple[Dict[str, Any], str]:
+        """
+        Analyze a long transcript window by window with bounded parallelism,
+        then merge the partial results into one analysis
+
+        Args:
+            semaphore: Limits the window calls in flight
+        """
+        windows = self._group_chunks(chunks, MAP_WINDOW_TOKENS)
+        logger.info(f"Analyzing transcript in {len(windows)} windows with up to {MAP_CONCURRENCY} in flight")
+
+        async def analyze_window(index: int, window: str) -> Dict[str, Any]:
+            part_note = (
+                f"This is part {index + 1} of {len(windows)} of a longer transcript, in chronological order. "
+                "Analyze only this part; the parts will be merged afterwards.\n\n"
+            )
+            messages = self._analysis_messages(system_prompt, base_prompt, type_prompt, window, part_note)
+            async with semaphore:
+                for attempt in range(MAP_ATTEMPTS):
+                    try:
+                        content, _ = await self._complete_json(messages)
+                        return content
+                    except Exception as e:
+                        if attempt + 1 == MAP_ATTEMPTS:
+                            raise
+                        logger.warning(f"Window {index + 1} failed, retrying: {str(e)}")
+
+        partials = await asyncio.gather(*(analyze_window(i, window) for i, window in enumerate(windows)))
+        merged = merge_partial_analyses(partials)
+
+        # Narrative fields can't be concatenated sensibly, so condense them in one small call
+        narrative = {key: [p[key] for p in partials if isinstance(p.get(key), str) and p[key]] for key in NARRATIVE_KEYS}
+        narrative = {key: values for key, values in narrative.items() if values}
+        if narrative:
+            messages = [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": "The following fields were produced for consecutive parts of one transcript, in order. Combine each field into a single value covering the whole transcript. Respond with a JSON object using the same keys, and do not add information that is not present.\n\n" + json.dumps(narrative, indent=2)}
+            ]
+            try:
+                combined, _ = await self._complete_json(messages)
+                merged.update({key: combined[key] for key in narrative if isinstance(combined.get(key), str)})
+            except Exception as e:
+                logger.error(f"Failed to combine narrative fields, joining them instead: {str(e)}")
+
+        return merged, "stop"
+
+    @staticmethod
+    def _group_chunks(chunks: List[str], max_tokens: int) -> List[str]:
+        """
+        Group consecutive chunks into windows of at most max_tokens each
+        """
+        windows = []
+        current = []
+        current_tokens = 0
+        for chunk in chunks:
+            chunk_tokens = estimate_tokens(chunk)
+            if current and current_tokens + chunk_tokens > max_tokens:
+                windows.append("\n\n".join(current))
+                current = []
+                current_tokens = 0
+            current.append(chunk)
+            current_tokens += chunk_tokens
+        if current:
+            windows.append("\n\n".join(current))
+        return windows
+
+def analysis_cache_key(transcript: str, system_prompt: str, base_prompt: str, type_prompt: str) -> str:
+    """
+    Key an analysis by its inputs together with every setting that shapes the result
+    """
+    request = {
+        "transcript": transcript,
+        "system_prompt": system_prompt,
+        "base_prompt": base_prompt,
+        "type_prompt": type_prompt,
+        "model": ANALYSIS_MODEL,
+        "params": {
+            "temperature": ANALYSIS_TEMPERATURE,
+            "max_tokens": ANALYSIS_MAX_TOKENS,
+            "chunker": CHUNKER_VERSION,
+            "chunk_tokens": CHUNK_TOKENS,
+            "overlap_tokens": OVERLAP_TOKENS,
+            "map_reduce_threshold_tokens": MAP_REDUCE_THRESHOLD_TOKENS,
+            "map_window_tokens": MAP_WINDOW_TOKENS,
+        },
+    }
+    return hashlib.sha256(json.dumps(request, sort_keys=True).encode('utf-8')).hexdigest()
+
+def merge_partial_analyses(partials: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Merge per-window analysis results in transcript order
+
+    Lists are concatenated without duplicates, nested objects are merged key
+    by key and text fields are joined.
+    """
+    merged: Dict[str, Any] = {}
+    for partial in partials:
+        if not isinstance(partial, dict):
+            continue
+        for key, value in partial.items():
+            if key not in merged:
+                merged[key] = copy.deepcopy(value)
+                continue
+            existing = merged[key]
+            if isinstance(existing, list) and isinstance(value, list):
+                seen = {json.dumps(item, sort_keys=True) for item in existing}
+                for item in value:
+                    marker = json.dumps(item, sort_keys=True)
+                    if marker not in seen:
+                        existing.append(item)
+                        seen.add(marker)
+            elif isinstance(existing, dict) and isinstance(value, dict):
+                merged[key] = merge_partial_analyses([existing, value])
+            elif isinstance(existing, str) and isinstance(value, str):
+                if value and value not in existing:
+                    merged[key] = f"{existing}\n\n{value}" if existing else value
+            elif not existing:
+                merged[key] = value
+    return merged
@@ -2,8 +2,14 @@
 import asyncio
 import json
 import sys
+import os
 import logging
-from service import ChatService
+
+# Shared Python packages live in <repo>/python
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))), 'python'))
+
+from common import metrics
+from worker import ServiceRegistry, WorkerUnavailable, call, stream
 
 # Configure logging
 logging.basicConfig(
@@ -23,40 +29,68 @@ async def main():
         sys.exit(1)
 
     input_file = sys.argv[1]
+    registry = None
 
     try:
         # Read the input data
-        with open(input_file, 'r') as f:
-            input_data = json.load(f)
+        with metrics.span('read_input', bytes=os.path.getsize(input_file)):
+            with open(input_file, 'r') as f:
+                input_data = json.load(f)
             
-        logger.info(f"Processing request with data: {json.dumps(input_data, indent=2)}")
-
-        # Initialize the chat service
-        service = ChatService()
-
-        # Initialize knowledge base with transcript if not already done
-        logger.info(f"Initializing knowledge base for meeting {input_data['meeting_id']}")
-        await service.initialize_knowledge(
-            transcript=input_data['transcript'],
-            meeting_id=input_data['meeting_id']
+        # The transcript is sent with every request, so only its size is logged
+        logger.info(
+            f"Processing request for meeting {input_data.get('meeting_id')} "
+            f"(conversation {input_data.get('conversation_id')}, transcript of {len(input_data.get('transcript') or '')} chars): "
+            f"{metrics.preview(input_data.get('query', ''))}"
         )
 
-        # Get response for the query with conversation history
-        logger.info(f"Getting response for query with conversation_id: {input_data.get('conversation_id')}")
-        response = await service.get_response(
-            query=input_data['query'],
-            meeting_id=input_data['meeting_id'],
-            conversation_id=input_data.get('conversation_id')  # Optional conversation ID
-        )
+        if input_data.get('stream'):
+            await stream_events(input_data)
+            return
+
+        # Hand the job to the resident worker pool, or run it here if none is up
+        try:
+            response = call('chat', input_data)
+        except WorkerUnavailable as e:
+            logger.info(f"Running chat in-process: {str(e)}")
+            registry = ServiceRegistry()
+            response = await registry.handle('chat', input_data)
         
         logger.info(f"Got response with metadata: {response.get('metadata', {})}")
 
         # Output the results as JSON
-        print(json.dumps(response))
+        print(json.dumps(response), flush=True)
+
+        # A running summary update started in-process must finish before exiting
+        if registry is not None:
+            await registry.drain()
 
     except Exception as e:
         logger.error(f"Error in chat.py: {str(e)}", exc_info=True)
         sys.exit(1)
 
+async def stream_events(input_data):
+    """
+    Write the response events to stdout as NDJSON, one line per event,
+    flushing each so the route can relay tokens as they arrive
+    """
+    try:
+        events = stream('chat', input_data)
+    except WorkerUnavailable as e:
+        logger.info(f"Streaming chat in-process: {str(e)}")
+        registry = ServiceRegistry()
+        async for event in registry.stream('chat', input_data):
+            print(json.dumps(event), flush=True)
+        await registry.drain()
+        return
+
+    for event in events:
+        print(json.dumps(event), flush=True)
+
 if __name__ == '__main__':
-    asyncio.run(main()) 
\ No newline at end of file
+    # Stage timings are written to stderr as @metrics lines for the route to collect
+    with metrics.collect() as records:
+        try:
+            asyncio.run(main())
+        finally:
+            metrics.emit(records) 
@@ -1,11 +1,12 @@
 import { NextRequest, NextResponse } from 'next/server'
-import { spawn } from 'child_process'
+import { spawn, ChildProcessWithoutNullStreams } from 'child_process'
 import path from 'path'
 import { supabaseAdmin } from '@/lib/supabase'
+import { extractMetrics, reportMetrics } from '@/lib/metrics'
 
 export async function POST(request: NextRequest) {
   try {
-    const { meetingId, message, conversationId } = await request.json()
+    const { meetingId, message, conversationId, stream } = await request.json()
 
     if (!meetingId || !message) {
       return NextResponse.json(
@@ -75,13 +76,18 @@ export async function POST(request: NextRequest) {
       transcript: meeting.rawTranscript,
       meeting_id: meetingId,
       query: message,
-      conversation_id: conversation.id  // Use the actual database conversation ID
+      conversation_id: conversation.id,  // Use the actual database conversation ID
+      stream: Boolean(stream)
     }))
 
     // Run the Python script
     const pythonScript = path.join(process.cwd(), 'app', 'api', 'chat', 'chat.py')
     const pythonProcess = spawn('python3', [pythonScript, tempDataPath])
 
+    if (stream) {
+      return streamChatResponse(pythonProcess, tempDataPath, message, conversation.id)
+    }
+
     let outputData = ''
     let errorData = ''
 
@@ -104,32 +110,17 @@ export async function POST(request: NextRequest) {
     // Clean up temporary file
     fs.unlinkSync(tempDataPath)
 
+    const { metrics, log } = extractMetrics(errorData)
+    reportMetrics('chat', metrics)
+
     if (exitCode !== 0) {
-      throw new Error(`Python script failed with error: ${errorData}`)
+      throw new Error(`Python script failed with error: ${log}`)
     }
 
     const response = JSON.parse(outputData)
 
     // Store the user message and AI response in the database
-    const { error: messagesError } = await supabaseAdmin
-      .from('ChatMessage')
-      .insert([
-        {
-          role: 'user',
-          content: message,
-          conversationId: conversation.id
-        },
-        {
-          role: 'assistant',
-          content: response.response,
-          conversationId: conversation.id
-        }
-      ])
-
-    if (messagesError) {
-      console.error('Error creating messages:', messagesError)
-      throw messagesError
-    }
+    await storeMessages(conversation.id, message, response.response)
 
     return NextResponse.json({
       ...response,
@@ -146,4 +137,130 @@ export async function POST(request: NextRequest) {
       { status: 500 }
     )
   }
-} 
\ No newline at end of file
+}
+
+async function storeMessages(conversationId: string, message: string, reply: string) {
+  const { error: messagesError } = await supabaseAdmin
+    .from('ChatMessage')
+    .insert([
+      {
+        role: 'user',
+        content: message,
+        conversationId
+      },
+      {
+        role: 'assistant',
+        content: reply,
+        conversationId
+      }
+    ])
+
+  if (messagesError) {
+    console.error('Error creating messages:', messagesError)
+    throw messagesError
+  }
+}
+
+// Relay the NDJSON events chat.py prints (start, token..., done) to the
+// browser as they arrive, storing the messages once the done event is seen
+function streamChatResponse(
+  pythonProcess: ChildProcessWithoutNullStreams,
+  tempDataPath: string,
+  message: string,
+  conversationId: string
+) {
+  const fs = require('fs')
+  const encoder = new TextEncoder()
+  let errorData = ''
+  let cancelled = false
+
+  // Decode as text so multibyte characters split across chunks stay whole
+  pythonProcess.stdout.setEncoding('utf8')
+  pythonProcess.stderr.setEncoding('utf8')
+  pythonProcess.stderr.on('data', (data) => {
+    errorData += data.toString()
+  })
+
+  const body = new ReadableStream({
+    start(controller) {
+      let buffered = ''
+      let finished = false
+
+      const send = (event: Record<string, any>) => {
+        if (cancelled) return
+        controller.enqueue(encoder.encode(JSON.stringify(event) + '\n'))
+      }
+
+      const handleLine = async (line: string) => {
+        if (!line.trim()) return
+        let event
+        try {
+          event = JSON.parse(line)
+        } catch (error) {
+          // A stray non-JSON line must not end the stream
+          console.error('Skipping unparseable chat output:', line)
+          return
+        }
+        if (event.type === 'done') {
+          finished = true
+          try {
+            await storeMessages(conversationId, message, event.response)
+          } catch (error: any) {
+            console.error('Chat stream error:', error)
+            send({ type: 'error', error: error.message || 'Failed to process chat request' })
+            return
+          }
+          event.metadata = { ...event.metadata, conversation_id: conversationId }
+        } else if (event.type === 'start') {
+          event.conversation_id = conversationId
+        }
+        send(event)
+      }
+
+      // Lines are handled in order, so the done event is sent after the tokens
+      let pending = Promise.resolve()
+      pythonProcess.stdout.on('data', (data) => {
+        buffered += data.toString()
+        const lines = buffered.split('\n')
+        buffered = lines.pop() || ''
+        for (const line of lines) {
+          pending = pending.then(() => handleLine(line))
+        }
+      })
+
+      pythonProcess.on('close', (exitCode) => {
+        const { metrics, log } = extractMetrics(errorData)
+        reportMetrics('chat', metrics)
+        pending = pending.then(() => handleLine(buffered))
+        pending
+          .then(() => {
+            if (exitCode !== 0 || !finished) {
+              console.error('Python script error:', log)
+              send({ type: 'error', error: 'Failed to process chat request' })
+            }
+          })
+          .catch((error: any) => {
+            console.error('Chat stream error:', error)
+            send({ type: 'error', error: error.message || 'Failed to process chat request' })
+          })
+          .finally(() => {
+            fs.unlinkSync(tempDataPath)
+            if (!cancelled) controller.close()
+          })
+      })
+    },
+    cancel() {
+      // The browser went away; stop generating
+      cancelled = true
+      pythonProcess.kill()
+    }
+  })
+
+  return new Response(body, {
+    headers: {
+      'Content-Type': 'application/x-ndjson; charset=utf-8',
+      'Cache-Control': 'no-cache, no-transform',
+      'X-Accel-Buffering': 'no'
+    }
+  })
+}
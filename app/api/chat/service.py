@@ -1,52 +1,130 @@
-from typing import Dict, Any, List
-import os
-import httpx
-from chromadb import PersistentClient, Settings
-from chromadb.utils import embedding_functions
+from typing import AsyncIterator, Dict, Any, List, Optional, Tuple
+import asyncio
+import functools
 import json
+import os
+import time
 from datetime import datetime
 import logging
 import re
+from common import http, metrics
+from common.lru import LRUCache
+from common.paths import data_path
+from common.sse import iter_sse_data
+from knowledge.bm25 import BM25Index, bm25_path, load_current as load_current_bm25, reciprocal_rank_fusion
+from knowledge.chunking import CHUNK_TOKENS, CHUNKER_VERSION, OVERLAP_TOKENS, chunk_transcript
+from knowledge.history import ConversationStore
+from knowledge.prompt import Prompt, PromptBuilder
+from knowledge.query_scope import QueryScope, parse_scope
+from knowledge.storage import StorageManager, hold_store
+from knowledge.indexing import content_ids, get_fingerprint, sync_chunks, transcript_fingerprint
+from knowledge.word_index import WordIndex, load_or_build as load_or_build_word_index, word_index_path
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Occurrences of a searched word listed with timestamps in the prompt
+MAX_LISTED_OCCURRENCES = 50
+# Most recent history messages considered for each question
+MAX_HISTORY_MESSAGES = 20
+# Rolled-off messages left to build up before they are folded into the running summary
+SUMMARY_BATCH_MESSAGES = 10
+# Messages sent to the summarizer in one request
+MAX_SUMMARIZED_MESSAGES = 40
+SUMMARY_MAX_TOKENS = 400
+# Chunks sent as context, fused from the lexical and vector rankings
+RETRIEVAL_TOP_K = int(os.environ.get('CHAT_RETRIEVAL_TOP_K', '8'))
+# Candidates taken from each ranking before they are fused
+RETRIEVAL_CANDIDATES = int(os.environ.get('CHAT_RETRIEVAL_CANDIDATES', '20'))
+# Meetings whose word and BM25 indexes stay loaded in a resident worker
+INDEX_CACHE_MEETINGS = int(os.environ.get('CHAT_INDEX_CACHE_MEETINGS', '16'))
+
+OPENROUTER_CHAT_URL = "https://openrouter.ai/api/v1/chat/completions"
+COMPLETION_TIMEOUT = http.endpoint_timeout(30.0)
+# Allows for gaps between streamed tokens rather than the whole completion
+STREAM_TIMEOUT = http.endpoint_timeout(60.0)
+
+ANSWER_INSTRUCTIONS = "Important: Base your response ONLY on the exact content provided in the context. If you're mentioning specific quotes or timestamps, they MUST be present in the provided context. Do not make assumptions or fill in missing information."
+
 class ChatService:
     def __init__(self):
         self.openrouter_api_key = os.environ.get('OPENROUTER_API_KEY')
         if not self.openrouter_api_key:
             raise ValueError("OPENROUTER_API_KEY environment variable is not set")
         
+        # Append-only chat history, replacing the per-meeting Chroma history collections
+        self.history_store = ConversationStore()
+        
+        # Keeps each request within the prompt token budget
+        self.prompt_builder = PromptBuilder(budget_tokens=int(os.environ.get('CHAT_PROMPT_TOKEN_BUDGET', '12000')))
+        
+        # Running summary updates still in flight, by conversation id
+        self._summarizing: Dict[str, asyncio.Task] = {}
+        
+        # Fingerprint of the transcript each recently initialized meeting was indexed from
+        self.meeting_fingerprints: LRUCache[str, str] = LRUCache(INDEX_CACHE_MEETINGS)
+        
+        # Word and BM25 indexes of recently used transcripts, by fingerprint
+        self.word_indexes: LRUCache[str, WordIndex] = LRUCache(INDEX_CACHE_MEETINGS)
+        self.lexical_indexes: LRUCache[str, BM25Index] = LRUCache(INDEX_CACHE_MEETINGS)
+        
+        # Headers for OpenRouter API
+        self.headers = {
+            "Authorization": f"Bearer {self.openrouter_api_key}",
+            "HTTP-Referer": os.environ.get('SITE_URL', 'http://localhost:3000'),
+            "X-Title": os.environ.get('SITE_NAME', 'Law Transcribe'),
+            "Content-Type": "application/json"
+        }
+    
+    @functools.cached_property
+    def client(self):
+        """
+        ChromaDB client, created on first use since chromadb is slow to import
+        """
+        from chromadb import PersistentClient, Settings
+        
         # Ensure ChromaDB directory exists with absolute path
-        persist_directory = os.path.abspath(os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))), 'data', 'chromadb'))
+        persist_directory = os.path.abspath(data_path('chromadb'))
         os.makedirs(persist_directory, exist_ok=True)
         logger.info(f"Using ChromaDB directory: {persist_directory}")
         
-        # Initialize ChromaDB with persistent client
-        self.client = PersistentClient(
+        # Keeps `storage.py compact` away from the store while this process uses it
+        hold_store()
+        
+        return PersistentClient(
             path=persist_directory,
             settings=Settings(
                 anonymized_telemetry=False,
                 is_persistent=True
             )
         )
+    
+    @functools.cached_property
+    def storage(self) -> StorageManager:
+        """
+        Tracks use of the meeting indexes; `storage.py maintain` evicts by that record
+        """
+        return StorageManager(self.client)
+    
+    @functools.cached_property
+    def embedding_function(self):
+        """
+        Shared with the other services and backed by the on-disk embedding cache
+        """
+        from knowledge.embedding_cache import get_embedding_function
         
-        self.embedding_function = embedding_functions.DefaultEmbeddingFunction()
-        
-        # Headers for OpenRouter API
-        self.headers = {
-            "Authorization": f"Bearer {self.openrouter_api_key}",
-            "HTTP-Referer": os.environ.get('SITE_URL', 'http://localhost:3000'),
-            "X-Title": os.environ.get('SITE_NAME', 'Law Transcribe'),
-            "Content-Type": "application/json"
-        }
+        return get_embedding_function()
         
     async def initialize_knowledge(self, transcript: str, meeting_id: str):
         """
         Initialize the knowledge base with a transcript
         """
         try:
+            # Evicted indexes are rebuilt below like any index that is out of date
+            if self.storage.touch(meeting_id, word_index_path(transcript)):
+                logger.info(f"Rebuilding evicted index of meeting {meeting_id}")
+            
             # Get or create collection for transcript chunks
             collection_name = f"meeting_{meeting_id}"
             logger.info(f"Creating/getting collection: {collection_name}")
@@ -55,198 +133,427 @@ class ChatService:
                 embedding_function=self.embedding_function
             )
             
-            # Get or create collection for chat history
-            history_collection_name = f"chat_history_{meeting_id}"
-            logger.info(f"Creating/getting history collection: {history_collection_name}")
-            history_collection = self.client.get_or_create_collection(
-                name=history_collection_name,
-                embedding_function=self.embedding_function
+            # Move chat history left in the legacy Chroma collection into the history store
+            self.history_store.migrate_meeting(self.client, meeting_id)
+            
+            fingerprint = transcript_fingerprint(
+                transcript,
+                chunker=CHUNKER_VERSION,
+                max_tokens=CHUNK_TOKENS,
+                overlap_tokens=OVERLAP_TOKENS
             )
+            self.meeting_fingerprints[meeting_id] = fingerprint
             
-            # Split transcript into chunks and add to collection
-            chunks = self._chunk_transcript(transcript)
-            ids = [f"chunk_{i}" for i in range(len(chunks))]
-            metadatas = [{"meeting_id": meeting_id} for _ in chunks]
+            # Positional word index for exact, phrase and count queries
+            if fingerprint not in self.word_indexes:
+                with metrics.span('word_index_load'):
+                    self.word_indexes[fingerprint] = load_or_build_word_index(transcript)
             
-            # Add chunks to collection
-            collection.add(
-                documents=chunks,
-                ids=ids,
-                metadatas=metadatas
-            )
-            logger.info(f"Added {len(chunks)} chunks to collection {collection_name}")
+            # Skip indexing entirely when this exact transcript is already indexed
+            if get_fingerprint(collection) == fingerprint and self._load_lexical_index(collection_name, fingerprint):
+                logger.info(f"Collection {collection_name} is up to date, skipping indexing")
+                return True
+            
+            # Split transcript into timed chunks and embed only the ones not stored yet
+            with metrics.span('chunking') as timed:
+                chunks = chunk_transcript(transcript)
+                timed.add(chunks=len(chunks), chars=len(transcript))
+            texts = [chunk.text for chunk in chunks]
+            metadatas = [{"meeting_id": meeting_id, **chunk.metadata()} for chunk in chunks]
+            with metrics.span('indexing', chunks=len(chunks)):
+                sync_chunks(collection, texts, metadatas, fingerprint)
+            logger.info(f"Embedding cache stats: {self.embedding_function.stats()}")
+            
+            # BM25 index over the same chunk ids, stored beside the collection
+            with metrics.span('lexical_indexing', chunks=len(chunks)):
+                lexical_index = BM25Index.build(content_ids(texts), texts, fingerprint)
+                lexical_index.save(bm25_path(collection_name))
+            self.lexical_indexes[fingerprint] = lexical_index
             return True
         except Exception as e:
             logger.error(f"Error initializing knowledge: {str(e)}")
             return False
+    
+    def _load_lexical_index(self, collection_name: str, fingerprint: str) -> bool:
+        """
+        Make the meeting's BM25 index available, from memory or disk, if it matches the indexed transcript
+        """
+        if fingerprint in self.lexical_indexes:
+            return True
+        lexical_index = load_current_bm25(bm25_path(collection_name), fingerprint)
+        if lexical_index is None:
+            return False
+        self.lexical_indexes[fingerprint] = lexical_index
+        return True
+
+    def _word_index(self, meeting_id: str) -> Optional[WordIndex]:
+        fingerprint = self.meeting_fingerprints.get(meeting_id)
+        return self.word_indexes.get(fingerprint) if fingerprint else None
+
+    def _lexical_index(self, meeting_id: str) -> Optional[BM25Index]:
+        fingerprint = self.meeting_fingerprints.get(meeting_id)
+        return self.lexical_indexes.get(fingerprint) if fingerprint else None
             
     async def get_response(self, query: str, meeting_id: str, conversation_id: str = None) -> Dict[str, Any]:
         """
         Get a response using RAG with OpenRouter, maintaining conversation history
         """
         try:
-            # Get collections
-            collection_name = f"meeting_{meeting_id}"
-            logger.info(f"Accessing collection: {collection_name}")
-            collection = self.client.get_or_create_collection(
-                name=collection_name,
-                embedding_function=self.embedding_function
-            )
-            
-            history_collection_name = f"chat_history_{meeting_id}"
-            logger.info(f"Accessing history collection: {history_collection_name}")
-            history_collection = self.client.get_or_create_collection(
-                name=history_collection_name,
-                embedding_function=self.embedding_function
-            )
-            
-            # Get conversation history
-            history = []
-            if conversation_id:
-                try:
-                    logger.info(f"Retrieving history for conversation: {conversation_id}")
-                    history_results = history_collection.get(
-                        ids=[conversation_id],
-                        include=["documents", "metadatas"]
-                    )
-                    logger.info(f"History results: {history_results}")
-                    if history_results and history_results['documents']:
-                        history = json.loads(history_results['documents'][0])
-                        logger.info(f"Found existing history with {len(history)} messages")
-                    else:
-                        logger.info("No existing history found")
-                        conversation_id = None
-                except Exception as e:
-                    logger.error(f"Error retrieving history: {str(e)}")
-                    conversation_id = None
-            
-            if not conversation_id:
-                conversation_id = f"conv_{datetime.now().timestamp()}"
-                logger.info(f"Creating new conversation: {conversation_id}")
-                history_collection.add(
-                    ids=[conversation_id],
-                    documents=[json.dumps([])],
-                    metadatas=[{"meeting_id": meeting_id, "created_at": datetime.now().isoformat()}]
-                )
-            
-            # Perform hybrid search
-            # 1. First try exact word matching if the query contains specific words to find
-            exact_matches = []
-            search_words = self._extract_search_words(query, history)
-            if search_words:
-                logger.info(f"Searching for exact matches of words: {search_words}")
-                all_chunks = collection.get()
-                for i, doc in enumerate(all_chunks['documents']):
-                    for word in search_words:
-                        if word.lower() in doc.lower():
-                            exact_matches.append({
-                                'chunk': doc,
-                                'word': word,
-                                'index': i
-                            })
-            
-            # 2. Then do semantic search
-            logger.info("Performing semantic search")
-            semantic_results = collection.query(
-                query_texts=[query],
-                n_results=5  # Increased from 3 to 5 for better context
-            )
-            
-            # Combine and deduplicate results
-            context_chunks = []
-            seen_chunks = set()
-            
-            # First add exact matches
-            for match in exact_matches:
-                if match['chunk'] not in seen_chunks:
-                    context_chunks.append(match['chunk'])
-                    seen_chunks.add(match['chunk'])
-            
-            # Then add semantic results
-            for chunk in semantic_results['documents'][0]:
-                if chunk not in seen_chunks:
-                    context_chunks.append(chunk)
-                    seen_chunks.add(chunk)
-            
-            # Prepare context from combined results
-            context = "\n\n".join(context_chunks)
-            
-            # Add exact match information to the prompt if available
-            exact_match_info = ""
-            if exact_matches:
-                exact_match_info = "\nExact word matches found:\n" + "\n".join(
-                    f"- '{match['word']}' found in transcript segment" 
-                    for match in exact_matches
-                )
-            
-            # Prepare messages including history
-            messages = [
-                {"role": "system", "content": self._get_system_prompt()},
-                {"role": "user", "content": f"Context from transcript:\n\n{context}\n{exact_match_info}\n\nConversation history:\n{self._format_history(history)}\n\nCurrent question: {query}\n\nImportant: Base your response ONLY on the exact content provided in the context. If you're mentioning specific quotes or timestamps, they MUST be present in the provided context. Do not make assumptions or fill in missing information."}
-            ]
-            
-            # Add conversation history to messages
-            for msg in history:
-                messages.append({"role": msg["role"], "content": msg["content"]})
-            
-            # Add current query
-            messages.append({"role": "user", "content": query})
-            
-            logger.info(f"Sending request with {len(messages)} messages")
+            conversation_id, prompt, exact_matches, scope = await self._prepare_turn(query, meeting_id, conversation_id)
+            logger.info(f"Sending request with {len(prompt.messages)} messages")
             
             # Make request to OpenRouter API
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    "https://openrouter.ai/api/v1/chat/completions",
+            with metrics.span('llm', purpose='answer') as timed:
+                response = await http.request(
+                    "POST",
+                    OPENROUTER_CHAT_URL,
                     headers=self.headers,
                     json={
                         "model": "openai/gpt-4-turbo-preview",
-                        "messages": messages,
+                        "messages": prompt.messages,
                         "temperature": 0.3
                     },
-                    timeout=30.0
+                    timeout=COMPLETION_TIMEOUT
                 )
                 
                 if response.status_code != 200:
-                    raise Exception(f"OpenRouter API error: {response.text}")
+                    raise Exception(f"OpenRouter API error: {metrics.preview(response.text)}")
                 
                 result = response.json()
-                ai_response = result['choices'][0]['message']['content']
-                
-                # Update conversation history
-                history.append({"role": "user", "content": query})
-                history.append({"role": "assistant", "content": ai_response})
-                
-                # Store updated history
-                try:
-                    logger.info(f"Updating history for conversation {conversation_id} with {len(history)} messages")
-                    history_collection.upsert(
-                        ids=[conversation_id],
-                        documents=[json.dumps(history)],
-                        metadatas=[{
-                            "meeting_id": meeting_id,
-                            "last_updated": datetime.now().isoformat(),
-                            "message_count": len(history)
-                        }]
-                    )
-                except Exception as e:
-                    logger.error(f"Error updating history: {str(e)}")
-                
-                return {
-                    "response": ai_response,
-                    "sources": context_chunks,
-                    "metadata": {
-                        "meeting_id": meeting_id,
-                        "conversation_id": conversation_id,
-                        "confidence": result['choices'][0].get('finish_reason') == 'stop',
-                        "history_length": len(history)
-                    }
-                }
+                timed.add(**metrics.token_usage(result))
+            ai_response = result['choices'][0]['message']['content']
+            finish_reason = result['choices'][0].get('finish_reason')
+            
+            history_length = self._record_turn(conversation_id, query, ai_response)
+            self._schedule_summary(conversation_id)
+            return self._response(ai_response, meeting_id, conversation_id, prompt, exact_matches, scope, finish_reason, history_length)
                 
         except Exception as e:
             logger.error(f"Error getting response: {str(e)}")
             raise
+
+    async def stream_response(self, query: str, meeting_id: str, conversation_id: str = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream a response token by token as it is generated
+
+        Yields a "start" event once the prompt is ready, a "token" event per
+        content delta from OpenRouter and a final "done" event carrying the
+        same response, sources and metadata as get_response. The turn is
+        written to the conversation history only after the stream completes.
+        """
+        try:
+            conversation_id, prompt, exact_matches, scope = await self._prepare_turn(query, meeting_id, conversation_id)
+            logger.info(f"Streaming request with {len(prompt.messages)} messages")
+            yield {"type": "start", "conversation_id": conversation_id}
+            
+            started = time.perf_counter()
+            parts = []
+            finish_reason = None
+            # Spans the whole stream, including the time the tokens take to be relayed
+            with metrics.span('llm', purpose='answer', stream=True) as timed:
+                async with http.stream(
+                    "POST",
+                    OPENROUTER_CHAT_URL,
+                    headers=self.headers,
+                    json={
+                        "model": "openai/gpt-4-turbo-preview",
+                        "messages": prompt.messages,
+                        "temperature": 0.3,
+                        "stream": True
+                    },
+                    timeout=STREAM_TIMEOUT
+                ) as response:
+                    if response.status_code != 200:
+                        raise Exception(f"OpenRouter API error: {metrics.preview((await response.aread()).decode('utf-8', 'replace'))}")
+                
+                    async for data in iter_sse_data(response.aiter_lines()):
+                        choice = (json.loads(data).get('choices') or [{}])[0]
+                        content = (choice.get('delta') or {}).get('content')
+                        if content:
+                            if not parts:
+                                logger.info(f"First token after {time.perf_counter() - started:.2f}s")
+                                timed.add(first_token_ms=round((time.perf_counter() - started) * 1000, 2))
+                            parts.append(content)
+                            yield {"type": "token", "content": content}
+                        finish_reason = choice.get('finish_reason') or finish_reason
+                    timed.add(deltas=len(parts))
+            
+            ai_response = "".join(parts)
+            history_length = self._record_turn(conversation_id, query, ai_response)
+            self._schedule_summary(conversation_id)
+            yield {"type": "done", **self._response(ai_response, meeting_id, conversation_id, prompt, exact_matches, scope, finish_reason, history_length)}
+            
+        except Exception as e:
+            logger.error(f"Error streaming response: {str(e)}")
+            raise
+
+    async def _prepare_turn(self, query: str, meeting_id: str, conversation_id: Optional[str]) -> Tuple[str, Prompt, List[Dict[str, Any]], QueryScope]:
+        """
+        Load the conversation, search the transcript and assemble the prompt
+
+        Returns:
+            The conversation id (created if needed), the prompt, the exact matches and the search scope
+        """
+        # Get collections
+        collection_name = f"meeting_{meeting_id}"
+        logger.info(f"Accessing collection: {collection_name}")
+        collection = self.client.get_or_create_collection(
+            name=collection_name,
+            embedding_function=self.embedding_function
+        )
+        
+        # Get the most recent conversation history
+        # Older turns are carried by a running summary, folded after earlier answers
+        history = []
+        summary, summarized = None, 0
+        history_length = self.history_store.message_count(conversation_id) if conversation_id else None
+        if history_length is not None:
+            logger.info(f"Retrieving history for conversation: {conversation_id}")
+            summary, summarized = self.history_store.get_summary(conversation_id)
+            unsummarized = min(history_length - summarized, MAX_HISTORY_MESSAGES + SUMMARY_BATCH_MESSAGES)
+            history = self.prompt_builder.fit_history(self.history_store.recent(conversation_id, unsummarized))
+            logger.info(f"Found existing history with {history_length} messages, using the last {len(history)}")
+        else:
+            conversation_id = conversation_id or f"conv_{datetime.now().timestamp()}"
+            logger.info(f"Creating new conversation: {conversation_id}")
+            self.history_store.create(conversation_id, meeting_id)
+        
+        # Speakers and time range named in the question narrow every search below
+        scope = self._query_scope(query, meeting_id)
+        if scope:
+            logger.info(f"Limiting search to {scope.describe()}")
+        
+        # Counts and timestamps of the specific words the question asks about
+        search_words = self._extract_search_words(query, history)
+        with metrics.span('exact_match') as timed:
+            exact_matches = self._exact_matches(meeting_id, search_words, scope)
+            timed.add(words=len(exact_matches))
+        
+        # Hybrid search: BM25 and vector rankings fused into a fixed number of chunks
+        ranked_chunks = self._retrieve(collection, meeting_id, scope.query, " ".join([scope.query, *search_words]), scope)
+        
+        # Add exact match information to the prompt if available
+        exact_match_info = ""
+        if exact_matches:
+            extent = f"within {scope.describe()}" if scope else "from the full transcript"
+            exact_match_info = f"Exact word matches found (complete count {extent}):\n" + "\n".join(
+                self._format_occurrences(match['word'], match['count'], match['occurrences'])
+                for match in exact_matches
+            )
+        
+        # Fit history, summary and context into the token budget
+        with metrics.span('prompt_build') as timed:
+            prompt = self.prompt_builder.build(
+                system_prompt=self._get_system_prompt(),
+                question=query,
+                instructions=ANSWER_INSTRUCTIONS,
+                context=ranked_chunks,
+                history=history,
+                summary=summary,
+                exact_match_info=exact_match_info,
+                scope=scope.describe()
+            )
+            timed.add(tokens=prompt.usage.get('total', 0), chunks=len(prompt.context))
+        logger.info(f"Prompt tokens by section: {prompt.usage}")
+        return conversation_id, prompt, exact_matches, scope
+
+    def _record_turn(self, conversation_id: str, query: str, ai_response: str) -> Optional[int]:
+        """
+        Append a question and its answer to the conversation history
+
+        Returns:
+            The number of messages in the conversation afterwards
+        """
+        try:
+            with metrics.span('history_write', messages=2):
+                history_length = self.history_store.append(conversation_id, [
+                    {"role": "user", "content": query},
+                    {"role": "assistant", "content": ai_response}
+                ])
+            logger.info(f"Conversation {conversation_id} now has {history_length} messages")
+            return history_length
+        except Exception as e:
+            logger.error(f"Error updating history: {str(e)}")
+            return self.history_store.message_count(conversation_id)
+
+    def _response(self, ai_response: str, meeting_id: str, conversation_id: str, prompt: Prompt,
+                  exact_matches: List[Dict[str, Any]], scope: QueryScope, finish_reason: Optional[str],
+                  history_length: Optional[int]) -> Dict[str, Any]:
+        """
+        Shape a finished answer the way the chat route expects it
+        """
+        return {
+            "response": ai_response,
+            "sources": prompt.context,
+            "metadata": {
+                "meeting_id": meeting_id,
+                "conversation_id": conversation_id,
+                "confidence": finish_reason == 'stop',
+                "history_length": history_length,
+                "exact_matches": {match['word']: match['count'] for match in exact_matches},
+                "scope": scope.to_dict() if scope else None,
+                "prompt_tokens": prompt.usage
+            }
+        }
+            
+    def _query_scope(self, query: str, meeting_id: str) -> QueryScope:
+        """
+        Speaker and time constraints of a question, matched against the meeting's speakers and length
+        """
+        word_index = self._word_index(meeting_id)
+        if word_index is None:
+            return parse_scope(query)
+        return parse_scope(query, word_index.speakers, word_index.duration())
+
+    def _retrieve(self, collection, meeting_id: str, query: str, lexical_query: str, scope: Optional[QueryScope] = None) -> List[str]:
+        """
+        Rank the meeting's chunks by BM25 and by vector similarity and merge
+        both rankings by reciprocal rank fusion
+
+        A scope is pushed down to both searches as a metadata filter; when no
+        chunk falls inside it the whole transcript is searched instead.
+
+        Returns:
+            At most RETRIEVAL_TOP_K chunk texts, best first
+        """
+        where = scope.where() if scope else None
+        scoped_ids = None
+        if where is not None:
+            with metrics.span('scope_filter') as timed:
+                scoped_ids = collection.get(where=where, include=[])['ids']
+                timed.add(chunks=len(scoped_ids))
+            if not scoped_ids:
+                logger.info(f"No chunks within {scope.describe()}, searching the whole transcript")
+                where, scoped_ids = None, None
+        
+        lexical_ids = []
+        lexical_index = self._lexical_index(meeting_id)
+        with metrics.span('lexical_query') as timed:
+            if lexical_index is not None:
+                lexical_ids = [chunk_id for chunk_id, _ in lexical_index.search(lexical_query, RETRIEVAL_CANDIDATES, ids=scoped_ids)]
+            else:
+                logger.warning(f"No BM25 index loaded for meeting {meeting_id}, using vector search only")
+            timed.add(hits=len(lexical_ids))
+        
+        logger.info("Performing semantic search")
+        with metrics.span('vector_query', n_results=RETRIEVAL_CANDIDATES):
+            semantic_results = collection.query(
+                query_texts=[query],
+                n_results=RETRIEVAL_CANDIDATES,
+                where=where,
+                include=["documents"]
+            )
+        documents = dict(zip(semantic_results['ids'][0], semantic_results['documents'][0]))
+        
+        chunk_ids = reciprocal_rank_fusion([lexical_ids, semantic_results['ids'][0]], limit=RETRIEVAL_TOP_K)
+        # Chunks ranked only lexically still have to be read from the store
+        missing = [chunk_id for chunk_id in chunk_ids if chunk_id not in documents]
+        if missing:
+            found = collection.get(ids=missing, include=["documents"])
+            documents.update(zip(found['ids'], found['documents']))
+        return [documents[chunk_id] for chunk_id in chunk_ids if chunk_id in documents]
             
+    def _exact_matches(self, meeting_id: str, search_words: List[str], scope: Optional[QueryScope] = None) -> List[Dict[str, Any]]:
+        """
+        Count and locate each searched word with the meeting's word index,
+        within the question's speakers and time range if it names any
+        """
+        exact_matches = []
+        word_index = self._word_index(meeting_id)
+        limits = {"start": scope.start, "end": scope.end, "speakers": scope.speakers} if scope else {}
+        if search_words and word_index is not None:
+            logger.info(f"Searching for exact matches of words: {search_words}")
+            for word in search_words:
+                count = word_index.count(word, **limits)
+                exact_matches.append({
+                    'word': word,
+                    'count': count,
+                    'occurrences': word_index.occurrences(word, limit=MAX_LISTED_OCCURRENCES, **limits) if count else []
+                })
+        elif search_words:
+            logger.warning(f"No word index loaded for meeting {meeting_id}, skipping exact matching")
+        return exact_matches
+
+    def _format_occurrences(self, word: str, count: int, occurrences: List[Dict[str, Any]]) -> str:
+        """
+        Describe where a searched word occurs, with timestamps and speakers
+        """
+        if not count:
+            return f"- '{word}' does not occur in the transcript"
+        lines = [f"- '{word}' occurs {count} time{'s' if count != 1 else ''}:"]
+        for occurrence in occurrences:
+            minutes, seconds = divmod(int(occurrence['start']), 60)
+            speaker = occurrence['speaker'] or 'Unknown speaker'
+            lines.append(f"    [{minutes:02d}:{seconds:02d}] {speaker}")
+        if count > len(occurrences):
+            lines.append(f"    ... and {count - len(occurrences)} more")
+        return "\n".join(lines)
+
+    def _schedule_summary(self, conversation_id: str):
+        """
+        Fold rolled-off turns into the running summary in the background,
+        so the summarizer never delays an answer
+        """
+        if conversation_id in self._summarizing:
+            return
+        task = asyncio.get_running_loop().create_task(self._update_summary(conversation_id))
+        self._summarizing[conversation_id] = task
+        task.add_done_callback(lambda _: self._summarizing.pop(conversation_id, None))
+
+    async def wait_for_background(self):
+        """
+        Wait for the running summary updates still in flight
+        """
+        await asyncio.gather(*list(self._summarizing.values()), return_exceptions=True)
+
+    async def _update_summary(self, conversation_id: str):
+        """
+        Fold every message that rolled off the kept history into the running
+        summary, once at least SUMMARY_BATCH_MESSAGES of them have built up
+        """
+        try:
+            summary, summarized = self.history_store.get_summary(conversation_id)
+            first_kept = (self.history_store.message_count(conversation_id) or 0) - MAX_HISTORY_MESSAGES
+            if first_kept - summarized < SUMMARY_BATCH_MESSAGES:
+                return
+            
+            # Progress is saved after each request, so a failure only loses the current one
+            while summarized < first_kept:
+                end = min(summarized + MAX_SUMMARIZED_MESSAGES, first_kept)
+                summary = await self._summarize(summary, self.history_store.messages(conversation_id, summarized, end))
+                self.history_store.set_summary(conversation_id, end, summary)
+                summarized = end
+            logger.info(f"Updated running summary of conversation {conversation_id} through message {first_kept}")
+        except Exception as e:
+            logger.error(f"Error updating running summary: {str(e)}")
+
+    async def _summarize(self, summary: Optional[str], messages: List[Dict[str, str]]) -> str:
+        """
+        Fold messages into a running conversation summary
+        """
+        transcript = "\n".join(f"{m['role'].capitalize()}: {m['content']}" for m in messages)
+        with metrics.span('llm', purpose='summary') as timed:
+            response = await http.request(
+                "POST",
+                OPENROUTER_CHAT_URL,
+                headers=self.headers,
+                json={
+                    "model": "openai/gpt-4-turbo-preview",
+                    "messages": [
+                        {"role": "system", "content": "You maintain a concise running summary of a conversation about a legal transcript. Keep every fact, count, quote and timestamp that was established. Reply with the updated summary only."},
+                        {"role": "user", "content": f"Current summary:\n{summary or 'None yet.'}\n\nNew messages:\n{transcript}"}
+                    ],
+                    "temperature": 0.0,
+                    "max_tokens": SUMMARY_MAX_TOKENS
+                },
+                timeout=COMPLETION_TIMEOUT
+            )
+            if response.status_code != 200:
+                raise Exception(f"OpenRouter API error: {metrics.preview(response.text)}")
+            result = response.json()
+            timed.add(**metrics.token_usage(result))
+        return result['choices'][0]['message']['content'].strip()
+
     def _get_system_prompt(self) -> str:
         """
         Get the system prompt with strict accuracy requirements
@@ -283,71 +590,6 @@ When answering queries, you MUST follow these strict guidelines:
 
 Your responses should be precise, factual, and directly tied to the transcript content. Never speculate or infer beyond what is explicitly stated in the provided text."""
             
-    def _format_history(self, history: List[Dict[str, str]]) -> str:
-        """
-        Format conversation history for inclusion in prompt
-        """
-        if not history:
-            return "No previous conversation."
-        
-        formatted = []
-        for msg in history:
-            role = msg["role"].capitalize()
-            content = msg["content"]
-            formatted.append(f"{role}: {content}")
-        return "\n".join(formatted)
-            
-    def _chunk_transcript(self, transcript: str, chunk_size: int = 500, overlap: int = 100) -> List[str]:
-        """
-        Split transcript into smaller, overlapping chunks to preserve context
-        
-        Args:
-            transcript: The text to chunk
-            chunk_size: Target size of each chunk in characters
-            overlap: Number of characters to overlap between chunks
-        """
-        # Split into sentences first to avoid breaking mid-sentence
-        sentences = re.split(r'(?<=[.!?])\s+', transcript)
-        chunks = []
-        current_chunk = []
-        current_size = 0
-        
-        for sentence in sentences:
-            sentence_size = len(sentence)
-            
-            # If adding this sentence would exceed chunk size
-            if current_size + sentence_size > chunk_size and current_chunk:
-                # Store the current chunk
-                chunks.append(" ".join(current_chunk))
-                
-                # Start new chunk with overlap
-                # Find sentences that fit within overlap size
-                overlap_size = 0
-                overlap_sentences = []
-                for prev_sentence in reversed(current_chunk):
-                    if overlap_size + len(prev_sentence) > overlap:
-                        break
-                    overlap_sentences.insert(0, prev_sentence)
-                    overlap_size += len(prev_sentence) + 1  # +1 for space
-                
-                # Start new chunk with overlapping sentences
-                current_chunk = overlap_sentences
-                current_size = overlap_size
-            
-            current_chunk.append(sentence)
-            current_size += sentence_size + 1  # +1 for space
-        
-        # Add the last chunk if there is one
-        if current_chunk:
-            chunks.append(" ".join(current_chunk))
-        
-        # Log chunking results
-        logger.info(f"Split transcript into {len(chunks)} chunks with size {chunk_size} and overlap {overlap}")
-        for i, chunk in enumerate(chunks):
-            logger.debug(f"Chunk {i}: {len(chunk)} characters")
-            
-        return chunks
-
     def _extract_search_words(self, query: str, history: List[Dict[str, str]]) -> List[str]:
         """
         Extract specific words to search for based on the query and conversation history
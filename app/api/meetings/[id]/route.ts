@@ -1,5 +1,6 @@
 import { NextRequest, NextResponse } from 'next/server'
 import { db, supabaseAdmin } from '@/lib/supabase'
+import { runStorageCommand } from '@/lib/storage'
 
 export const GET = async (request: NextRequest, { params }: { params: { id: string } }) => {
   const { id } = params
@@ -51,6 +52,13 @@ export async function DELETE(
       supabaseAdmin.from('Meeting').delete().eq('id', id)
     ])
 
+    // The meeting's vector and word indexes and its chat history are of no further use
+    try {
+      await runStorageCommand(['drop', id])
+    } catch (error) {
+      console.error('Error dropping meeting indexes:', error)
+    }
+
     return NextResponse.json({ message: 'Meeting deleted successfully' }, { status: 200 })
   } catch (error) {
     console.error('Error deleting meeting:', error)
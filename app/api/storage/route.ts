@@ -0,0 +1,23 @@
+import { NextResponse } from 'next/server'
+import { runStorageCommand, StorageReport } from '@/lib/storage'
+
+// On-disk size of each meeting's indexes and chat history, and of the store as a whole
+export const GET = async () => {
+  try {
+    const { exitCode, output } = await runStorageCommand(['report'])
+    if (exitCode !== 0) {
+      throw new Error(output.error || `storage report exited with code ${exitCode}`)
+    }
+    const report: StorageReport = output
+    return NextResponse.json(report)
+  } catch (error: any) {
+    console.error('Error in /api/storage:', {
+      message: error.message,
+      stack: error.stack
+    });
+    return NextResponse.json({ 
+      error: 'Failed to get storage report.',
+      details: error.message
+    }, { status: 500 });
+  }
+}
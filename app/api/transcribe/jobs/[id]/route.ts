@@ -0,0 +1,80 @@
+import { NextResponse } from 'next/server'
+import { runJobsCommand, storeTranscription, JobStatus } from '@/lib/jobs'
+
+async function getJob(id: string): Promise<JobStatus | null> {
+  const { exitCode, output } = await runJobsCommand(['status', id])
+  return exitCode === 0 ? output : null
+}
+
+// Completion hook: the job runner posts here when a transcription finishes, so the
+// meeting is stored whether or not a browser is still polling
+export const POST = async (request: Request, { params }: { params: { id: string } }) => {
+  const { id } = params
+
+  try {
+    const job = await getJob(id)
+    if (!job) {
+      return NextResponse.json({ error: 'Job not found' }, { status: 404 })
+    }
+    if (job.state !== 'done') {
+      return NextResponse.json({ error: `Job is ${job.state}` }, { status: 409 })
+    }
+    const meetingId = await storeTranscription(job)
+    return NextResponse.json({ jobId: job.id, meetingId: meetingId || job.receipt })
+  } catch (error: any) {
+    console.error('Error storing transcription job:', {
+      message: error.message,
+      stack: error.stack
+    });
+    // The runner posts again later
+    return NextResponse.json({ 
+      error: 'Failed to store transcription.',
+      details: error.message
+    }, { status: 500 });
+  }
+}
+
+// Poll a transcription job; it is reported done once its meeting is stored
+export const GET = async (request: Request, { params }: { params: { id: string } }) => {
+  const { id } = params
+
+  try {
+    const job = await getJob(id)
+    if (!job) {
+      return NextResponse.json({ error: 'Job not found' }, { status: 404 })
+    }
+
+    const response: Record<string, any> = { jobId: job.id, state: job.state }
+    if (job.state === 'queued') response.position = job.position
+    if (job.state === 'failed') response.error = job.error
+
+    if (job.state === 'done') {
+      let meetingId = job.receipt
+      if (!meetingId && !job.delivered) {
+        // The runner could not reach the completion hook; store it from here instead
+        try {
+          meetingId = await storeTranscription(job)
+        } catch (error: any) {
+          console.error('Error storing transcription job:', error.message)
+        }
+      }
+      if (meetingId) {
+        response.meetingId = meetingId
+      } else {
+        // Being stored by the completion hook, or retried by the runner
+        response.state = 'saving'
+      }
+    }
+
+    return NextResponse.json(response)
+  } catch (error: any) {
+    console.error('Error in /api/transcribe/jobs:', {
+      message: error.message,
+      stack: error.stack
+    });
+    return NextResponse.json({ 
+      error: 'Failed to get job status.',
+      details: error.message
+    }, { status: 500 });
+  }
+}
@@ -0,0 +1,95 @@
+import { NextRequest, NextResponse } from 'next/server'
+import { spawn } from 'child_process'
+import fs from 'fs'
+import path from 'path'
+import { db } from '@/lib/supabase'
+import { updateLiveMeeting } from '@/lib/meetings'
+import { extractMetrics, reportMetrics } from '@/lib/metrics'
+
+// Append the next piece of a recording in progress and extend the meeting's transcript
+export const POST = async (request: NextRequest, { params }: { params: { id: string } }) => {
+  const { id } = params
+
+  try {
+    const meeting = await db.meetings.findUnique(id)
+    if (!meeting) {
+      return NextResponse.json({ error: 'Meeting not found.' }, { status: 404 })
+    }
+
+    const formData = await request.formData()
+    const chunk = formData.get('audio') as File | null
+    const final = formData.get('final') === 'true'
+    if (!chunk && !final) {
+      return NextResponse.json({ error: 'No audio chunk provided.' }, { status: 400 })
+    }
+
+    // Chunks are consecutive pieces of one recording, appended to one file per meeting
+    const uploadsDir = path.join(process.cwd(), 'public', 'uploads')
+    fs.mkdirSync(uploadsDir, { recursive: true })
+    const existing = fs.readdirSync(uploadsDir).find(name => name.startsWith(`live-${id}.`))
+    const fileName = existing || `live-${id}${path.extname(chunk?.name || '') || '.webm'}`
+    const audioPath = path.join(uploadsDir, fileName)
+    if (chunk) {
+      fs.appendFileSync(audioPath, Buffer.from(await chunk.arrayBuffer()))
+    }
+
+    const tempDataPath = path.join(uploadsDir, `${Date.now()}-live-data.json`)
+    fs.writeFileSync(tempDataPath, JSON.stringify({
+      meeting_id: id,
+      audio_path: audioPath,
+      filename: fileName,
+      final
+    }))
+
+    // Decodes and transcribes only the audio not seen before, then embeds the new transcript chunks
+    const pythonScript = path.join(process.cwd(), 'python', 'live.py')
+    const pythonProcess = spawn('python3', [pythonScript, tempDataPath])
+
+    let outputData = ''
+    let errorData = ''
+
+    pythonProcess.stdout.on('data', (data) => {
+      outputData += data.toString()
+    })
+
+    pythonProcess.stderr.on('data', (data) => {
+      errorData += data.toString()
+    })
+
+    const exitCode = await new Promise((resolve) => {
+      pythonProcess.on('close', resolve)
+    })
+
+    fs.unlinkSync(tempDataPath)
+
+    const { metrics, log } = extractMetrics(errorData)
+    reportMetrics('transcribe/live', metrics)
+
+    if (exitCode !== 0) {
+      throw new Error(`Live transcription failed with error: ${log}`)
+    }
+
+    const result = JSON.parse(outputData)
+    if (result.updated || result.final) {
+      await updateLiveMeeting(id, result.analysis, result.transcript)
+    }
+
+    return NextResponse.json({
+      meetingId: id,
+      receivedSeconds: result.received_seconds,
+      transcribedSeconds: result.transcribed_seconds,
+      speakers: result.analysis.Speakers,
+      indexed: result.indexed,
+      final: result.final
+    })
+  } catch (error: any) {
+    console.error('Error in /api/transcribe/live:', {
+      message: error.message,
+      stack: error.stack
+    });
+    return NextResponse.json({ 
+      error: 'Failed to process audio chunk.',
+      details: error.message
+    }, { status: 500 });
+  }
+}
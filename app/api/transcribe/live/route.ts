@@ -0,0 +1,24 @@
+import { NextRequest, NextResponse } from 'next/server'
+import { saveMeeting } from '@/lib/meetings'
+
+// Start a live transcription; the meeting exists from the start so chat and analysis can use the partial transcript
+export const POST = async (request: NextRequest) => {
+  try {
+    const { name } = await request.json().catch(() => ({}))
+    const meeting = await saveMeeting({
+      'Meeting Name': name || 'Live Recording Transcript',
+      'Description': 'Live audio transcription in progress'
+    }, '')
+
+    return NextResponse.json({ meetingId: meeting.id }, { status: 201 })
+  } catch (error: any) {
+    console.error('Error in /api/transcribe/live:', {
+      message: error.message,
+      stack: error.stack
+    });
+    return NextResponse.json({ 
+      error: 'Failed to start live transcription.',
+      details: error.message
+    }, { status: 500 });
+  }
+}
@@ -1,10 +1,17 @@
 import base64
 from typing import Dict, Any, Tuple
-import httpx
 import json
 import os
+import sys
 from datetime import datetime
 
+# Shared Python packages live in <repo>/python
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))), 'python'))
+
+from common import http, metrics
+
+GROQ_TIMEOUT = http.endpoint_timeout(180.0)
+
 class TranscriptionService:
     def __init__(self):
         self.groq_api_key = os.environ.get('GROQ_API_KEY')
@@ -34,18 +41,20 @@ class TranscriptionService:
             }
             
             # Make the API call
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
+            with metrics.span('transcription_api', bytes=len(audio_data)) as timed:
+                response = await http.request(
+                    "POST",
                     self.whisper_endpoint,
                     headers=self.headers,
                     json=payload,
-                    timeout=180.0
+                    timeout=GROQ_TIMEOUT
                 )
-                
-                if response.status_code != 200:
-                    raise Exception(f"Transcription failed: {response.text}")
-                
-                return response.text
+                timed.add(status=response.status_code, response_bytes=len(response.content))
+            
+            if response.status_code != 200:
+                raise Exception(f"Transcription failed: {metrics.preview(response.text)}")
+            
+            return response.text
                 
         except Exception as e:
             raise Exception(f"Error in transcription: {str(e)}")
@@ -81,20 +90,22 @@ class TranscriptionService:
                 "max_tokens": 4000
             }
             
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
+            with metrics.span('llm', purpose='analysis') as timed:
+                response = await http.request(
+                    "POST",
                     self.chat_endpoint,
                     headers=self.headers,
                     json=payload,
-                    timeout=180.0
+                    timeout=GROQ_TIMEOUT
                 )
                 
                 if response.status_code != 200:
-                    raise Exception(f"Analysis failed: {response.text}")
+                    raise Exception(f"Analysis failed: {metrics.preview(response.text)}")
                 
                 result = response.json()
-                analysis = json.loads(result['choices'][0]['message']['content'])
-                return analysis
+                timed.add(**metrics.token_usage(result))
+            analysis = json.loads(result['choices'][0]['message']['content'])
+            return analysis
                 
         except Exception as e:
             raise Exception(f"Error in analysis: {str(e)}")
@@ -88,6 +88,7 @@ export default function MeetingDetails({ data }: MeetingDetailsProps) {
   const [message, setMessage] = React.useState<string>('')
   const [chatHistory, setChatHistory] = React.useState<Array<{ role: 'user' | 'assistant', content: string }>>([])
   const [isLoading, setIsLoading] = React.useState(false)
+  const [isStreaming, setIsStreaming] = React.useState(false)
   const [conversationId, setConversationId] = React.useState<string | null>(null)
   const chatEndRef = React.useRef<HTMLDivElement>(null)
   const [conversations, setConversations] = useState<Conversation[]>([])
@@ -283,22 +284,55 @@ export default function MeetingDetails({ data }: MeetingDetailsProps) {
     setChatHistory(prev => [...prev, { role: 'user', content: userMessage }])
 
     try {
-      const response = await axios.post('/api/chat', {
-        meetingId: data.id,
-        message: userMessage,
-        conversationId: conversationId
+      const response = await fetch('/api/chat', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({
+          meetingId: data.id,
+          message: userMessage,
+          conversationId: conversationId,
+          stream: true
+        })
       })
 
-      // Store the conversation ID if it's a new conversation
-      if (response.data.metadata?.conversation_id) {
-        setConversationId(response.data.metadata.conversation_id)
+      if (!response.ok || !response.body) {
+        const body = await response.json().catch(() => ({}))
+        throw new Error(body.error || 'Failed to get response.')
+      }
+
+      // Fill in the assistant message as tokens arrive
+      const appendToReply = (content: string) => {
+        setChatHistory(prev => {
+          const last = prev[prev.length - 1]
+          return [...prev.slice(0, -1), { ...last, content: last.content + content }]
+        })
       }
 
-      // Add assistant's response to chat history
-      setChatHistory(prev => [...prev, { 
-        role: 'assistant', 
-        content: response.data.response 
-      }])
+      const reader = response.body.getReader()
+      const decoder = new TextDecoder()
+      let buffered = ''
+      while (true) {
+        const { done, value } = await reader.read()
+        if (done) break
+        buffered += decoder.decode(value, { stream: true })
+        const lines = buffered.split('\n')
+        buffered = lines.pop() || ''
+        for (const line of lines) {
+          if (!line.trim()) continue
+          const event = JSON.parse(line)
+          if (event.type === 'start') {
+            // Store the conversation ID if it's a new conversation
+            setConversationId(event.conversation_id)
+            setIsLoading(false)
+            setIsStreaming(true)
+            setChatHistory(prev => [...prev, { role: 'assistant', content: '' }])
+          } else if (event.type === 'token') {
+            appendToReply(event.content)
+          } else if (event.type === 'error') {
+            throw new Error(event.error)
+          }
+        }
+      }
     } catch (error: any) {
       console.error('Chat error:', error)
       toast({
@@ -308,6 +342,7 @@ export default function MeetingDetails({ data }: MeetingDetailsProps) {
       })
     } finally {
       setIsLoading(false)
+      setIsStreaming(false)
     }
   }
 
@@ -548,7 +583,7 @@ export default function MeetingDetails({ data }: MeetingDetailsProps) {
                     />
                     <Button
                       onClick={handleSendMessage}
-                      disabled={isLoading || !message.trim()}
+                      disabled={isLoading || isStreaming || !message.trim()}
                       className="bg-blue-600 hover:bg-blue-700 text-white"
                     >
                       <Send className="w-4 h-4" />
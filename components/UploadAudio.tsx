@@ -10,6 +10,13 @@ import dynamic from 'next/dynamic';
 
 let ffmpeg: any = null;
 
+// How often a queued transcription job is checked for completion
+const JOB_POLL_INTERVAL_MS = 3000;
+// The server stores the meeting without this page, so polling gives up after a while
+const JOB_POLL_TIMEOUT_MS = 60 * 60 * 1000;
+// Failed status requests in a row (server restarting, network down) before giving up
+const JOB_POLL_MAX_ERRORS = 10;
+
 const initFFmpeg = async () => {
   if (typeof window === 'undefined') {
     console.log('Skipping FFmpeg initialization on server side');
@@ -163,6 +170,57 @@ const UploadAudio: React.FC<{ onUploadSuccess: () => void }> = ({ onUploadSucces
     }
   };
 
+  const pollTranscriptionJob = async (jobId: string, fileName: string) => {
+    const deadline = Date.now() + JOB_POLL_TIMEOUT_MS;
+    let errors = 0;
+    try {
+      while (Date.now() < deadline) {
+        await new Promise((resolve) => setTimeout(resolve, JOB_POLL_INTERVAL_MS));
+        let response: Response | null = null;
+        let job: any = null;
+        try {
+          response = await fetch(`/api/transcribe/jobs/${jobId}`);
+          job = await response.json();
+        } catch (error) {
+          console.warn('Transcription status check failed:', error);
+        }
+        if (response?.status === 404) {
+          throw new Error('Transcription job not found');
+        }
+        if (!response?.ok || !job) {
+          // Transient: the job keeps running and the server stores it regardless
+          errors += 1;
+          if (errors >= JOB_POLL_MAX_ERRORS) break;
+          continue;
+        }
+        errors = 0;
+
+        if (job.state === 'done') {
+          toast({
+            title: 'Transcription Complete',
+            description: `${fileName} has been transcribed.`,
+          });
+          onUploadSuccess();
+          return;
+        }
+        if (job.state === 'failed') {
+          throw new Error(job.error || 'Transcription failed');
+        }
+      }
+      toast({
+        title: 'Transcription Still Running',
+        description: `Stopped checking on ${fileName}; it will appear in your meetings once it is done.`,
+      });
+    } catch (error: any) {
+      console.error('Transcription job error:', error);
+      toast({
+        title: 'Transcription Failed',
+        description: error.message || 'An error occurred while transcribing the audio.',
+        variant: 'destructive',
+      });
+    }
+  };
+
   const handleTranscribe = async () => {
     const fileToUpload = compressedFile || selectedFile;
     if (!fileToUpload) return;
@@ -199,9 +257,13 @@ const UploadAudio: React.FC<{ onUploadSuccess: () => void }> = ({ onUploadSucces
 
       toast({
         title: 'Transcription Started',
-        description: 'Your audio is being transcribed.',
+        description: responseData.position
+          ? `Your audio is queued behind ${responseData.position} other recording(s).`
+          : 'Your audio is being transcribed.',
       });
-      onUploadSuccess();
+
+      // The job runs in the background; keep polling without blocking further uploads
+      pollTranscriptionJob(responseData.jobId, fileToUpload.name);
     } catch (error: any) {
       console.error('Transcription error:', error);
       toast({
@@ -0,0 +1,45 @@
+import { runPythonCommand } from './python'
+import { StageMetric, reportMetrics } from './metrics'
+import { saveMeeting } from './meetings'
+
+export type JobState = 'queued' | 'running' | 'done' | 'failed'
+
+export interface JobStatus {
+  id: string
+  state: JobState
+  priority: number
+  position?: number
+  error?: string
+  delivered: boolean
+  // Where the result was stored (the meeting id for transcriptions), once it has been
+  receipt?: string
+  // Stage timings, once the job has finished
+  metrics?: StageMetric[]
+}
+
+// Run a command of the Python job queue CLI (python/jobs.py) and parse the JSON it prints
+export async function runJobsCommand(args: string[]): Promise<{ exitCode: number, output: any }> {
+  return runPythonCommand('jobs.py', args)
+}
+
+// Save a finished transcription job as a meeting and return its id, or undefined when
+// someone else has already taken the result; deliver hands it out once, so the runner's
+// completion post and a poll cannot store it twice
+export async function storeTranscription(job: JobStatus): Promise<string | undefined> {
+  const { output: delivered } = await runJobsCommand(['deliver', job.id])
+  if (!delivered.result) return undefined
+
+  reportMetrics('transcribe', job.metrics || [])
+  let meeting
+  try {
+    const { analysis, transcript } = delivered.result
+    meeting = await saveMeeting(analysis, transcript)
+  } catch (error) {
+    // Hand it out again to the runner's next retry or a later poll
+    await runJobsCommand(['release', job.id])
+    throw error
+  }
+  // Polls report the job done once its meeting id is recorded
+  await runJobsCommand(['acknowledge', job.id, String(meeting.id)])
+  return String(meeting.id)
+}
@@ -0,0 +1,144 @@
+import { supabaseAdmin } from '@/lib/supabase'
+
+// Store a finished transcription and its analysis as a Meeting with related records
+export async function saveMeeting(analysis: Record<string, any>, transcript: string) {
+  // Helper function to format dates as ISO strings
+  const formatDate = (date: string) => {
+    const parsedDate = new Date(date)
+    return !isNaN(parsedDate.getTime()) ? parsedDate.toISOString() : null
+  }
+
+  // Save to database with safe access
+  const { data: meeting, error: meetingError } = await supabaseAdmin
+    .from('Meeting')
+    .insert([{
+      name: analysis['Meeting Name'] || 'Untitled Meeting',
+      description: analysis['Description'] || 'No description provided.',
+      rawTranscript: transcript,
+      summary: analysis['Summary'] || ''
+    }])
+    .select()
+    .single()
+
+  if (meetingError) throw meetingError
+
+  // Create related records in parallel
+  await Promise.all([
+    // Tasks
+    supabaseAdmin.from('Task').insert(
+      (analysis['Tasks'] || [])
+        .filter((task: any) => task && typeof task === 'object')
+        .map((task: any) => ({
+          meetingId: meeting.id,
+          task: task.description || 'No task description',
+          owner: task.owner || 'Unassigned',
+          dueDate: task.due_date ? formatDate(task.due_date) : null,
+        }))
+    ),
+
+    // Decisions
+    supabaseAdmin.from('Decision').insert(
+      (analysis['Decisions'] || [])
+        .filter((decision: any) => decision && typeof decision === 'object')
+        .map((decision: any) => ({
+          meetingId: meeting.id,
+          decision: decision.description || 'No decision description',
+          date: decision.date ? formatDate(decision.date) : new Date().toISOString(),
+        }))
+    ),
+
+    // Questions
+    supabaseAdmin.from('Question').insert(
+      (analysis['Questions'] || [])
+        .filter((question: any) => question && typeof question === 'object')
+        .map((question: any) => ({
+          meetingId: meeting.id,
+          question: question.question || 'No question',
+          status: question.status || 'Unanswered',
+          answer: question.answer || '',
+        }))
+    ),
+
+    // Insights
+    supabaseAdmin.from('Insight').insert(
+      (analysis['Insights'] || [])
+        .filter((insight: any) => insight && typeof insight === 'object')
+        .map((insight: any) => ({
+          meetingId: meeting.id,
+          insight: insight.insight || 'No insight',
+          reference: insight.reference || '',
+        }))
+    ),
+
+    // Deadlines
+    supabaseAdmin.from('Deadline').insert(
+      (analysis['Deadlines'] || [])
+        .filter((deadline: any) => deadline && typeof deadline === 'object')
+        .map((deadline: any) => ({
+          meetingId: meeting.id,
+          description: deadline.description || 'No deadline description',
+          dueDate: deadline.date ? formatDate(deadline.date) : null,
+        }))
+    ),
+
+    // Attendees
+    supabaseAdmin.from('Attendee').insert(
+      (analysis['Speakers'] || [])
+        .filter((speaker: any) => speaker && typeof speaker === 'object')
+        .map((speaker: any) => ({
+          meetingId: meeting.id,
+          name: speaker.name || 'Unnamed Speaker',
+          role: speaker.role || 'Speaker',
+        }))
+    ),
+
+    // Follow-ups
+    supabaseAdmin.from('FollowUp').insert(
+      (analysis['Follow-ups'] || [])
+        .filter((followUp: any) => followUp && typeof followUp === 'object')
+        .map((followUp: any) => ({
+          meetingId: meeting.id,
+          description: followUp.description || 'No follow-up description',
+          owner: followUp.owner || 'Unassigned',
+        }))
+    ),
+
+    // Risks
+    supabaseAdmin.from('Risk').insert(
+      (analysis['Risks'] || [])
+        .filter((risk: any) => risk && typeof risk === 'object')
+        .map((risk: any) => ({
+          meetingId: meeting.id,
+          risk: risk.risk || 'No risk description',
+          impact: risk.impact || 'No impact specified',
+        }))
+    ),
+
+    // Agenda items
+    supabaseAdmin.from('AgendaItem').insert(
+      (analysis['Agenda'] || [])
+        .filter((item: any) => item && typeof item === 'string')
+        .map((item: string) => ({
+          meetingId: meeting.id,
+          item: item,
+        }))
+    ),
+  ])
+
+  console.log('Meeting saved successfully:', meeting.id)
+  return meeting
+}
+
+// Bring a meeting whose recording is still being transcribed up to date with its partial transcript
+export async function updateLiveMeeting(meetingId: string, analysis: Record<string, any>, transcript: string) {
+  const { error } = await supabaseAdmin
+    .from('Meeting')
+    .update({
+      rawTranscript: transcript,
+      description: analysis['Description'] || 'No description provided.',
+      summary: analysis['Summary'] || ''
+    })
+    .eq('id', meetingId)
+
+  if (error) throw error
+}
@@ -0,0 +1,36 @@
+// Stage timings the Python scripts write to stderr (python/common/metrics.py)
+export interface StageMetric {
+  stage: string
+  ms: number
+  [field: string]: any
+}
+
+const METRICS_PREFIX = '@metrics '
+
+// Separate the @metrics lines from the rest of a script's stderr
+export function extractMetrics(stderr: string): { metrics: StageMetric[], log: string } {
+  const metrics: StageMetric[] = []
+  const log: string[] = []
+  for (const line of stderr.split('\n')) {
+    if (line.startsWith(METRICS_PREFIX)) {
+      try {
+        metrics.push(JSON.parse(line.slice(METRICS_PREFIX.length)))
+        continue
+      } catch {
+        // A cut-off line is kept as ordinary output
+      }
+    }
+    log.push(line)
+  }
+  return { metrics, log: log.join('\n') }
+}
+
+// Log one structured line per request with the time spent in each stage
+export function reportMetrics(route: string, metrics: StageMetric[]) {
+  if (!metrics.length) return
+  const byStage: Record<string, number> = {}
+  for (const metric of metrics) {
+    byStage[metric.stage] = Math.round(((byStage[metric.stage] || 0) + metric.ms) * 100) / 100
+  }
+  console.log(JSON.stringify({ type: 'metrics', route, byStage, stages: metrics }))
+}
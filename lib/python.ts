@@ -0,0 +1,28 @@
+import { spawn } from 'child_process'
+import path from 'path'
+
+// Run one of the JSON-printing Python CLIs in python/ and parse what it prints
+export async function runPythonCommand(script: string, args: string[]): Promise<{ exitCode: number, output: any }> {
+  const pythonScript = path.join(process.cwd(), 'python', script)
+  const pythonProcess = spawn('python3', [pythonScript, ...args])
+
+  let outputData = ''
+  let errorData = ''
+
+  pythonProcess.stdout.on('data', (data) => {
+    outputData += data.toString()
+  })
+
+  pythonProcess.stderr.on('data', (data) => {
+    errorData += data.toString()
+  })
+
+  const exitCode = await new Promise<number>((resolve) => {
+    pythonProcess.on('close', resolve)
+  })
+
+  if (!outputData.trim()) {
+    throw new Error(`${script} ${args[0] || ''} failed with error: ${errorData}`)
+  }
+  return { exitCode, output: JSON.parse(outputData) }
+}
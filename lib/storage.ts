@@ -0,0 +1,24 @@
+import { runPythonCommand } from './python'
+
+export interface MeetingStorage {
+  meeting_id: string
+  bytes: number
+  vector_bytes: number
+  lexical_bytes: number
+  word_index_bytes: number
+  history_bytes: number
+  accessed_at: number | null
+  evicted: boolean
+}
+
+export interface StorageReport {
+  store_bytes: number
+  max_bytes: number
+  meetings: MeetingStorage[]
+  other_collections: Record<string, number>
+}
+
+// Run a command of the Python vector store maintenance CLI (python/storage.py) and parse the JSON it prints
+export async function runStorageCommand(args: string[]): Promise<{ exitCode: number, output: any }> {
+  return runPythonCommand('storage.py', args)
+}
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Compare the segment-aware chunker with the character-based chunker it
+replaced, on synthetic multi-hour transcripts:
+
+    cd python && python3 -m benchmarks.chunking --hours 1 4 8
+"""
+import argparse
+import logging
+import re
+import time
+import tracemalloc
+
+from knowledge.chunking import chunk_transcript
+
+from .synthetic import synthetic_analysis
+
+
+def legacy_chunk_transcript(transcript: str, chunk_size: int = 500, overlap: int = 100) -> list:
+    """
+    The sentence-regex chunker formerly duplicated in the chat and analysis services
+    """
+    sentences = re.split(r'(?<=[.!?])\s+', transcript)
+    chunks = []
+    current_chunk = []
+    current_size = 0
+    for sentence in sentences:
+        sentence_size = len(sentence)
+        if current_size + sentence_size > chunk_size and current_chunk:
+            chunks.append(" ".join(current_chunk))
+            overlap_size = 0
+            overlap_sentences = []
+            for prev_sentence in reversed(current_chunk):
+                if overlap_size + len(prev_sentence) > overlap:
+                    break
+                overlap_sentences.insert(0, prev_sentence)
+                overlap_size += len(prev_sentence) + 1
+            current_chunk = overlap_sentences
+            current_size = overlap_size
+        current_chunk.append(sentence)
+        current_size += sentence_size + 1
+    if current_chunk:
+        chunks.append(" ".join(current_chunk))
+    return chunks
+
+
+def measure(function, *args, repeat: int = 3, setup=None):
+    """
+    Best wall-clock time over a few runs, then peak memory in a separate
+    traced run so tracing overhead does not skew the timing
+
+    Args:
+        setup: Called untimed before every run, e.g. to reset state the run changes
+    """
+    elapsed = float('inf')
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        started = time.perf_counter()
+        result = function(*args)
+        elapsed = min(elapsed, time.perf_counter() - started)
+    if setup is not None:
+        setup()
+    tracemalloc.start()
+    function(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark transcript chunkers")
+    parser.add_argument('--hours', type=float, nargs='+', default=[1, 4, 8])
+    parser.add_argument('--speakers', type=int, default=4)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    print(f"{'hours':>6} {'chunker':>8} {'chunks':>8} {'seconds':>9} {'peak MiB':>9}")
+    for hours in args.hours:
+        transcript = synthetic_analysis(hours, args.speakers)["FormattedTranscript"]
+        for name, function in (("legacy", legacy_chunk_transcript), ("segment", chunk_transcript)):
+            chunks, elapsed, peak = measure(function, transcript)
+            print(f"{hours:>6g} {name:>8} {len(chunks):>8} {elapsed:>9.3f} {peak / 2**20:>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Recall and latency of chat retrieval on a labeled set of legal Q&A
+queries, comparing the BM25 + vector fusion with each retriever alone and
+with the ranking it replaced:
+
+    cd python && python3 -m benchmarks.retrieval
+    cd python && python3 -m benchmarks.retrieval --hours 8 --embeddings model
+    cd python && python3 -m benchmarks.retrieval --hours 8 --scoped
+
+Each labeled statement is spliced into a synthetic recording at a fixed
+point, and a query counts as answered when a retrieved chunk contains its
+evidence. The filler reuses the same legal vocabulary ("the red car",
+"lawyer", "warrant"), so common words match large parts of the transcript.
+Hashed embeddings keep the run offline; --embeddings model uses the real
+embedding model. --scoped adds a 20 minute range around each statement to
+its question ("... between 41:00 and 61:00"), which the hybrid retriever
+turns into a metadata filter; "unfiltered" is the same fusion without it.
+"""
+import argparse
+import asyncio
+import logging
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Tuple
+
+from common import paths
+from knowledge.query_scope import QueryScope
+from knowledge.tokens import estimate_tokens
+
+from .suite import MEETING_ID, _services
+from .synthetic import synthetic_transcription
+
+# Length of the range added to each question by --scoped
+SCOPE_SECONDS = 1200
+
+# (position in the recording, statement, question, evidence the retrieved context must contain)
+LABELED_QUERIES = (
+    (0.04, "I read you your Miranda rights at nine forty and you signed the waiver form in front of Sergeant Alvarez.",
+     "When were the Miranda rights read and who witnessed the waiver?", "Sergeant Alvarez"),
+    (0.11, "The pawn shop receipt shows the gold watch was sold on March third by someone using the name Daniel Reyes.",
+     "Who sold the gold watch at the pawn shop?", "Daniel Reyes"),
+    (0.18, "The red car had a cracked rear windshield and the license plate started with seven K X R.",
+     "What did the witness say about the license plate of the red car?", "seven K X R"),
+    (0.25, "My client was working a double shift at the warehouse on Fulton Avenue until two in the morning.",
+     "What is the defendant's alibi for that night?", "Fulton Avenue"),
+    (0.33, "The bloody knife was recovered from a storm drain behind the laundromat on Eighth Street.",
+     "Where was the weapon found?", "storm drain"),
+    (0.41, "Officer Patel's body camera stopped recording at eleven twelve because the battery died.",
+     "Why is there a gap in the body camera footage?", "battery died"),
+    (0.49, "The neighbor called nine one one after hearing glass shatter and a woman screaming for help.",
+     "Who called nine one one and what did they hear?", "glass shatter"),
+    (0.57, "We found three hundred grams of methamphetamine inside a shoebox under the bed.",
+     "How much methamphetamine was seized during the search?", "three hundred grams"),
+    (0.64, "The lab matched the fingerprint on the doorknob to the defendant's left thumb.",
+     "What did the fingerprint analysis show?", "left thumb"),
+    (0.72, "The surveillance footage from the gas station is time stamped ten fifty eight and shows a man in a green hoodie.",
+     "What was the man wearing in the gas station video?", "green hoodie"),
+    (0.80, "The victim's phone was pinging a tower near the Riverside bus depot at midnight.",
+     "Where was the victim's phone at midnight?", "Riverside bus depot"),
+    (0.88, "I asked for my lawyer three times and the detective kept telling me it would only take a minute.",
+     "How many times was lawyer mentioned before the questioning continued?", "kept telling me it would only take a minute"),
+    (0.95, "The detective asked about the red car because the bartender saw it leave the parking lot with its headlights off.",
+     "How many times was the red car mentioned and why did the detective ask about it?", "headlights off"),
+)
+
+def labeled_transcript(hours: float, speakers: int) -> Tuple[str, List[float]]:
+    """
+    Formatted transcript of a synthetic recording with the labeled statements
+    spliced in, and the time each statement starts at
+    """
+    from transcription import TranscriptionService
+
+    transcription = synthetic_transcription(hours, speakers)
+    segments = transcription["segments"]
+    starts = []
+    for position, statement, _, _ in LABELED_QUERIES:
+        segment = segments[int(position * (len(segments) - 1))]
+        segment["text"] = statement
+        segment.pop("words", None)
+        starts.append(segment["start"])
+    transcription.pop("words", None)
+    analysis = asyncio.run(TranscriptionService().analyze_transcript(transcription))
+    return analysis["FormattedTranscript"], starts
+
+
+def _clock(seconds: float) -> str:
+    minutes, seconds = divmod(int(seconds), 60)
+    return f"{minutes}:{seconds:02d}"
+
+
+def previous_retrieve(chat_service, collection, query: str) -> List[str]:
+    """
+    The ranking replaced by fusion: the five nearest chunks, with every chunk
+    containing a searched word added in document order
+    """
+    exact_chunks = []
+    for word in chat_service._extract_search_words(query, []):
+        variants = list(dict.fromkeys([word, word.lower(), word.capitalize(), word.upper()]))
+        where_document = {"$contains": variants[0]} if len(variants) == 1 else {"$or": [{"$contains": v} for v in variants]}
+        exact_chunks.extend(collection.get(where_document=where_document, include=["documents"])['documents'])
+    semantic_chunks = list(dict.fromkeys(collection.query(query_texts=[query], n_results=5)['documents'][0]))
+    exact_chunks = list(dict.fromkeys(exact_chunks))
+    exact_set = set(exact_chunks)
+    semantic_set = set(semantic_chunks)
+    return (
+        [chunk for chunk in semantic_chunks if chunk in exact_set]
+        + [chunk for chunk in semantic_chunks if chunk not in exact_set]
+        + [chunk for chunk in exact_chunks if chunk not in semantic_set]
+    )
+
+
+def retrievers(chat_service, collection, top_k: int) -> Dict[str, Callable[[str], List[str]]]:
+    lexical_index = chat_service._lexical_index(MEETING_ID)
+
+    def vector(query: str) -> List[str]:
+        return collection.query(query_texts=[query], n_results=top_k)['documents'][0]
+
+    def bm25(query: str) -> List[str]:
+        ids = [chunk_id for chunk_id, _ in lexical_index.search(query, top_k)]
+        found = collection.get(ids=ids, include=["documents"])
+        documents = dict(zip(found['ids'], found['documents']))
+        return [documents[chunk_id] for chunk_id in ids]
+
+    def hybrid(scope, query: str) -> List[str]:
+        search_words = chat_service._extract_search_words(query, [])
+        return chat_service._retrieve(collection, MEETING_ID, scope.query, " ".join([scope.query, *search_words]), scope)
+
+    return {
+        "previous": lambda query: previous_retrieve(chat_service, collection, query),
+        "vector": vector,
+        "bm25": bm25,
+        "hybrid": lambda query: hybrid(chat_service._query_scope(query, MEETING_ID), query),
+        # The same fusion with the question's time range left in the text instead of filtering
+        "unfiltered": lambda query: hybrid(QueryScope(query=query), query),
+    }
+
+
+def evaluate(retrieve: Callable[[str], List[str]], queries: List[Tuple[str, str]], repeat: int) -> Dict[str, float]:
+    """
+    Recall, reciprocal rank, context size and latency of one retriever over (question, evidence) pairs
+    """
+    hits, reciprocal_ranks, chunk_counts, token_counts, latencies = [], [], [], [], []
+    for question, evidence in queries:
+        elapsed = float('inf')
+        for _ in range(repeat):
+            started = time.perf_counter()
+            chunks = retrieve(question)
+            elapsed = min(elapsed, time.perf_counter() - started)
+        rank = next((i for i, chunk in enumerate(chunks, start=1) if evidence in chunk), None)
+        hits.append(1.0 if rank else 0.0)
+        reciprocal_ranks.append(1.0 / rank if rank else 0.0)
+        chunk_counts.append(len(chunks))
+        token_counts.append(sum(estimate_tokens(chunk) for chunk in chunks))
+        latencies.append(elapsed * 1000)
+    return {
+        "recall": statistics.mean(hits),
+        "mrr": statistics.mean(reciprocal_ranks),
+        "chunks": statistics.mean(chunk_counts),
+        "max_chunks": max(chunk_counts),
+        "tokens": statistics.mean(token_counts),
+        "ms": statistics.mean(latencies),
+        "max_ms": max(latencies),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate chat retrieval on labeled legal Q&A queries")
+    parser.add_argument('--hours', type=float, default=2)
+    parser.add_argument('--speakers', type=int, default=4)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--embeddings', choices=['hashed', 'model'], default='hashed')
+    parser.add_argument('--scoped', action='store_true', help="Name a time range around the answer in each question")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    data_dir = tempfile.mkdtemp(prefix='benchmark-data-')
+    paths.DATA_DIR = data_dir
+    try:
+        _, chat_service = _services()
+        if args.embeddings == 'model':
+            from knowledge.embedding_cache import get_embedding_function
+            chat_service.embedding_function = get_embedding_function()
+        transcript, starts = labeled_transcript(args.hours, args.speakers)
+        queries = []
+        for (_, _, question, evidence), start in zip(LABELED_QUERIES, starts):
+            if args.scoped:
+                low = max(start - SCOPE_SECONDS / 2, 0)
+                question = f"{question.rstrip('?')} between {_clock(low)} and {_clock(low + SCOPE_SECONDS)}?"
+            queries.append((question, evidence))
+        asyncio.run(chat_service.initialize_knowledge(transcript, MEETING_ID))
+        collection = chat_service.client.get_collection(f"meeting_{MEETING_ID}", embedding_function=chat_service.embedding_function)
+        top_k = sys.modules[type(chat_service).__module__].RETRIEVAL_TOP_K
+
+        print(f"{len(LABELED_QUERIES)} queries, {collection.count()} chunks, top {top_k}, {args.embeddings} embeddings")
+        print(f"{'strategy':<10} {'recall':>7} {'MRR':>6} {'chunks':>7} {'max':>5} {'tokens':>7} {'ms':>7} {'max ms':>7}")
+        for name, retrieve in retrievers(chat_service, collection, top_k).items():
+            if name == "unfiltered" and not args.scoped:
+                continue
+            result = evaluate(retrieve, queries, args.repeat)
+            print(f"{name:<10} {result['recall']:>7.2f} {result['mrr']:>6.2f} {result['chunks']:>7.1f} {result['max_chunks']:>5} "
+                  f"{result['tokens']:>7.0f} {result['ms']:>7.1f} {result['max_ms']:>7.1f}")
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
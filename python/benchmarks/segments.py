@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Compare the compact segment output of TranscriptionService with the
+per-segment dicts and per-speaker copies it replaced, building and
+serializing the transcribe.py result for synthetic multi-hour recordings:
+
+    cd python && python3 -m benchmarks.segments --hours 1 8
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+
+from .chunking import measure
+from .synthetic import synthetic_transcription
+
+
+def legacy_result(transcript_data: dict) -> dict:
+    """
+    The transcribe.py result as formerly built: every segment (with its
+    words) as RawSegments, copied again per speaker, and the formatted
+    transcript both inside the analysis and next to it
+    """
+    segments = transcript_data.get('segments', [])
+    duration = transcript_data.get('duration', 0)
+    lines = ["LEGAL PROCEEDING TRANSCRIPT", f"Duration: {duration:.2f} seconds", "=" * 50, ""]
+    current_speaker = None
+    current_dialogue = []
+    for segment in segments:
+        speaker = segment.get('speaker', 'Unknown')
+        start_time = segment.get('start', 0)
+        text = segment.get('text', '').strip()
+        if not text:
+            continue
+        timestamp = f"[{int(start_time) // 60:02d}:{int(start_time) % 60:02d}]"
+        if current_speaker and speaker != current_speaker:
+            lines.append(f"{current_speaker}:")
+            lines.extend([f"    {line}" for line in current_dialogue])
+            lines.append("")
+            current_dialogue = []
+        current_speaker = speaker
+        current_dialogue.append(f"{timestamp} {text}")
+    if current_dialogue:
+        lines.append(f"{current_speaker}:")
+        lines.extend([f"    {line}" for line in current_dialogue])
+        lines.append("")
+    formatted = "\n".join(lines)
+
+    speakers = {}
+    for segment in segments:
+        speaker = segment.get('speaker')
+        if speaker:
+            speakers.setdefault(speaker, {"name": f"Speaker {speaker}", "role": "Speaker", "segments": []})
+            speakers[speaker]["segments"].append({
+                "start": segment.get('start'), "end": segment.get('end'), "text": segment.get('text')
+            })
+
+    analysis = {
+        "Speakers": [info for _, info in sorted(speakers.items())],
+        "FormattedTranscript": formatted,
+        "RawSegments": segments,
+    }
+    return {"analysis": analysis, "transcript": formatted}
+
+
+def compact_result(service, transcript_data: dict) -> dict:
+    analysis = asyncio.run(service.analyze_transcript(transcript_data))
+    transcript = analysis.pop("FormattedTranscript")
+    return {"analysis": analysis, "transcript": transcript}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark transcription result encodings")
+    parser.add_argument('--hours', type=float, nargs='+', default=[1, 8])
+    parser.add_argument('--speakers', type=int, default=4)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    # The API is never called; the key only satisfies the constructor
+    os.environ.setdefault('LEMONFOX_API_KEY', 'benchmark')
+    from transcription import TranscriptionService
+    service = TranscriptionService()
+
+    encodings = (
+        ("legacy", lambda data: json.dumps(legacy_result(data))),
+        ("compact", lambda data: json.dumps(compact_result(service, data), separators=(',', ':'))),
+    )
+    print(f"{'hours':>6} {'encoding':>9} {'payload MiB':>12} {'seconds':>9} {'peak MiB':>9}")
+    for hours in args.hours:
+        transcript_data = synthetic_transcription(hours, args.speakers)
+        for name, function in encodings:
+            payload, elapsed, peak = measure(function, transcript_data)
+            print(f"{hours:>6g} {name:>9} {len(payload) / 2**20:>12.1f} {elapsed:>9.3f} {peak / 2**20:>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Startup-time budget check for the per-request entry points
+
+Each route spawns a fresh Python process, so import cost is paid on every
+request. This reports the slowest imports of each entry point, times
+no-op runs (argument errors and --help) against a wall-clock budget, and
+checks that services which never embed do not import chromadb:
+
+    cd python && python3 -m benchmarks.startup
+    cd python && python3 -m benchmarks.startup --budget-ms 400 --top 5
+
+Exits with status 1 when a budget is exceeded or a heavy module is loaded
+where it should not be.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Tuple
+
+from common.paths import REPO_ROOT
+
+PYTHON_DIR = os.path.join(REPO_ROOT, 'python')
+
+# Wall-clock budget for a no-op run of each entry point
+DEFAULT_BUDGET_MS = float(os.environ.get('STARTUP_BUDGET_MS', '500'))
+
+# (name, command) of no-op runs; each exits before doing any work
+NOOP_RUNS = (
+    ('chat.py', [os.path.join(REPO_ROOT, 'app', 'api', 'chat', 'chat.py')]),
+    ('analyze.py', [os.path.join(REPO_ROOT, 'app', 'api', 'analyze', 'analyze.py')]),
+    ('transcribe.py', [os.path.join(PYTHON_DIR, 'transcribe.py')]),
+    ('jobs.py --help', [os.path.join(PYTHON_DIR, 'jobs.py'), '--help']),
+    ('worker --help', ['-m', 'worker', '--help']),
+    ('transcription.batch --help', ['-m', 'transcription.batch', '--help']),
+)
+
+# Modules too slow to import (or that load models) for code paths that do not need them
+HEAVY_MODULES = ('chromadb', 'onnxruntime', 'numpy')
+
+# (name, code) run in a fresh interpreter; none of them may leave a heavy module imported
+LIGHT_PATHS = (
+    ('worker client', "import worker"),
+    ('AnalysisService', "from worker.handlers import ServiceRegistry; ServiceRegistry().get('analyze')"),
+    ('ChatService', "from worker.handlers import ServiceRegistry; ServiceRegistry().get('chat')"),
+    ('TranscriptionService', "from worker.handlers import ServiceRegistry; ServiceRegistry().get('transcribe')"),
+)
+
+
+def _environment() -> Dict[str, str]:
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [PYTHON_DIR, env.get('PYTHONPATH')]))
+    # No API is called; the keys only satisfy the service constructors
+    for key in ('OPENROUTER_API_KEY', 'LEMONFOX_API_KEY'):
+        env.setdefault(key, 'startup-check')
+    # Never hand the no-op runs to a running worker pool
+    env['WORKER_DISABLED'] = '1'
+    return env
+
+
+def time_run(args: List[str], env: Dict[str, str], cwd: str, repeat: int) -> float:
+    """
+    Median wall-clock milliseconds of running the interpreter with args
+    """
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, *args], env=env, cwd=cwd,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def import_profile(code: str, env: Dict[str, str], cwd: str) -> Tuple[List[Tuple[float, str]], List[str]]:
+    """
+    Run code under -X importtime
+
+    Returns:
+        (cumulative milliseconds, module) of top-level imports, slowest
+        first, and the heavy modules that ended up imported
+    """
+    probe = f"{code}\nimport sys\nprint(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    completed = subprocess.run([sys.executable, '-X', 'importtime', '-c', probe], env=env, cwd=cwd,
+                               capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else "probe failed")
+
+    imports = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative_us, module = line[len('import time:'):].split('|')
+        # Only top-level imports; nested ones are already in their parent's cumulative time
+        if not module[1:].startswith(' '):
+            imports.append((int(cumulative_us) / 1000, module.strip()))
+    imports.sort(reverse=True)
+    loaded = [name for name in completed.stdout.strip().split(',') if name]
+    return imports, loaded
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check startup time of the Python entry points")
+    parser.add_argument('--budget-ms', type=float, default=DEFAULT_BUDGET_MS,
+                        help="Wall-clock budget of each no-op run (STARTUP_BUDGET_MS)")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--top', type=int, default=3, help="Slowest imports listed per code path")
+    args = parser.parse_args()
+
+    env = _environment()
+    failures = []
+    # The entry points log to files in the working directory
+    with tempfile.TemporaryDirectory() as cwd:
+        baseline = time_run(['-c', 'pass'], env, cwd, args.repeat)
+        print(f"{'no-op run':<28} {'ms':>8}  (interpreter alone: {baseline:.0f} ms, budget {args.budget_ms:.0f} ms)")
+        for name, run_args in NOOP_RUNS:
+            elapsed = time_run(run_args, env, cwd, args.repeat)
+            over = elapsed > args.budget_ms
+            print(f"{name:<28} {elapsed:>8.0f}{'  OVER BUDGET' if over else ''}")
+            if over:
+                failures.append(f"{name} took {elapsed:.0f} ms")
+
+        print()
+        for name, code in LIGHT_PATHS:
+            imports, loaded = import_profile(code, env, cwd)
+            total = sum(ms for ms, _ in imports)
+            slowest = ", ".join(f"{module} {ms:.0f}" for ms, module in imports[:args.top])
+            print(f"{name:<28} {total:>8.0f} ms imports  [{slowest}]")
+            if loaded:
+                print(f"{'':<28} loads {', '.join(loaded)}")
+                failures.append(f"{name} imports {', '.join(loaded)}")
+
+    if failures:
+        print("\nStartup check failed:\n  " + "\n  ".join(failures))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
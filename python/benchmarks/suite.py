@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+Benchmarks of the Python hot paths on synthetic transcripts, compared
+against a stored baseline:
+
+    cd python && python3 -m benchmarks.suite
+    cd python && python3 -m benchmarks.suite --scenarios 1h 8h --only chunk_transcript vector_query
+    cd python && python3 -m benchmarks.suite --save-baseline
+
+Runs offline: the LLM is answered by a canned completion, transcription
+starts from a synthetic verbose_json response and embeddings are a cheap
+hashed bag of words, so the numbers cover this code and ChromaDB rather
+than the model or the network. Every store is created in a temporary
+DATA_DIR. Seconds are the best of --repeat runs; peak memory is the
+Python heap (tracemalloc) of one further run and does not include
+native allocations inside ChromaDB.
+
+Exits with status 1 when a benchmark is slower or larger than its
+baseline by more than --tolerance.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import math
+import os
+import platform
+import shutil
+import sys
+import tempfile
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+import httpx
+from chromadb.api.types import Documents, EmbeddingFunction, Embeddings
+
+from common import http, paths
+from knowledge.chunking import chunk_transcript
+from knowledge.word_index import tokenize, word_index_path
+
+from .chunking import measure
+from .synthetic import synthetic_transcription
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+# (name, hours, speakers)
+SCENARIOS = (
+    ("1h", 1, 4),
+    ("4h", 4, 4),
+    ("8h", 8, 4),
+    ("8h-12spk", 8, 12),
+)
+
+QUERIES = (
+    "What did the detective ask about the red car?",
+    "Did the suspect ask for a lawyer before the interview?",
+    "How many times was car mentioned?",
+)
+SEARCH_WORDS = ["car", "red car", "lawyer"]
+MEETING_ID = "benchmark"
+
+# Turns appended per history run, and their size
+HISTORY_TURNS = 50
+HISTORY_MESSAGE_CHARS = 600
+
+# Differences below this are timer noise, whatever the ratio
+NOISE_FLOOR_SECONDS = 0.005
+
+EMBEDDING_DIMENSIONS = 64
+
+
+class HashedEmbeddingFunction(EmbeddingFunction):
+    """
+    Deterministic stand-in for the embedding model: a normalized hashed bag of words
+    """
+
+    def __init__(self):
+        pass
+
+    def __call__(self, input: Documents) -> Embeddings:
+        embeddings = []
+        for text in input:
+            vector = [0.0] * EMBEDDING_DIMENSIONS
+            for token in tokenize(text):
+                vector[int.from_bytes(hashlib.blake2b(token.encode('utf-8'), digest_size=2).digest(), 'big') % EMBEDDING_DIMENSIONS] += 1.0
+            norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+            embeddings.append([value / norm for value in vector])
+        return embeddings
+
+    def stats(self) -> Dict[str, int]:
+        return {}
+
+    @staticmethod
+    def name() -> str:
+        return "benchmark-hashed"
+
+
+def _completion(request: httpx.Request) -> httpx.Response:
+    return httpx.Response(200, json={
+        "choices": [{"message": {"content": "The detective asked about the red car."}, "finish_reason": "stop"}]
+    })
+
+
+def run_offline(coroutine_function: Callable[[], Any]) -> Any:
+    """
+    Run a coroutine on a fresh event loop whose shared HTTP client answers every request with a canned completion
+    """
+    async def run():
+        http._clients[asyncio.get_running_loop()] = httpx.AsyncClient(transport=httpx.MockTransport(_completion))
+        try:
+            return await coroutine_function()
+        finally:
+            await http.aclose()
+    return asyncio.run(run())
+
+
+@dataclass
+class Case:
+    name: str
+    run: Callable[[], Any]
+    setup: Optional[Callable[[], None]] = None
+
+
+def scenario_cases(hours: float, speakers: int, transcription_service, chat_service) -> List[Case]:
+    """
+    Build the benchmark cases of one synthetic recording
+    """
+    from transcription.segment_table import SegmentTable
+
+    transcription = synthetic_transcription(hours, speakers)
+    transcript = asyncio.run(transcription_service.analyze_transcript(transcription))["FormattedTranscript"]
+    table = SegmentTable.from_segments(transcription["segments"])
+    collection_name = f"meeting_{MEETING_ID}"
+    # The retrieval cases search this index, whichever cases are selected
+    asyncio.run(chat_service.initialize_knowledge(transcript, MEETING_ID))
+
+    def reset_index():
+        try:
+            chat_service.client.delete_collection(collection_name)
+        except Exception:
+            pass
+        path = word_index_path(transcript)
+        if os.path.exists(path):
+            os.remove(path)
+
+    def collection():
+        return chat_service.client.get_collection(collection_name, embedding_function=chat_service.embedding_function)
+
+    def query():
+        target = collection()
+        return [target.query(query_texts=[text], n_results=5) for text in QUERIES]
+
+    history_state = {'runs': 0}
+
+    def new_conversation():
+        history_state['runs'] += 1
+        history_state['id'] = f"conv_benchmark_{history_state['runs']}"
+        chat_service.history_store.create(history_state['id'], MEETING_ID)
+
+    def history():
+        store = chat_service.history_store
+        filler = ("the witness stated she heard two gunshots " * 20)[:HISTORY_MESSAGE_CHARS]
+        for turn in range(HISTORY_TURNS):
+            store.append(history_state['id'], [
+                {"role": "user", "content": f"Question {turn}: {filler}"},
+                {"role": "assistant", "content": f"Answer {turn}: {filler}"}
+            ])
+            store.recent(history_state['id'], 20)
+
+    return [
+        Case("chunk_transcript", lambda: chunk_transcript(transcript)),
+        Case("analyze_transcript", lambda: asyncio.run(transcription_service.analyze_transcript(transcription))),
+        Case("extract_speakers", lambda: transcription_service._extract_speakers(table)),
+        Case("index_knowledge", lambda: asyncio.run(chat_service.initialize_knowledge(transcript, MEETING_ID)), setup=reset_index),
+        Case("vector_query", query),
+        Case("exact_match", lambda: chat_service._exact_matches(MEETING_ID, SEARCH_WORDS)),
+        Case("lexical_query", lambda: [chat_service._lexical_index(MEETING_ID).search(text, 20) for text in QUERIES]),
+        Case("hybrid_retrieval", lambda: [chat_service._retrieve(collection(), MEETING_ID, text, text) for text in QUERIES]),
+        Case("chat_turn", lambda: run_offline(lambda: chat_service.get_response(QUERIES[0], MEETING_ID))),
+        Case("history", history, setup=new_conversation),
+    ]
+
+
+def _services():
+    # No API is called; the keys only satisfy the constructors
+    os.environ.setdefault('OPENROUTER_API_KEY', 'benchmark')
+    os.environ.setdefault('LEMONFOX_API_KEY', 'benchmark')
+    from transcription import TranscriptionService
+    from worker.handlers import _load_service_class
+
+    chat_service = _load_service_class('chat')()
+    chat_service.embedding_function = HashedEmbeddingFunction()
+    return TranscriptionService(), chat_service
+
+
+def compare(results: Dict[str, Dict[str, dict]], baseline: Dict[str, Dict[str, dict]], tolerance: float) -> List[str]:
+    """
+    List the benchmarks that regressed beyond the tolerance
+    """
+    regressions = []
+    for scenario, cases in results.items():
+        for name, result in cases.items():
+            reference = baseline.get(scenario, {}).get(name)
+            if reference is None:
+                continue
+            seconds, base_seconds = result["seconds"], reference["seconds"]
+            if seconds > base_seconds * (1 + tolerance) and seconds - base_seconds > NOISE_FLOOR_SECONDS:
+                regressions.append(f"{scenario} {name}: {base_seconds:.3f}s -> {seconds:.3f}s")
+            peak, base_peak = result["peak_mib"], reference["peak_mib"]
+            if peak > base_peak * (1 + tolerance) and peak - base_peak > 1.0:
+                regressions.append(f"{scenario} {name}: {base_peak:.1f} MiB -> {peak:.1f} MiB")
+    return regressions
+
+
+def _change(value: float, reference: Optional[float]) -> str:
+    if not reference:
+        return ""
+    return f"{(value / reference - 1) * 100:+.0f}%"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Python hot paths against a stored baseline")
+    parser.add_argument('--scenarios', nargs='+', choices=[name for name, _, _ in SCENARIOS],
+                        default=[name for name, _, _ in SCENARIOS])
+    parser.add_argument('--only', nargs='+', help="Benchmarks to run (default: all)")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--save-baseline', action='store_true', help="Record this run as the new baseline")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="Allowed slowdown or growth, as a fraction")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    baseline = {}
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)["results"]
+
+    data_dir = tempfile.mkdtemp(prefix='benchmark-data-')
+    paths.DATA_DIR = data_dir
+    results: Dict[str, Dict[str, dict]] = {}
+    try:
+        transcription_service, chat_service = _services()
+        print(f"{'scenario':<10} {'benchmark':<20} {'seconds':>9} {'peak MiB':>9} {'vs baseline':>16}")
+        for scenario, hours, speakers in SCENARIOS:
+            if scenario not in args.scenarios:
+                continue
+            results[scenario] = {}
+            for case in scenario_cases(hours, speakers, transcription_service, chat_service):
+                if args.only and case.name not in args.only:
+                    continue
+                _, elapsed, peak = measure(case.run, repeat=args.repeat, setup=case.setup)
+                results[scenario][case.name] = {"seconds": round(elapsed, 4), "peak_mib": round(peak / 2**20, 2)}
+                reference = baseline.get(scenario, {}).get(case.name, {})
+                change = f"{_change(elapsed, reference.get('seconds')):>7} {_change(peak / 2**20, reference.get('peak_mib')):>7}"
+                print(f"{scenario:<10} {case.name:<20} {elapsed:>9.3f} {peak / 2**20:>9.1f} {change:>16}")
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump({
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "results": results,
+            }, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f"Saved baseline to {args.baseline}")
+        return
+
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print(f"\nRegressions beyond {args.tolerance:.0%}:\n  " + "\n  ".join(regressions))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+import asyncio
+import os
+import random
+from typing import Any, Dict
+
+VOCABULARY = (
+    "the officer asked whether you understood your rights before the interview "
+    "I was at home that night with my brother and we never left the house "
+    "detective did you see the red car parked outside the store on Main Street "
+    "my client will not answer that question without a lawyer present "
+    "at approximately ten fifteen the suspect was placed in the back of the vehicle "
+    "the witness stated she heard two gunshots and then saw someone running "
+    "do you remember what time you arrived at the station "
+    "I told them everything I know I want to go home now "
+    "the search of the apartment was conducted with a signed warrant "
+    "objection your honor the question calls for speculation"
+).split()
+
+
+def synthetic_transcription(hours: float, speakers: int = 4, seed: int = 7,
+                            words_per_minute: int = 150) -> Dict[str, Any]:
+    """
+    Generate a Lemonfox-style verbose_json response with word timestamps
+    """
+    rng = random.Random(seed)
+    duration = hours * 3600
+    seconds_per_word = 60.0 / words_per_minute
+    segments = []
+    all_words = []
+    time = 0.0
+    speaker = 0
+    while time < duration:
+        # Speakers take turns of one to four segments
+        if rng.random() < 0.4:
+            speaker = rng.randrange(speakers)
+        label = f"SPEAKER_{speaker:02d}"
+        words = []
+        for _ in range(rng.randint(6, 30)):
+            word = rng.choice(VOCABULARY)
+            words.append({"word": word, "start": round(time, 2), "end": round(time + seconds_per_word, 2), "speaker": label})
+            time += seconds_per_word
+        words[-1]["word"] += rng.choice([".", ".", "?", "!"])
+        segments.append({
+            "id": len(segments),
+            "start": words[0]["start"],
+            "end": words[-1]["end"],
+            "text": " ".join(word["word"] for word in words),
+            "speaker": label,
+            "words": words,
+        })
+        all_words.extend(words)
+        time += rng.uniform(0.2, 1.5)
+    return {
+        "text": " ".join(segment["text"] for segment in segments),
+        "language": "english",
+        "duration": time,
+        "segments": segments,
+        "words": all_words,
+    }
+
+
+def synthetic_analysis(hours: float, speakers: int = 4, seed: int = 7) -> Dict[str, Any]:
+    """
+    Run a synthetic transcription through TranscriptionService.analyze_transcript
+    """
+    # The API is never called; the key only satisfies the constructor
+    os.environ.setdefault('LEMONFOX_API_KEY', 'benchmark')
+    from transcription import TranscriptionService
+    return asyncio.run(TranscriptionService().analyze_transcript(synthetic_transcription(hours, speakers, seed)))
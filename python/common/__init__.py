@@ -0,0 +1,6 @@
+from .disk_cache import DiskCache
+from .lru import LRUCache
+from .paths import DATA_DIR, REPO_ROOT, data_path
+from .sse import iter_sse_data
+
+__all__ = ['DATA_DIR', 'DiskCache', 'LRUCache', 'REPO_ROOT', 'data_path', 'iter_sse_data']
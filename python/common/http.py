@@ -0,0 +1,229 @@
+import asyncio
+import contextlib
+import email.utils
+import importlib.util
+import logging
+import os
+import random
+import time
+import weakref
+from typing import TYPE_CHECKING, Any, AsyncIterator, NamedTuple, Optional, Union
+
+if TYPE_CHECKING:
+    import httpx
+
+logger = logging.getLogger(__name__)
+
+# Responses worth retrying: timeouts, rate limits and transient server errors
+RETRY_STATUSES = frozenset({408, 425, 429, 500, 502, 503, 504})
+
+# Attempts per request, including the first
+MAX_ATTEMPTS = int(os.environ.get('HTTP_MAX_ATTEMPTS', '4'))
+# Backoff before retry n is drawn from [0, min(BACKOFF_MAX, BACKOFF_BASE * 2**n)]
+BACKOFF_BASE_SECONDS = float(os.environ.get('HTTP_BACKOFF_BASE_SECONDS', '0.5'))
+BACKOFF_MAX_SECONDS = float(os.environ.get('HTTP_BACKOFF_MAX_SECONDS', '30'))
+# Longest Retry-After honoured before giving up on a request
+MAX_RETRY_AFTER_SECONDS = float(os.environ.get('HTTP_MAX_RETRY_AFTER_SECONDS', '60'))
+
+CONNECT_TIMEOUT_SECONDS = float(os.environ.get('HTTP_CONNECT_TIMEOUT_SECONDS', '10'))
+MAX_CONNECTIONS = int(os.environ.get('HTTP_MAX_CONNECTIONS', '100'))
+MAX_KEEPALIVE_CONNECTIONS = int(os.environ.get('HTTP_MAX_KEEPALIVE_CONNECTIONS', '20'))
+KEEPALIVE_EXPIRY_SECONDS = float(os.environ.get('HTTP_KEEPALIVE_EXPIRY_SECONDS', '60'))
+
+# One pooled client per event loop, since httpx connections are bound to the loop that opened them
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+
+
+class EndpointTimeout(NamedTuple):
+    read: float
+    connect: float
+
+
+def endpoint_timeout(read: float, connect: float = CONNECT_TIMEOUT_SECONDS) -> EndpointTimeout:
+    """
+    Build an endpoint timeout: a short connect timeout and an endpoint-specific read timeout
+
+    Services declare these at import time, so they are plain values and
+    httpx (slow to import) is only loaded once a request is made.
+    """
+    return EndpointTimeout(read, connect)
+
+
+def _httpx_timeout(timeout: Union[float, EndpointTimeout, "httpx.Timeout"]) -> Union[float, "httpx.Timeout"]:
+    import httpx
+
+    if isinstance(timeout, EndpointTimeout):
+        return httpx.Timeout(timeout.read, connect=timeout.connect)
+    return timeout
+
+
+def _http2_enabled() -> bool:
+    if os.environ.get('HTTP2_ENABLED') != '1':
+        return False
+    if importlib.util.find_spec('h2') is None:
+        logger.warning("HTTP2_ENABLED is set but the h2 package is not installed, using HTTP/1.1")
+        return False
+    return True
+
+
+def get_client() -> "httpx.AsyncClient":
+    """
+    Get the shared client for the running event loop, creating it on first use
+
+    Connections are kept alive and reused across requests and services, so
+    repeat calls to the same API skip the TCP and TLS handshakes.
+    """
+    import httpx
+
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            http2=_http2_enabled(),
+            timeout=_httpx_timeout(endpoint_timeout(60.0)),
+            limits=httpx.Limits(
+                max_connections=MAX_CONNECTIONS,
+                max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=KEEPALIVE_EXPIRY_SECONDS
+            )
+        )
+        _clients[loop] = client
+    return client
+
+
+def _retry_after(response: "httpx.Response") -> Optional[float]:
+    """
+    Parse a Retry-After header given either in seconds or as an HTTP date
+    """
+    value = response.headers.get('Retry-After')
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(email.utils.parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt: int, response: Optional["httpx.Response"] = None) -> float:
+    """
+    Seconds to wait before retrying after the given (zero-based) attempt
+
+    A Retry-After header from the server wins; otherwise the delay is
+    exponential with full jitter so that concurrent callers spread out.
+    """
+    if response is not None:
+        retry_after = _retry_after(response)
+        if retry_after is not None:
+            return retry_after
+    return random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * (2 ** attempt)))
+
+
+def _should_retry(attempt: int, attempts: int, response: "httpx.Response") -> Optional[float]:
+    """
+    Get the delay before retrying a response, or None if it should be returned as is
+    """
+    if response.status_code not in RETRY_STATUSES or attempt + 1 >= attempts:
+        return None
+    delay = backoff_delay(attempt, response)
+    if delay > MAX_RETRY_AFTER_SECONDS:
+        logger.warning(f"Not retrying {response.request.url}: server asked to wait {delay:.0f}s")
+        return None
+    return delay
+
+
+async def request(method: str, url: str, *, attempts: int = MAX_ATTEMPTS,
+                  timeout: Union[float, EndpointTimeout, "httpx.Timeout", None] = None, **kwargs: Any) -> "httpx.Response":
+    """
+    Send a request through the shared client, retrying transient failures
+
+    Connection errors, timeouts and retryable statuses are retried with
+    backoff. Once attempts run out the last response is returned, so
+    callers keep checking status codes as before.
+
+    Args:
+        method: HTTP method
+        url: Endpoint URL
+        attempts: Tries including the first; request bodies must be replayable when above 1
+        timeout: Endpoint timeout, seconds, an endpoint_timeout() or an httpx.Timeout
+        **kwargs: Passed on to httpx (headers, json, data, content, ...)
+    """
+    import httpx
+
+    client = get_client()
+    if timeout is not None:
+        kwargs['timeout'] = _httpx_timeout(timeout)
+    attempt = 0
+    while True:
+        try:
+            response = await client.request(method, url, **kwargs)
+        except httpx.TransportError as e:
+            if attempt + 1 >= attempts:
+                raise
+            delay = backoff_delay(attempt)
+            logger.warning(f"{method} {url} failed ({type(e).__name__}: {str(e)}), retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+            attempt += 1
+            continue
+
+        delay = _should_retry(attempt, attempts, response)
+        if delay is None:
+            return response
+        logger.warning(f"{method} {url} returned {response.status_code}, retrying in {delay:.1f}s")
+        await asyncio.sleep(delay)
+        attempt += 1
+
+
+@contextlib.asynccontextmanager
+async def stream(method: str, url: str, *, attempts: int = MAX_ATTEMPTS,
+                 timeout: Union[float, EndpointTimeout, "httpx.Timeout", None] = None, **kwargs: Any) -> AsyncIterator["httpx.Response"]:
+    """
+    Open a streaming response through the shared client
+
+    Failures are retried only until the response headers arrive; once the
+    body is handed to the caller nothing is retried, since part of it may
+    already have been consumed.
+    """
+    import httpx
+
+    client = get_client()
+    if timeout is not None:
+        kwargs['timeout'] = _httpx_timeout(timeout)
+    attempt = 0
+    while True:
+        try:
+            response = await client.send(client.build_request(method, url, **kwargs), stream=True)
+        except httpx.TransportError as e:
+            if attempt + 1 >= attempts:
+                raise
+            delay = backoff_delay(attempt)
+            logger.warning(f"{method} {url} failed ({type(e).__name__}: {str(e)}), retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+            attempt += 1
+            continue
+
+        delay = _should_retry(attempt, attempts, response)
+        if delay is not None:
+            await response.aclose()
+            logger.warning(f"{method} {url} returned {response.status_code}, retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+            attempt += 1
+            continue
+
+        try:
+            yield response
+        finally:
+            await response.aclose()
+        return
+
+
+async def aclose():
+    """
+    Close the shared client of the running event loop
+    """
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
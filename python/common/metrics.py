@@ -0,0 +1,110 @@
+import contextlib
+import contextvars
+import json
+import logging
+import os
+import sys
+import time
+from typing import Any, Dict, Iterator, List, Optional, TextIO
+
+logger = logging.getLogger(__name__)
+
+# Prefix of the metric lines written to stderr, so the routes can pick them out of the log output
+METRICS_PREFIX = '@metrics '
+
+# Characters of a large payload kept when it is logged
+LOG_PREVIEW_CHARS = int(os.environ.get('LOG_PREVIEW_CHARS', '2000'))
+
+# Records of the job being handled; shared by the tasks and threads it starts, which copy the context
+_records: contextvars.ContextVar[Optional[List[Dict[str, Any]]]] = contextvars.ContextVar('metrics', default=None)
+
+
+@contextlib.contextmanager
+def collect() -> Iterator[List[Dict[str, Any]]]:
+    """
+    Gather the spans recorded inside the block, including those of tasks it starts
+    """
+    records: List[Dict[str, Any]] = []
+    token = _records.set(records)
+    try:
+        yield records
+    finally:
+        _records.reset(token)
+
+
+class Span:
+    """
+    One timed stage; fields added while it runs (counts, bytes, tokens) are recorded with its duration
+    """
+
+    def __init__(self, stage: str, fields: Dict[str, Any]):
+        self.stage = stage
+        self.fields = fields
+
+    def add(self, **fields: Any):
+        self.fields.update(fields)
+
+
+@contextlib.contextmanager
+def span(stage: str, **fields: Any) -> Iterator[Span]:
+    """
+    Time a pipeline stage
+
+        with metrics.span('chunking') as timed:
+            chunks = chunk_transcript(transcript)
+            timed.add(chunks=len(chunks))
+    """
+    timed = Span(stage, fields)
+    started = time.perf_counter()
+    try:
+        yield timed
+    except BaseException as e:
+        timed.add(error=type(e).__name__)
+        raise
+    finally:
+        record({"stage": stage, "ms": round((time.perf_counter() - started) * 1000, 2), **timed.fields})
+
+
+def record(entry: Dict[str, Any]):
+    """
+    Add a metric to the job being collected; outside of collect() it is only logged at debug level
+    """
+    records = _records.get()
+    if records is not None:
+        records.append(entry)
+    logger.debug(f"metric {entry}")
+
+
+def extend(entries: List[Dict[str, Any]]):
+    """
+    Add metrics gathered elsewhere, e.g. by the worker that ran the job
+    """
+    for entry in entries:
+        record(entry)
+
+
+def emit(records: List[Dict[str, Any]], stream: TextIO = sys.stderr):
+    """
+    Write metrics as prefixed single-line JSON
+    """
+    for entry in records:
+        stream.write(METRICS_PREFIX + json.dumps(entry, separators=(',', ':')) + '\n')
+    stream.flush()
+
+
+def preview(value: Any, limit: int = LOG_PREVIEW_CHARS) -> str:
+    """
+    Compact text of a payload for logging, cut to limit characters with the full size noted
+    """
+    text = value if isinstance(value, str) else json.dumps(value, separators=(',', ':'), default=str)
+    if len(text) <= limit:
+        return text
+    return f"{text[:limit]}... [{len(text)} chars]"
+
+
+def token_usage(result: Dict[str, Any]) -> Dict[str, int]:
+    """
+    Token counts reported in an OpenAI-style completion response, if any
+    """
+    usage = result.get('usage') or {}
+    return {key: usage[key] for key in ('prompt_tokens', 'completion_tokens') if isinstance(usage.get(key), int)}
@@ -0,0 +1,15 @@
+import os
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Local stores (caches, indexes, queues); DATA_DIR moves them, e.g. for benchmarks
+DATA_DIR = os.environ.get('DATA_DIR') or os.path.join(REPO_ROOT, 'data')
+
+
+def data_path(*parts: str) -> str:
+    """
+    Absolute path inside the local data directory, creating its parent
+    """
+    path = os.path.join(DATA_DIR, *parts)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return path
@@ -0,0 +1,38 @@
+from typing import AsyncIterable, AsyncIterator
+
+# Sent by OpenAI-compatible APIs as the last event of a completion stream
+DONE_SENTINEL = "[DONE]"
+
+
+async def iter_sse_data(lines: AsyncIterable[str]) -> AsyncIterator[str]:
+    """
+    Extract the data payloads from a server-sent event stream
+
+    Comment lines (keep-alives such as ": OPENROUTER PROCESSING") and other
+    fields are skipped, multi-line data is joined, and iteration stops at
+    the [DONE] sentinel.
+
+    Args:
+        lines: Decoded lines of the response body, without line endings
+    """
+    data = []
+    async for line in lines:
+        if line == "":
+            # A blank line ends the current event
+            if data:
+                payload = "\n".join(data)
+                data = []
+                if payload == DONE_SENTINEL:
+                    return
+                yield payload
+            continue
+        if line.startswith(":"):
+            continue
+        field, _, value = line.partition(":")
+        if field == "data":
+            data.append(value[1:] if value.startswith(" ") else value)
+
+    if data:
+        payload = "\n".join(data)
+        if payload != DONE_SENTINEL:
+            yield payload
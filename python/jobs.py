@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+import argparse
+import asyncio
+import json
+import logging
+import os
+import signal
+import subprocess
+import sys
+from typing import Optional
+from worker.jobs import DEFAULT_JOB_WORKERS, JOB_RETENTION_HOURS, JobQueue, QueueFull, run_jobs
+
+# Start a runner when a job is submitted or polled and none is alive, so uploads never wait on an operator
+AUTOSTART_RUNNER = os.environ.get('JOB_RUNNER_AUTOSTART', '1') == '1'
+# Seconds without jobs after which a runner started that way exits
+AUTOSTART_IDLE_EXIT_SECONDS = float(os.environ.get('JOB_RUNNER_IDLE_EXIT_SECONDS', '300'))
+
+
+def _print(data):
+    print(json.dumps(data))
+
+
+def _ensure_runner(queue: JobQueue):
+    if not AUTOSTART_RUNNER:
+        return
+    runner_id = queue.reserve_runner()
+    if runner_id is None:
+        return
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    # Detached, so it outlives this command and the route that ran it
+    subprocess.Popen(
+        [sys.executable, os.path.join(script_dir, 'jobs.py'), 'run', '--workers', str(DEFAULT_JOB_WORKERS),
+         '--runner-id', runner_id, '--idle-exit', str(AUTOSTART_IDLE_EXIT_SECONDS)],
+        cwd=script_dir, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        start_new_session=True
+    )
+
+
+async def _run(workers: int, runner_id: Optional[str] = None, idle_exit: Optional[float] = None):
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stop.set)
+    await run_jobs(JobQueue(), workers=workers, stop=stop, runner_id=runner_id, idle_exit=idle_exit)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Durable queue for long-running jobs")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    submit = commands.add_parser('submit', help="Queue a job from a JSON input file and print its id")
+    submit.add_argument('input_file')
+    submit.add_argument('--op', default='transcribe')
+    submit.add_argument('--priority', type=int, default=0, help="Higher runs first")
+
+    for name, description in (
+        ('status', "Print the state of a job"),
+        ('deliver', "Print the result of a finished job, only the first time it is asked for"),
+        ('release', "Make a delivered result available again"),
+    ):
+        command = commands.add_parser(name, help=description)
+        command.add_argument('job_id')
+
+    acknowledge = commands.add_parser('acknowledge', help="Record where a delivered result was stored")
+    acknowledge.add_argument('job_id')
+    acknowledge.add_argument('receipt', help="e.g. the id of the meeting it was saved as")
+
+    run = commands.add_parser('run', help="Run queued jobs until interrupted")
+    run.add_argument('--workers', type=int, default=DEFAULT_JOB_WORKERS, help="Jobs run at the same time")
+    run.add_argument('--runner-id', help="Id reserved for this runner by the command that started it")
+    run.add_argument('--idle-exit', type=float, help="Exit after this many seconds without jobs")
+
+    purge = commands.add_parser('purge', help="Delete delivered and failed jobs past retention")
+    purge.add_argument('--older-than-hours', type=float, default=JOB_RETENTION_HOURS)
+
+    args = parser.parse_args()
+
+    if args.command == 'run':
+        logging.basicConfig(
+            level=logging.INFO,
+            format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+            handlers=[
+                logging.FileHandler('jobs.log'),
+                logging.StreamHandler()
+            ]
+        )
+        asyncio.run(_run(args.workers, args.runner_id, args.idle_exit))
+        return
+
+    queue = JobQueue()
+    try:
+        if args.command == 'submit':
+            with open(args.input_file, 'r') as f:
+                payload = json.load(f)
+            try:
+                job_id = queue.submit(args.op, payload, priority=args.priority)
+            except QueueFull as e:
+                _print({"error": "queue_full", "details": str(e)})
+                sys.exit(2)
+            _ensure_runner(queue)
+            _print(queue.status(job_id))
+        elif args.command == 'status':
+            status = queue.status(args.job_id)
+            if status is None:
+                _print({"error": "not_found"})
+                sys.exit(3)
+            if status['state'] in ('queued', 'running'):
+                # Also brings jobs back after their runner died
+                _ensure_runner(queue)
+            _print(status)
+        elif args.command == 'deliver':
+            _print({"result": queue.deliver(args.job_id)})
+        elif args.command == 'release':
+            queue.release(args.job_id)
+            _print({"released": args.job_id})
+        elif args.command == 'acknowledge':
+            queue.acknowledge(args.job_id, args.receipt)
+            _print({"acknowledged": args.job_id, "receipt": args.receipt})
+        elif args.command == 'purge':
+            _print({"purged": queue.purge(args.older_than_hours)})
+    finally:
+        queue.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,3 @@
+from .indexing import content_ids, get_fingerprint, set_fingerprint, sync_chunks, transcript_fingerprint
+
+__all__ = ['content_ids', 'get_fingerprint', 'set_fingerprint', 'sync_chunks', 'transcript_fingerprint']
@@ -0,0 +1,191 @@
+import json
+import logging
+import math
+import os
+import struct
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from common.paths import data_path
+
+from .word_index import tokenize
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"BM25X1\n"
+# Standard Okapi parameters: term frequency saturation and length normalization
+K1 = 1.2
+B = 0.75
+
+
+def bm25_path(collection_name: str) -> str:
+    """
+    Location of the lexical index kept alongside a vector store collection
+    """
+    return data_path('bm25', f"{collection_name}.bm25")
+
+
+class BM25Index:
+    """
+    Okapi BM25 index over the chunks of one collection
+
+    Postings are stored column-wise like the word index: for each token, one
+    slice of a flat array of chunk numbers with the matching term
+    frequencies, so a query only touches the postings of its own terms.
+    Chunks are identified by the ids they have in the vector store.
+    """
+
+    def __init__(self, fingerprint: str, ids: List[str], vocabulary: List[str],
+                 lengths: array, offsets: array, postings: array, frequencies: array):
+        self.fingerprint = fingerprint
+        self.ids = ids
+        self.vocabulary = vocabulary
+        self.lengths = lengths
+        self.offsets = offsets
+        self.postings = postings
+        self.frequencies = frequencies
+        self.average_length = (sum(lengths) / len(lengths)) if len(lengths) else 0.0
+        self._token_ids = {token: token_id for token_id, token in enumerate(vocabulary)}
+
+    @classmethod
+    def build(cls, ids: List[str], texts: List[str], fingerprint: str) -> 'BM25Index':
+        """
+        Index chunk texts under their vector store ids
+        """
+        vocabulary: List[str] = []
+        token_ids: Dict[str, int] = {}
+        lengths = array('I')
+        # (token id, chunk number, frequency) for every distinct token of every chunk
+        entries: List[Tuple[int, int, int]] = []
+        for number, text in enumerate(texts):
+            tokens = tokenize(text)
+            lengths.append(len(tokens))
+            counts: Dict[int, int] = {}
+            for token in tokens:
+                if token not in token_ids:
+                    token_ids[token] = len(vocabulary)
+                    vocabulary.append(token)
+                token_id = token_ids[token]
+                counts[token_id] = counts.get(token_id, 0) + 1
+            entries.extend((token_id, number, count) for token_id, count in counts.items())
+
+        # Counting sort by token id keeps each token's chunks in document order
+        offsets = array('I', [0]) * (len(vocabulary) + 1)
+        for token_id, _, _ in entries:
+            offsets[token_id + 1] += 1
+        for token_id in range(len(vocabulary)):
+            offsets[token_id + 1] += offsets[token_id]
+        cursor = array('I', offsets[:-1])
+        postings = array('I', [0]) * len(entries)
+        frequencies = array('I', [0]) * len(entries)
+        for token_id, number, count in entries:
+            postings[cursor[token_id]] = number
+            frequencies[cursor[token_id]] = count
+            cursor[token_id] += 1
+
+        return cls(fingerprint, list(ids), vocabulary, lengths, offsets, postings, frequencies)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def search(self, query: str, limit: int, ids: Optional[Iterable[str]] = None) -> List[Tuple[str, float]]:
+        """
+        Best-scoring chunks for a query
+
+        Args:
+            ids: Only rank these chunks, e.g. the ones a metadata filter selected;
+                term statistics still cover the whole collection
+
+        Returns:
+            (chunk id, score) pairs, highest score first; chunks sharing no
+            term with the query are left out
+        """
+        total = len(self.ids)
+        if not total or limit <= 0:
+            return []
+        allowed = None
+        if ids is not None:
+            numbers = {chunk_id: number for number, chunk_id in enumerate(self.ids)}
+            allowed = {numbers[chunk_id] for chunk_id in ids if chunk_id in numbers}
+        scores: Dict[int, float] = {}
+        # A term repeated in the query counts once, so rephrasing does not skew the ranking
+        for token in dict.fromkeys(tokenize(query)):
+            token_id = self._token_ids.get(token)
+            if token_id is None:
+                continue
+            start, end = self.offsets[token_id], self.offsets[token_id + 1]
+            frequency = end - start
+            idf = math.log(1.0 + (total - frequency + 0.5) / (frequency + 0.5))
+            for position in range(start, end):
+                number = self.postings[position]
+                if allowed is not None and number not in allowed:
+                    continue
+                tf = self.frequencies[position]
+                norm = K1 * (1.0 - B + B * self.lengths[number] / self.average_length) if self.average_length else K1
+                scores[number] = scores.get(number, 0.0) + idf * tf * (K1 + 1.0) / (tf + norm)
+        best = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:limit]
+        return [(self.ids[number], score) for number, score in best]
+
+    def save(self, path: str):
+        """
+        Write the index to disk as a JSON header followed by the raw arrays
+        """
+        columns = [self.lengths, self.offsets, self.postings, self.frequencies]
+        header = json.dumps({
+            "fingerprint": self.fingerprint,
+            "ids": self.ids,
+            "vocabulary": self.vocabulary,
+            "columns": [[column.typecode, len(column)] for column in columns],
+        }).encode('utf-8')
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(MAGIC)
+            f.write(struct.pack('<I', len(header)))
+            f.write(header)
+            for column in columns:
+                column.tofile(f)
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> 'BM25Index':
+        with open(path, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"Not a BM25 index: {path}")
+            header_length = struct.unpack('<I', f.read(4))[0]
+            header = json.loads(f.read(header_length).decode('utf-8'))
+            columns = []
+            for typecode, length in header["columns"]:
+                column = array(typecode)
+                column.fromfile(f, length)
+                columns.append(column)
+        return cls(header["fingerprint"], header["ids"], header["vocabulary"], *columns)
+
+
+def load_current(path: str, fingerprint: str) -> Optional[BM25Index]:
+    """
+    Load a stored index if it was built from the transcript with this fingerprint
+    """
+    if not os.path.exists(path):
+        return None
+    try:
+        index = BM25Index.load(path)
+    except (OSError, ValueError, EOFError) as e:
+        logger.warning(f"Ignoring unreadable BM25 index {path}: {str(e)}")
+        return None
+    return index if index.fingerprint == fingerprint else None
+
+
+def reciprocal_rank_fusion(rankings: List[List[str]], limit: int, k: int = 60) -> List[str]:
+    """
+    Merge ranked id lists by reciprocal rank fusion
+
+    Each list contributes 1 / (k + rank) to the ids it holds, so ids ranked
+    well by several retrievers come first without comparing their raw
+    scores. Ties keep the order of the earlier lists.
+    """
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, item in enumerate(dict.fromkeys(ranking), start=1):
+            scores[item] = scores.get(item, 0.0) + 1.0 / (k + rank)
+    return sorted(scores, key=lambda item: -scores[item])[:limit]
@@ -0,0 +1,169 @@
+import logging
+import re
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, List, Optional
+
+from .segments import parse_formatted_transcript
+from .tokens import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# Bump when chunk boundaries, rendering or metadata change, so stored indexes are rebuilt
+CHUNKER_VERSION = 3
+# Default budgets, sized for the 256-token input limit of the MiniLM embedder
+CHUNK_TOKENS = 150
+OVERLAP_TOKENS = 30
+
+SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?])\s+')
+
+
+@dataclass
+class Chunk:
+    """
+    A run of consecutive transcript text with its time span and speakers
+    """
+    text: str
+    start: Optional[float]
+    end: Optional[float]
+    speakers: List[str] = field(default_factory=list)
+    tokens: int = 0
+
+    def metadata(self) -> Dict[str, Any]:
+        """
+        Chunk details as vector store metadata; speakers are a list so they can be filtered with $contains
+        """
+        metadata: Dict[str, Any] = {"tokens": self.tokens}
+        if self.start is not None:
+            metadata["start"] = float(self.start)
+        if self.end is not None:
+            metadata["end"] = float(self.end)
+        if self.speakers:
+            metadata["speakers"] = list(self.speakers)
+        return metadata
+
+
+@dataclass
+class _Unit:
+    segment: int
+    text: str
+    tokens: int
+
+
+def _format_timestamp(seconds: float) -> str:
+    minutes, seconds = divmod(int(seconds), 60)
+    return f"[{minutes:02d}:{seconds:02d}]"
+
+
+def _split_text(text: str, max_tokens: int) -> List[str]:
+    """
+    Split segment text into sentences, breaking oversized sentences on words
+    """
+    pieces = []
+    for sentence in SENTENCE_BOUNDARY.split(text.strip()):
+        if not sentence:
+            continue
+        if estimate_tokens(sentence) <= max_tokens:
+            pieces.append(sentence)
+            continue
+        words = sentence.split()
+        current: List[str] = []
+        current_tokens = 0
+        for word in words:
+            word_tokens = estimate_tokens(word) + 1
+            if current and current_tokens + word_tokens > max_tokens:
+                pieces.append(" ".join(current))
+                current = []
+                current_tokens = 0
+            current.append(word)
+            current_tokens += word_tokens
+        if current:
+            pieces.append(" ".join(current))
+    return pieces
+
+
+def _render(units: Deque[_Unit], segments: List[Dict[str, Any]]) -> Chunk:
+    """
+    Render units as transcript lines, one line per segment with its
+    original timestamp and speaker
+    """
+    lines = []
+    speakers: List[str] = []
+    tokens = 0
+    current_segment = None
+    current_parts: List[str] = []
+
+    def flush():
+        if current_segment is None:
+            return
+        segment = segments[current_segment]
+        prefix = []
+        if segment.get('start') is not None:
+            prefix.append(_format_timestamp(segment['start']))
+        if segment.get('speaker'):
+            prefix.append(f"{segment['speaker']}:")
+        lines.append(" ".join(prefix + [" ".join(current_parts)]))
+
+    for unit in units:
+        tokens += unit.tokens
+        if unit.segment != current_segment:
+            flush()
+            current_segment = unit.segment
+            current_parts = []
+            speaker = segments[unit.segment].get('speaker')
+            if speaker and speaker not in speakers:
+                speakers.append(speaker)
+        current_parts.append(unit.text)
+    flush()
+
+    first = segments[units[0].segment]
+    last = segments[units[-1].segment]
+    return Chunk(
+        text="\n".join(lines),
+        start=first.get('start'),
+        end=last.get('end') if last.get('end') is not None else last.get('start'),
+        speakers=speakers,
+        tokens=tokens
+    )
+
+
+def chunk_segments(segments: List[Dict[str, Any]], max_tokens: int = CHUNK_TOKENS,
+                   overlap_tokens: int = OVERLAP_TOKENS) -> List[Chunk]:
+    """
+    Split transcript segments into overlapping chunks in a single pass
+
+    Segments are broken into sentences, sentences are packed into chunks of
+    at most max_tokens, and each chunk repeats roughly the last
+    overlap_tokens of the previous one.
+    """
+    chunks: List[Chunk] = []
+    window: Deque[_Unit] = deque()
+    window_tokens = 0
+
+    for index, segment in enumerate(segments):
+        for text in _split_text(segment.get('text') or '', max_tokens):
+            unit = _Unit(index, text, estimate_tokens(text))
+            if window and window_tokens + unit.tokens > max_tokens:
+                chunks.append(_render(window, segments))
+                # Keep the tail of the chunk as overlap; each unit is dropped at most once
+                while window and window_tokens > overlap_tokens:
+                    window_tokens -= window.popleft().tokens
+                # Never let the overlap alone push the next unit over budget
+                while window and window_tokens + unit.tokens > max_tokens:
+                    window_tokens -= window.popleft().tokens
+            window.append(unit)
+            window_tokens += unit.tokens
+
+    if window:
+        chunks.append(_render(window, segments))
+
+    logger.info(f"Split transcript into {len(chunks)} chunks of up to {max_tokens} tokens with {overlap_tokens} overlap")
+    return chunks
+
+
+def chunk_transcript(transcript: str, max_tokens: int = CHUNK_TOKENS,
+                     overlap_tokens: int = OVERLAP_TOKENS) -> List[Chunk]:
+    """
+    Chunk a formatted transcript, recovering its segments first
+    """
+    return chunk_segments(parse_formatted_transcript(transcript), max_tokens, overlap_tokens)
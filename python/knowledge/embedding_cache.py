@@ -0,0 +1,92 @@
+import functools
+import hashlib
+import logging
+import os
+from typing import Any, Dict, List
+
+import numpy as np
+from chromadb.api.types import Documents, EmbeddingFunction, Embeddings
+from chromadb.utils import embedding_functions
+
+from common import metrics
+from common.disk_cache import DiskCache
+from common.paths import data_path
+
+logger = logging.getLogger(__name__)
+
+
+class CachedEmbeddingFunction(EmbeddingFunction):
+    """
+    Wraps an embedding function with a persistent cache keyed by
+    (model id, text hash), so each distinct chunk is embedded only once
+    across every collection, service and process
+    """
+
+    def __init__(self, embedding_function, model_id: str, cache: DiskCache):
+        self.embedding_function = embedding_function
+        self.model_id = model_id
+        self.cache = cache
+
+    def _key(self, text: str) -> str:
+        return f"{self.model_id}:{hashlib.sha256(text.encode('utf-8')).hexdigest()}"
+
+    def __call__(self, input: Documents) -> Embeddings:
+        keys = [self._key(text) for text in input]
+        cached = self.cache.get_many(keys)
+
+        # Embed each missing text once, even if it is repeated in the batch
+        missing: Dict[str, str] = {}
+        for key, text in zip(keys, input):
+            if key not in cached and key not in missing:
+                missing[key] = text
+
+        if missing:
+            with metrics.span('embedding', texts=len(missing), cached=len(input) - len(missing)):
+                computed = self.embedding_function(list(missing.values()))
+            encoded = [
+                (key, np.asarray(embedding, dtype=np.float32).tobytes())
+                for key, embedding in zip(missing, computed)
+            ]
+            self.cache.set_many(encoded)
+            cached.update(encoded)
+            logger.debug(f"Embedded {len(missing)} of {len(input)} texts, rest served from cache")
+
+        return [np.frombuffer(cached[key], dtype=np.float32).tolist() for key in keys]
+
+    def stats(self) -> Dict[str, int]:
+        return self.cache.stats()
+
+    # Chroma checks the name of a collection's embedding function against the
+    # one it persisted, so the wrapper reports the wrapped function's. Chroma
+    # cannot rebuild the cache from a config, so it is stored as a legacy function.
+    def name(self) -> str:
+        return self.embedding_function.name()
+
+    def get_config(self) -> Dict[str, Any]:
+        return self.embedding_function.get_config()
+
+    def is_legacy(self) -> bool:
+        return True
+
+    def default_space(self) -> str:
+        return self.embedding_function.default_space()
+
+    def supported_spaces(self) -> List[str]:
+        return self.embedding_function.supported_spaces()
+
+
+@functools.lru_cache(maxsize=None)
+def get_embedding_function() -> CachedEmbeddingFunction:
+    """
+    Get the process-wide cached default embedding function
+
+    Chat and analysis share this instance, so the model is loaded once per
+    process and embeddings are shared through the on-disk cache.
+    """
+    base = embedding_functions.DefaultEmbeddingFunction()
+    model_id = getattr(base, 'MODEL_NAME', type(base).__name__)
+    cache = DiskCache(
+        data_path('embedding_cache.sqlite3'),
+        max_bytes=int(os.environ.get('EMBEDDING_CACHE_MAX_MB', '512')) * 1024 * 1024
+    )
+    return CachedEmbeddingFunction(base, model_id, cache)
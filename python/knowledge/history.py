@@ -0,0 +1,216 @@
+import json
+import logging
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from common.paths import data_path
+
+logger = logging.getLogger(__name__)
+
+
+class ConversationStore:
+    """
+    Append-only chat history in SQLite
+
+    Messages are rows keyed by (conversation, sequence number), so appending
+    a turn and reading the last N messages cost the same however long the
+    conversation gets.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or data_path('chat_history.sqlite3')
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, timeout=30.0, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS conversations (
+                id TEXT PRIMARY KEY,
+                meeting_id TEXT NOT NULL,
+                created_at TEXT NOT NULL,
+                message_count INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE INDEX IF NOT EXISTS conversations_meeting ON conversations (meeting_id);
+            CREATE TABLE IF NOT EXISTS messages (
+                conversation_id TEXT NOT NULL,
+                seq INTEGER NOT NULL,
+                role TEXT NOT NULL,
+                content TEXT NOT NULL,
+                created_at TEXT NOT NULL,
+                PRIMARY KEY (conversation_id, seq)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS summaries (
+                conversation_id TEXT PRIMARY KEY,
+                upto_seq INTEGER NOT NULL,
+                summary TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS migrated_meetings (
+                meeting_id TEXT PRIMARY KEY,
+                migrated_at TEXT NOT NULL
+            );
+        """)
+
+    def create(self, conversation_id: str, meeting_id: str):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO conversations (id, meeting_id, created_at) VALUES (?, ?, ?)",
+                (conversation_id, meeting_id, datetime.now().isoformat())
+            )
+
+    def message_count(self, conversation_id: str) -> Optional[int]:
+        """
+        Number of messages in a conversation, or None if it does not exist
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT message_count FROM conversations WHERE id = ?", (conversation_id,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def append(self, conversation_id: str, messages: List[Dict[str, str]]) -> int:
+        """
+        Append messages to a conversation
+
+        Returns:
+            The number of messages in the conversation afterwards
+        """
+        now = datetime.now().isoformat()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT message_count FROM conversations WHERE id = ?", (conversation_id,)
+                ).fetchone()
+                if row is None:
+                    raise KeyError(f"Unknown conversation: {conversation_id}")
+                start = row[0]
+                self._conn.executemany(
+                    "INSERT INTO messages (conversation_id, seq, role, content, created_at) VALUES (?, ?, ?, ?, ?)",
+                    [(conversation_id, start + i, m["role"], m["content"], now) for i, m in enumerate(messages)]
+                )
+                self._conn.execute(
+                    "UPDATE conversations SET message_count = ? WHERE id = ?",
+                    (start + len(messages), conversation_id)
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return start + len(messages)
+
+    def recent(self, conversation_id: str, limit: int) -> List[Dict[str, str]]:
+        """
+        The last `limit` messages of a conversation, oldest first
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT role, content FROM messages WHERE conversation_id = ? ORDER BY seq DESC LIMIT ?",
+                (conversation_id, limit)
+            ).fetchall()
+        return [{"role": role, "content": content} for role, content in reversed(rows)]
+
+    def messages(self, conversation_id: str, start: int, end: int) -> List[Dict[str, str]]:
+        """
+        Messages with sequence numbers in [start, end), oldest first
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT role, content FROM messages WHERE conversation_id = ? AND seq >= ? AND seq < ? ORDER BY seq",
+                (conversation_id, start, end)
+            ).fetchall()
+        return [{"role": role, "content": content} for role, content in rows]
+
+    def get_summary(self, conversation_id: str) -> Tuple[Optional[str], int]:
+        """
+        The running summary of a conversation and the number of messages it covers
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT summary, upto_seq FROM summaries WHERE conversation_id = ?", (conversation_id,)
+            ).fetchone()
+        return (row[0], row[1]) if row else (None, 0)
+
+    def set_summary(self, conversation_id: str, upto_seq: int, summary: str):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO summaries (conversation_id, upto_seq, summary) VALUES (?, ?, ?)",
+                (conversation_id, upto_seq, summary)
+            )
+
+    def meeting_sizes(self) -> Dict[str, int]:
+        """
+        Bytes of message text stored for each meeting
+        """
+        with self._lock:
+            rows = self._conn.execute("""
+                SELECT c.meeting_id, COALESCE(SUM(LENGTH(m.content)), 0)
+                FROM conversations c LEFT JOIN messages m ON m.conversation_id = c.id
+                GROUP BY c.meeting_id
+            """).fetchall()
+        return dict(rows)
+
+    def delete_meeting(self, meeting_id: str) -> int:
+        """
+        Delete every conversation of a meeting
+
+        Returns:
+            The number of conversations deleted
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                ids = [row[0] for row in self._conn.execute(
+                    "SELECT id FROM conversations WHERE meeting_id = ?", (meeting_id,)
+                ).fetchall()]
+                for table, column in (("messages", "conversation_id"), ("summaries", "conversation_id"), ("conversations", "id")):
+                    self._conn.executemany(f"DELETE FROM {table} WHERE {column} = ?", [(i,) for i in ids])
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return len(ids)
+
+    def migrate_meeting(self, client, meeting_id: str):
+        """
+        Move a meeting's JSON-blob history out of its legacy Chroma collection
+
+        Runs once per meeting; the legacy collection is deleted afterwards.
+        """
+        with self._lock:
+            done = self._conn.execute(
+                "SELECT 1 FROM migrated_meetings WHERE meeting_id = ?", (meeting_id,)
+            ).fetchone()
+        if done:
+            return
+
+        collection_name = f"chat_history_{meeting_id}"
+        try:
+            legacy = client.get_collection(collection_name)
+        except Exception:
+            legacy = None
+
+        if legacy is not None:
+            records = legacy.get(include=["documents", "metadatas"])
+            migrated = 0
+            for conversation_id, document, metadata in zip(records['ids'], records['documents'], records['metadatas'] or []):
+                try:
+                    messages = json.loads(document) if document else []
+                except json.JSONDecodeError:
+                    logger.warning(f"Skipping unreadable history for conversation {conversation_id}")
+                    continue
+                if self.message_count(conversation_id) is not None:
+                    continue
+                self.create(conversation_id, (metadata or {}).get("meeting_id", meeting_id))
+                if messages:
+                    self.append(conversation_id, messages)
+                migrated += 1
+            client.delete_collection(collection_name)
+            logger.info(f"Migrated {migrated} conversations from {collection_name}")
+
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO migrated_meetings (meeting_id, migrated_at) VALUES (?, ?)",
+                (meeting_id, datetime.now().isoformat())
+            )
@@ -0,0 +1,105 @@
+import hashlib
+import json
+import logging
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Collection metadata key holding the fingerprint of the indexed transcript
+FINGERPRINT_KEY = "transcript_fingerprint"
+
+
+def transcript_fingerprint(transcript: str, **params: Any) -> str:
+    """
+    Fingerprint a transcript together with the parameters used to index it,
+    so a change to either forces a re-index
+    """
+    digest = hashlib.sha256()
+    digest.update(json.dumps(params, sort_keys=True).encode('utf-8'))
+    digest.update(b'\0')
+    digest.update(transcript.encode('utf-8'))
+    return digest.hexdigest()
+
+
+def content_ids(chunks: List[str]) -> List[str]:
+    """
+    Derive stable chunk ids from chunk content
+
+    Repeated chunks get an occurrence suffix so ids stay unique, and an edit
+    elsewhere in the transcript leaves the ids of untouched chunks unchanged.
+    """
+    ids = []
+    occurrences: Dict[str, int] = {}
+    for chunk in chunks:
+        digest = hashlib.sha256(chunk.encode('utf-8')).hexdigest()[:32]
+        count = occurrences.get(digest, 0)
+        occurrences[digest] = count + 1
+        ids.append(digest if count == 0 else f"{digest}_{count}")
+    return ids
+
+
+def get_fingerprint(collection) -> Optional[str]:
+    """
+    Get the transcript fingerprint stored on a collection, if any
+    """
+    return (collection.metadata or {}).get(FINGERPRINT_KEY)
+
+
+def set_fingerprint(collection, fingerprint: str):
+    """
+    Store the transcript fingerprint on a collection
+    """
+    # The distance function cannot be modified, so never send hnsw settings back
+    metadata = {key: value for key, value in (collection.metadata or {}).items() if not key.startswith("hnsw:")}
+    metadata[FINGERPRINT_KEY] = fingerprint
+    collection.modify(metadata=metadata)
+
+
+def sync_chunks(collection, chunks: List[str], metadatas: List[Dict[str, Any]], fingerprint: str) -> Dict[str, int]:
+    """
+    Bring a collection in line with a chunked transcript
+
+    Only chunks the collection does not hold yet are embedded; chunks that are
+    no longer part of the transcript are deleted.
+
+    Returns:
+        Counts of added, deleted, updated and unchanged chunks
+    """
+    ids = content_ids(chunks)
+    existing = collection.get(include=["metadatas"])
+    existing_metadata = dict(zip(existing['ids'], existing['metadatas'] or [None] * len(existing['ids'])))
+
+    wanted = set(ids)
+    stale_ids = [chunk_id for chunk_id in existing_metadata if chunk_id not in wanted]
+    if stale_ids:
+        collection.delete(ids=stale_ids)
+
+    new_positions = [i for i, chunk_id in enumerate(ids) if chunk_id not in existing_metadata]
+    if new_positions:
+        collection.add(
+            documents=[chunks[i] for i in new_positions],
+            ids=[ids[i] for i in new_positions],
+            metadatas=[metadatas[i] for i in new_positions]
+        )
+
+    # Metadata-only changes do not need new embeddings
+    changed_positions = [
+        i for i, chunk_id in enumerate(ids)
+        if chunk_id in existing_metadata and existing_metadata[chunk_id] != metadatas[i]
+    ]
+    if changed_positions:
+        collection.update(
+            ids=[ids[i] for i in changed_positions],
+            metadatas=[metadatas[i] for i in changed_positions]
+        )
+
+    set_fingerprint(collection, fingerprint)
+
+    stats = {
+        "added": len(new_positions),
+        "deleted": len(stale_ids),
+        "updated": len(changed_positions),
+        "unchanged": len(ids) - len(new_positions) - len(changed_positions),
+    }
+    logger.info(f"Synced collection {collection.name}: {stats}")
+    return stats
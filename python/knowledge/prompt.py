@@ -0,0 +1,101 @@
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from .tokens import estimate_tokens
+
+# Per-message overhead of the chat format (role markers, separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+@dataclass
+class Prompt:
+    """
+    Messages ready to send, with what went into them
+    """
+    messages: List[Dict[str, str]]
+    context: List[str]
+    history: List[Dict[str, str]]
+    usage: Dict[str, int] = field(default_factory=dict)
+
+
+class PromptBuilder:
+    """
+    Assembles chat prompts that fit a token budget
+
+    The system prompt, question and exact-match details are always sent.
+    Recent history goes in once, as chat messages, newest turns first until
+    its share of the budget is used; older turns are represented by the
+    running summary. Context chunks fill what is left, most relevant first.
+    """
+
+    def __init__(self, budget_tokens: int, history_share: float = 0.25):
+        self.budget_tokens = budget_tokens
+        self.history_share = history_share
+
+    def fit_history(self, history: List[Dict[str, str]]) -> List[Dict[str, str]]:
+        """
+        The longest suffix of the history that fits the history share, whole turns only
+        """
+        budget = int(self.budget_tokens * self.history_share)
+        kept = 0
+        used = 0
+        # Walk back one user/assistant pair at a time
+        for end in range(len(history), 0, -2):
+            turn = history[max(end - 2, 0):end]
+            tokens = sum(estimate_tokens(m["content"]) + MESSAGE_OVERHEAD_TOKENS for m in turn)
+            if used + tokens > budget:
+                break
+            used += tokens
+            kept = len(history) - max(end - 2, 0)
+        return history[len(history) - kept:] if kept else []
+
+    def build(self, system_prompt: str, question: str, instructions: str, context: List[str],
+              history: List[Dict[str, str]], summary: Optional[str] = None,
+              exact_match_info: str = "", scope: str = "") -> Prompt:
+        """
+        Build the messages for one question
+
+        Args:
+            system_prompt: System message
+            question: The user's question
+            instructions: Fixed guidance appended after the question
+            context: Candidate transcript chunks, most relevant first
+            history: Recent messages already trimmed with fit_history
+            summary: Running summary of the turns older than history
+            exact_match_info: Exact-match counts and timestamps
+            scope: Speakers and time range the context was limited to, if any
+        """
+        usage = {
+            "system": estimate_tokens(system_prompt) + MESSAGE_OVERHEAD_TOKENS,
+            "question": estimate_tokens(question) + estimate_tokens(instructions) + MESSAGE_OVERHEAD_TOKENS,
+            "exact_matches": estimate_tokens(exact_match_info),
+            "summary": estimate_tokens(summary) if summary else 0,
+            "history": sum(estimate_tokens(m["content"]) + MESSAGE_OVERHEAD_TOKENS for m in history),
+        }
+
+        remaining = self.budget_tokens - sum(usage.values())
+        included: List[str] = []
+        context_tokens = 0
+        for chunk in context:
+            tokens = estimate_tokens(chunk) + 1
+            if context_tokens + tokens > remaining:
+                # Keep going: a shorter, less relevant chunk may still fit
+                continue
+            included.append(chunk)
+            context_tokens += tokens
+        usage["context"] = context_tokens
+
+        heading = f"Context from transcript, limited to {scope}:" if scope else "Context from transcript:"
+        parts = [f"{heading}\n\n" + "\n\n".join(included)]
+        if exact_match_info:
+            parts.append(exact_match_info)
+        if summary:
+            parts.append(f"Summary of the earlier conversation:\n{summary}")
+        parts.append(f"Current question: {question}\n\n{instructions}")
+
+        messages = [{"role": "system", "content": system_prompt}]
+        messages.extend({"role": m["role"], "content": m["content"]} for m in history)
+        messages.append({"role": "user", "content": "\n\n".join(parts)})
+
+        usage["total"] = sum(usage.values())
+        return Prompt(messages=messages, context=included, history=history, usage=usage)
@@ -0,0 +1,185 @@
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional
+
+# Seconds either side of a single moment ("around 12:30")
+AROUND_SECONDS = 60.0
+
+NUMBER_WORDS = {
+    "a": 1, "an": 1, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7,
+    "eight": 8, "nine": 9, "ten": 10, "eleven": 11, "twelve": 12, "thirteen": 13, "fourteen": 14,
+    "fifteen": 15, "sixteen": 16, "seventeen": 17, "eighteen": 18, "nineteen": 19, "twenty": 20,
+    "thirty": 30, "forty": 40, "forty five": 45, "fifty": 50, "sixty": 60, "ninety": 90,
+    "half an": 0.5, "half a": 0.5, "half": 0.5,
+}
+UNIT_SECONDS = {"h": 3600.0, "m": 60.0, "s": 1.0}
+
+_AMOUNT = r'\d+(?:\.\d+)?|' + '|'.join(sorted((re.escape(word) for word in NUMBER_WORDS), key=len, reverse=True))
+_UNIT = r'hours?|hrs?|minutes?|mins?|seconds?|secs?'
+# "10 minutes", "ten minutes", "half an hour"; the amount may be left out after first/last ("the first hour")
+_DURATION = rf'(?:(?:{_AMOUNT})[\s-]*)?(?:{_UNIT})\b'
+_TIMESTAMP = r'\d{1,3}:\d{2}(?::\d{2})?'
+_MOMENT = rf'(?:{_TIMESTAMP}|(?:{_AMOUNT})[\s-]*(?:{_UNIT})\b)'
+
+FIRST = re.compile(rf'\b(?:(?:in|during)\s+)?(?:the\s+)?(?:first|opening)\s+({_DURATION})', re.IGNORECASE)
+LAST = re.compile(rf'\b(?:(?:in|during)\s+)?(?:the\s+)?(?:last|final|closing)\s+({_DURATION})', re.IGNORECASE)
+BETWEEN = re.compile(rf'\b(?:between|from)\s+(?:the\s+)?({_MOMENT})(?:\s+mark)?\s+(?:and|to|until|till|through)\s+(?:the\s+)?({_MOMENT})(?:\s+mark)?', re.IGNORECASE)
+AFTER = re.compile(rf'\b(?:after|since|past)\s+(?:the\s+)?({_MOMENT})(?:\s+mark)?', re.IGNORECASE)
+BEFORE = re.compile(rf'\b(?:before|until|by)\s+(?:the\s+)?({_MOMENT})(?:\s+mark)?', re.IGNORECASE)
+AROUND = re.compile(rf'\b(?:at|around|near)\s+(?:the\s+)?({_TIMESTAMP})', re.IGNORECASE)
+# Diarized labels such as "SPEAKER_01", referred to as "speaker 1"
+NUMBERED_SPEAKER = re.compile(r'^speaker[\s_#-]*(\d+)$', re.IGNORECASE)
+SPEAKER_MENTION = re.compile(r'\bspeaker[\s_#-]*(\d+)\b')
+# Words of a speaker label too generic to identify the speaker
+GENERIC_LABEL_WORDS = {"speaker", "unknown", "person", "voice", "the"}
+
+
+@dataclass
+class QueryScope:
+    """
+    The part of a transcript a question is about: speakers and a time range in seconds
+
+    query is the question without its time constraints, so that timestamps
+    and durations do not take part in the text searches themselves.
+    """
+    speakers: List[str] = field(default_factory=list)
+    start: Optional[float] = None
+    end: Optional[float] = None
+    query: str = ""
+
+    def __bool__(self) -> bool:
+        return bool(self.speakers) or self.start is not None or self.end is not None
+
+    def where(self) -> Optional[Dict[str, Any]]:
+        """
+        Vector store filter selecting the chunks that overlap the scope
+        """
+        clauses: List[Dict[str, Any]] = []
+        if self.start:
+            clauses.append({"end": {"$gte": self.start}})
+        if self.end is not None:
+            clauses.append({"start": {"$lte": self.end}})
+        if self.speakers:
+            speaker_clauses = [{"speakers": {"$contains": speaker}} for speaker in self.speakers]
+            clauses.append(speaker_clauses[0] if len(speaker_clauses) == 1 else {"$or": speaker_clauses})
+        if not clauses:
+            return None
+        return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+    def describe(self) -> str:
+        parts = []
+        if self.speakers:
+            parts.append(", ".join(self.speakers))
+        if self.start is not None or self.end is not None:
+            parts.append(f"{_format_timestamp(self.start or 0.0)}-{_format_timestamp(self.end) if self.end is not None else 'end'}")
+        return "; ".join(parts)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"speakers": self.speakers, "start": self.start, "end": self.end}
+
+
+def _format_timestamp(seconds: float) -> str:
+    minutes, seconds = divmod(int(seconds), 60)
+    return f"[{minutes:02d}:{seconds:02d}]"
+
+
+def _seconds(moment: str) -> Optional[float]:
+    """
+    Seconds from the start of the recording for "12:30", "1:02:00", "ten minutes" or "half an hour"
+    """
+    moment = moment.strip().lower()
+    if re.fullmatch(_TIMESTAMP, moment):
+        value = 0.0
+        for part in moment.split(':'):
+            value = value * 60 + int(part)
+        return value
+    match = re.fullmatch(rf'(?:({_AMOUNT})[\s-]*)?({_UNIT})', moment)
+    if not match:
+        return None
+    amount, unit = match.groups()
+    if amount is None:
+        number = 1.0
+    elif amount in NUMBER_WORDS:
+        number = float(NUMBER_WORDS[amount])
+    else:
+        number = float(amount)
+    return number * UNIT_SECONDS[unit[0]]
+
+
+def _mentioned_speakers(query: str, speakers: Iterable[Optional[str]]) -> List[str]:
+    """
+    Speaker labels of the transcript that the question refers to
+    """
+    mentioned_numbers = {int(number) for number in SPEAKER_MENTION.findall(query)}
+    query_words = set(re.findall(r'[a-z0-9]+', query))
+    matches = []
+    for speaker in speakers:
+        if not speaker:
+            continue
+        numbered = NUMBERED_SPEAKER.match(speaker.strip())
+        if numbered:
+            if int(numbered.group(1)) in mentioned_numbers:
+                matches.append(speaker)
+            continue
+        # Named labels ("Detective Morris") match on any distinctive word
+        words = [word for word in re.findall(r'[a-z0-9]+', speaker.lower()) if len(word) > 2 and word not in GENERIC_LABEL_WORDS]
+        if words and query_words.intersection(words):
+            matches.append(speaker)
+    return matches
+
+
+def parse_scope(query: str, speakers: Iterable[Optional[str]] = (), duration: Optional[float] = None) -> QueryScope:
+    """
+    Recognize speaker and time constraints in a question
+
+    Args:
+        query: The question as asked
+        speakers: Speaker labels used in the transcript
+        duration: Length of the recording in seconds, needed for "the last ten minutes"
+    """
+    scope = QueryScope(speakers=_mentioned_speakers(query.lower(), speakers))
+    text = query
+
+    starts: List[float] = []
+    ends: List[float] = []
+    for match in FIRST.finditer(text):
+        length = _seconds(match.group(1))
+        if length is not None:
+            starts.append(0.0)
+            ends.append(length)
+    if duration:
+        for match in LAST.finditer(text):
+            length = _seconds(match.group(1))
+            if length is not None:
+                starts.append(max(duration - length, 0.0))
+    for match in BETWEEN.finditer(text):
+        low, high = _seconds(match.group(1)), _seconds(match.group(2))
+        if low is not None and high is not None:
+            starts.append(min(low, high))
+            ends.append(max(low, high))
+    # The bounds of a range are not read again as single after/before constraints
+    remainder = BETWEEN.sub(' ', text)
+    for match in AFTER.finditer(remainder):
+        moment = _seconds(match.group(1))
+        if moment is not None:
+            starts.append(moment)
+    for match in BEFORE.finditer(remainder):
+        moment = _seconds(match.group(1))
+        if moment is not None:
+            ends.append(moment)
+    for match in AROUND.finditer(remainder):
+        moment = _seconds(match.group(1))
+        starts.append(max(moment - AROUND_SECONDS, 0.0))
+        ends.append(moment + AROUND_SECONDS)
+    for pattern in (FIRST, LAST, AFTER, BEFORE, AROUND):
+        remainder = pattern.sub(' ', remainder)
+    scope.query = re.sub(r'\s+', ' ', remainder).strip() or query
+
+    # Several constraints narrow each other down
+    if starts:
+        scope.start = max(starts)
+    if ends:
+        scope.end = min(ends)
+    if scope.start is not None and scope.end is not None and scope.start > scope.end:
+        scope.start, scope.end = None, None
+    return scope
@@ -0,0 +1,44 @@
+import re
+from typing import Any, Dict, List
+
+# "SPEAKER_00:" heading a block of dialogue in the formatted transcript
+SPEAKER_LINE = re.compile(r'^(\S.*):\s*$')
+# "    [MM:SS] text" dialogue line; minutes may exceed two digits
+DIALOGUE_LINE = re.compile(r'^\s+\[(\d+):(\d{2})\]\s?(.*)$')
+
+
+def parse_formatted_transcript(transcript: str) -> List[Dict[str, Any]]:
+    """
+    Recover timed, speaker-labelled segments from a formatted transcript
+
+    Each segment ends where the next one starts; the last one gets the same
+    length as its predecessor. Text without any timestamped dialogue comes
+    back as a single untimed segment.
+    """
+    segments: List[Dict[str, Any]] = []
+    speaker = None
+    for line in transcript.splitlines():
+        dialogue = DIALOGUE_LINE.match(line)
+        if dialogue:
+            minutes, seconds, text = dialogue.groups()
+            segments.append({
+                "speaker": speaker,
+                "start": float(int(minutes) * 60 + int(seconds)),
+                "end": None,
+                "text": text.strip(),
+            })
+            continue
+        heading = SPEAKER_LINE.match(line)
+        if heading:
+            speaker = heading.group(1).strip()
+
+    if not segments:
+        text = transcript.strip()
+        return [{"speaker": None, "start": None, "end": None, "text": text}] if text else []
+
+    for current, following in zip(segments, segments[1:]):
+        current["end"] = max(following["start"], current["start"])
+    last = segments[-1]
+    previous_length = segments[-2]["end"] - segments[-2]["start"] if len(segments) > 1 else 0.0
+    last["end"] = last["start"] + previous_length
+    return segments
@@ -0,0 +1,381 @@
+import fcntl
+import logging
+import os
+import re
+import shutil
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from common.paths import data_path
+
+from .bm25 import bm25_path
+
+logger = logging.getLogger(__name__)
+
+# Disk budget of the vector store together with its BM25 indexes
+MAX_BYTES = int(float(os.environ.get('CHROMA_MAX_MB', '2048')) * 2**20)
+# Meeting indexes used more recently than this are never evicted, whatever the budget
+MIN_IDLE_SECONDS = float(os.environ.get('CHROMA_EVICT_IDLE_HOURS', '24')) * 3600
+
+MEETING_PREFIX = "meeting_"
+# Left behind by analysis runs that failed before dropping their temporary collection
+ANALYSIS_PREFIX = "analysis_"
+# Per-meeting chat history from before the history store
+LEGACY_HISTORY_PREFIX = "chat_history_"
+SEGMENT_DIRECTORY = re.compile(r'^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$')
+
+# Open lock files of the stores this process uses, by path
+_held_locks: Dict[str, Any] = {}
+
+
+def _store_lock_path() -> str:
+    return data_path('chromadb.lock')
+
+
+def hold_store():
+    """
+    Mark the vector store as open in this process until it exits
+
+    Every process that opens the store holds this lock shared, and compact()
+    only runs once it can take it exclusively, so it never removes files or
+    vacuums the database under a running service.
+    """
+    path = _store_lock_path()
+    if path in _held_locks:
+        return
+    lock_file = open(path, 'a')
+    fcntl.flock(lock_file, fcntl.LOCK_SH)
+    _held_locks[path] = lock_file
+
+
+def _lexical_directory() -> str:
+    return os.path.dirname(bm25_path(MEETING_PREFIX))
+
+
+def _path_bytes(path: str) -> int:
+    """
+    Size of a file, or of every file below a directory
+    """
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+class StorageManager:
+    """
+    Keeps the ChromaDB store within a disk budget
+
+    Records when each meeting index was last used, evicts the least
+    recently used idle ones once the store outgrows max_bytes, removes
+    collections and files nothing refers to any more, and compacts the
+    underlying SQLite file. An evicted meeting is re-indexed the next time
+    it is opened, mostly from the embedding cache.
+
+    Collection sizes combine the collection's vector segment on disk with
+    an estimate of its rows in chroma.sqlite3 (documents and metadata).
+    """
+
+    def __init__(self, client, persist_directory: Optional[str] = None, path: Optional[str] = None,
+                 max_bytes: int = MAX_BYTES, min_idle_seconds: float = MIN_IDLE_SECONDS):
+        """
+        Args:
+            client: ChromaDB client of the store
+            persist_directory: Directory the client persists to
+            path: SQLite file recording collection use
+            max_bytes: Disk budget of the store and its BM25 indexes
+            min_idle_seconds: Time a meeting index must go unused before it may be evicted
+        """
+        self.client = client
+        self.persist_directory = os.path.abspath(persist_directory or data_path('chromadb'))
+        self.max_bytes = max_bytes
+        self.min_idle_seconds = min_idle_seconds
+        self.path = path or data_path('storage.sqlite3')
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, timeout=30.0, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS meetings (
+                meeting_id TEXT PRIMARY KEY,
+                accessed_at REAL NOT NULL,
+                word_index TEXT,
+                evicted_at REAL
+            )
+        """)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def touch(self, meeting_id: str, word_index: Optional[str] = None) -> bool:
+        """
+        Record that a meeting's index is being used
+
+        Returns:
+            True if the index had been evicted and is about to be rebuilt
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT evicted_at FROM meetings WHERE meeting_id = ?", (meeting_id,)).fetchone()
+            self._conn.execute("""
+                INSERT INTO meetings (meeting_id, accessed_at, word_index) VALUES (?, ?, ?)
+                ON CONFLICT (meeting_id) DO UPDATE SET
+                    accessed_at = excluded.accessed_at,
+                    word_index = COALESCE(excluded.word_index, meetings.word_index),
+                    evicted_at = NULL
+            """, (meeting_id, time.time(), word_index))
+        return bool(row and row[0] is not None)
+
+    def _tracked(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute("SELECT meeting_id, accessed_at, word_index, evicted_at FROM meetings").fetchall()
+        return {
+            meeting_id: {"accessed_at": accessed_at, "word_index": word_index, "evicted_at": evicted_at}
+            for meeting_id, accessed_at, word_index, evicted_at in rows
+        }
+
+    def _collection_names(self) -> List[str]:
+        return [getattr(collection, 'name', collection) for collection in self.client.list_collections()]
+
+    def collection_sizes(self) -> Dict[str, int]:
+        """
+        Approximate bytes on disk of each collection
+        """
+        database = os.path.join(self.persist_directory, 'chroma.sqlite3')
+        if not os.path.exists(database):
+            return {}
+        sizes: Dict[str, int] = {}
+        try:
+            conn = sqlite3.connect(f"file:{database}?mode=ro", uri=True, timeout=30.0)
+            try:
+                names = dict(conn.execute("SELECT id, name FROM collections").fetchall())
+                for segment_id, collection_id in conn.execute("SELECT id, collection FROM segments").fetchall():
+                    name = names.get(collection_id)
+                    if name is not None:
+                        sizes[name] = sizes.get(name, 0) + _path_bytes(os.path.join(self.persist_directory, segment_id))
+                rows = conn.execute("""
+                    SELECT s.collection,
+                           SUM(COALESCE(LENGTH(m.string_value), 0)
+                               + CASE WHEN m.string_value IS NULL THEN 8 ELSE 0 END
+                               + LENGTH(m.key))
+                    FROM embeddings e
+                    JOIN segments s ON s.id = e.segment_id
+                    JOIN embedding_metadata m ON m.id = e.id
+                    GROUP BY s.collection
+                """).fetchall()
+                for collection_id, row_bytes in rows:
+                    name = names.get(collection_id)
+                    if name is not None:
+                        sizes[name] = sizes.get(name, 0) + (row_bytes or 0)
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            logger.warning(f"Could not read collection sizes from {database}: {str(e)}")
+        return sizes
+
+    def store_bytes(self) -> int:
+        """
+        Bytes on disk of the vector store and the BM25 indexes
+        """
+        return _path_bytes(self.persist_directory) + _path_bytes(_lexical_directory())
+
+    def report(self, history_store=None) -> Dict[str, Any]:
+        """
+        On-disk size of each meeting: vector index, BM25 index, word index and chat history
+        """
+        sizes = self.collection_sizes()
+        tracked = self._tracked()
+        history = history_store.meeting_sizes() if history_store is not None else {}
+        meeting_ids = set(tracked) | set(history) | {
+            name[len(MEETING_PREFIX):] for name in sizes if name.startswith(MEETING_PREFIX)
+        }
+
+        meetings = []
+        for meeting_id in sorted(meeting_ids):
+            record = tracked.get(meeting_id, {})
+            word_index = record.get("word_index")
+            entry = {
+                "meeting_id": meeting_id,
+                "vector_bytes": sizes.get(f"{MEETING_PREFIX}{meeting_id}", 0) + sizes.get(f"{LEGACY_HISTORY_PREFIX}{meeting_id}", 0),
+                "lexical_bytes": _path_bytes(bm25_path(f"{MEETING_PREFIX}{meeting_id}")),
+                "word_index_bytes": _path_bytes(word_index) if word_index else 0,
+                "history_bytes": history.get(meeting_id, 0),
+                "accessed_at": record.get("accessed_at"),
+                "evicted": record.get("evicted_at") is not None,
+            }
+            entry["bytes"] = sum(entry[key] for key in ("vector_bytes", "lexical_bytes", "word_index_bytes", "history_bytes"))
+            meetings.append(entry)
+
+        meeting_collections = {f"{prefix}{meeting_id}" for meeting_id in meeting_ids for prefix in (MEETING_PREFIX, LEGACY_HISTORY_PREFIX)}
+        return {
+            "store_bytes": self.store_bytes(),
+            "max_bytes": self.max_bytes,
+            "meetings": meetings,
+            "other_collections": {name: size for name, size in sizes.items() if name not in meeting_collections},
+        }
+
+    def _delete_collection(self, name: str) -> bool:
+        try:
+            self.client.delete_collection(name)
+            return True
+        except Exception as e:
+            logger.debug(f"Collection {name} not deleted: {str(e)}")
+            return False
+
+    def _remove_file(self, path: Optional[str]):
+        if path and os.path.exists(path):
+            os.remove(path)
+
+    def evict(self, meeting_id: str):
+        """
+        Drop a meeting's vector and BM25 indexes; they are rebuilt on next use
+
+        The word index and chat history are kept: the word index holds the
+        transcription's word timings, which the formatted transcript alone
+        cannot restore.
+        """
+        self._delete_collection(f"{MEETING_PREFIX}{meeting_id}")
+        self._remove_file(bm25_path(f"{MEETING_PREFIX}{meeting_id}"))
+        with self._lock:
+            self._conn.execute("""
+                INSERT INTO meetings (meeting_id, accessed_at, evicted_at) VALUES (?, 0, ?)
+                ON CONFLICT (meeting_id) DO UPDATE SET evicted_at = excluded.evicted_at
+            """, (meeting_id, time.time()))
+        logger.info(f"Evicted index of meeting {meeting_id}")
+
+    def enforce_budget(self) -> List[str]:
+        """
+        Evict idle meeting indexes, least recently used first, until the store fits its budget
+
+        Meetings indexed before access was tracked count as the least recently used.
+        Deleted collections keep their space until compact() runs, which is
+        left to the caller so that it runs outside any request.
+
+        Returns:
+            The ids of the evicted meetings
+        """
+        total = self.store_bytes()
+        if total <= self.max_bytes:
+            return []
+
+        sizes = self.collection_sizes()
+        tracked = self._tracked()
+        cutoff = time.time() - self.min_idle_seconds
+        candidates = []
+        for name, size in sizes.items():
+            if not name.startswith(MEETING_PREFIX):
+                continue
+            meeting_id = name[len(MEETING_PREFIX):]
+            accessed_at = tracked.get(meeting_id, {}).get("accessed_at") or 0.0
+            if accessed_at < cutoff:
+                candidates.append((accessed_at, meeting_id, size + _path_bytes(bm25_path(name))))
+        candidates.sort()
+
+        # Evict down to 90% of the budget so eviction does not run on every new meeting
+        target = int(self.max_bytes * 0.9)
+        evicted = []
+        for _, meeting_id, size in candidates:
+            if total <= target:
+                break
+            self.evict(meeting_id)
+            evicted.append(meeting_id)
+            total -= size
+        if total > self.max_bytes:
+            logger.warning(f"Vector store uses about {total} bytes, over its budget of {self.max_bytes}, with no idle meeting left to evict")
+        return evicted
+
+    def sweep(self, history_store=None) -> Dict[str, int]:
+        """
+        Remove what no meeting refers to any more
+
+        Deletes leftover analysis collections and BM25 indexes without a
+        collection, forgets meetings whose index is gone without having been
+        evicted, and moves legacy chat history collections into the history
+        store when one is given.
+
+        Returns:
+            Counts of what was removed
+        """
+        names = self._collection_names()
+        counts = {"analysis_collections": 0, "legacy_history_collections": 0, "lexical_indexes": 0, "forgotten_meetings": 0}
+        for name in names:
+            if name.startswith(ANALYSIS_PREFIX) and self._delete_collection(name):
+                counts["analysis_collections"] += 1
+            elif name.startswith(LEGACY_HISTORY_PREFIX) and history_store is not None:
+                history_store.migrate_meeting(self.client, name[len(LEGACY_HISTORY_PREFIX):])
+                counts["legacy_history_collections"] += 1
+
+        existing = set(names)
+        lexical_directory = _lexical_directory()
+        for filename in os.listdir(lexical_directory) if os.path.isdir(lexical_directory) else []:
+            if filename.endswith('.bm25') and filename[:-len('.bm25')] not in existing:
+                os.remove(os.path.join(lexical_directory, filename))
+                counts["lexical_indexes"] += 1
+
+        for meeting_id, record in self._tracked().items():
+            if record["evicted_at"] is None and f"{MEETING_PREFIX}{meeting_id}" not in existing:
+                with self._lock:
+                    self._conn.execute("DELETE FROM meetings WHERE meeting_id = ?", (meeting_id,))
+                counts["forgotten_meetings"] += 1
+        logger.info(f"Swept vector store: {counts}")
+        return counts
+
+    def drop(self, meeting_id: str, history_store=None):
+        """
+        Delete everything stored for a meeting, e.g. once the meeting itself is deleted
+        """
+        self._delete_collection(f"{MEETING_PREFIX}{meeting_id}")
+        self._delete_collection(f"{LEGACY_HISTORY_PREFIX}{meeting_id}")
+        self._remove_file(bm25_path(f"{MEETING_PREFIX}{meeting_id}"))
+        self._remove_file(self._tracked().get(meeting_id, {}).get("word_index"))
+        if history_store is not None:
+            history_store.delete_meeting(meeting_id)
+        with self._lock:
+            self._conn.execute("DELETE FROM meetings WHERE meeting_id = ?", (meeting_id,))
+        logger.info(f"Dropped all data of meeting {meeting_id}")
+
+    def compact(self) -> Dict[str, int]:
+        """
+        Give the space of deleted collections back to the file system
+
+        Removes vector segment directories no collection uses (ChromaDB keeps
+        them after a collection is deleted) and vacuums chroma.sqlite3. Skipped
+        while any other process has the store open (see hold_store), such as
+        the worker pool: a collection it creates meanwhile would lose its
+        segment directory, and VACUUM locks the database it is using.
+
+        Returns:
+            Store size before and after, and whether the store was compacted
+        """
+        before = self.store_bytes()
+        with open(_store_lock_path(), 'a') as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                logger.warning("Vector store is open in another process, e.g. the worker pool; skipping compaction")
+                return {"before_bytes": before, "after_bytes": before, "compacted": False}
+            database = os.path.join(self.persist_directory, 'chroma.sqlite3')
+            if os.path.exists(database):
+                conn = sqlite3.connect(database, timeout=30.0, isolation_level=None)
+                try:
+                    segments = {row[0] for row in conn.execute("SELECT id FROM segments").fetchall()}
+                    for name in os.listdir(self.persist_directory):
+                        path = os.path.join(self.persist_directory, name)
+                        if SEGMENT_DIRECTORY.match(name) and os.path.isdir(path) and name not in segments:
+                            shutil.rmtree(path, ignore_errors=True)
+                    conn.execute("VACUUM")
+                except sqlite3.Error as e:
+                    logger.warning(f"Could not compact {database}: {str(e)}")
+                finally:
+                    conn.close()
+        after = self.store_bytes()
+        logger.info(f"Compacted vector store from {before} to {after} bytes")
+        return {"before_bytes": before, "after_bytes": after, "compacted": True}
@@ -0,0 +1,25 @@
+import functools
+
+try:
+    import tiktoken
+except ImportError:  # optional, fall back to a character heuristic
+    tiktoken = None
+
+# Rough characters-per-token ratio for English text with GPT tokenizers
+CHARS_PER_TOKEN = 4
+
+
+@functools.lru_cache(maxsize=None)
+def _encoding():
+    return tiktoken.get_encoding("cl100k_base")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Count tokens with tiktoken when installed, otherwise estimate from length
+    """
+    if not text:
+        return 0
+    if tiktoken is not None:
+        return len(_encoding().encode(text, disallowed_special=()))
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
@@ -0,0 +1,274 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import struct
+from array import array
+from bisect import bisect_right
+from typing import Any, Collection, Dict, List, Optional
+
+from common.paths import data_path
+
+logger = logging.getLogger(__name__)
+
+TOKEN_PATTERN = re.compile(r"[\w']+")
+MAGIC = b"WIDX1\n"
+# Upper bound on the time given to one word when spreading a segment over its words
+MAX_SECONDS_PER_WORD = 1.0
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split text into normalized tokens: lowercase, edge apostrophes removed
+    """
+    tokens = []
+    for match in TOKEN_PATTERN.findall(text.lower()):
+        token = match.strip("'")
+        if token:
+            tokens.append(token)
+    return tokens
+
+
+def word_index_path(transcript: str) -> str:
+    """
+    Location of the word index for a transcript, addressed by its content
+    """
+    digest = hashlib.sha256(transcript.encode('utf-8')).hexdigest()
+    return data_path('word_index', f"{digest}.widx")
+
+
+class WordIndex:
+    """
+    Positional inverted index over every word of a transcript
+
+    Words are stored column-wise in flat arrays (token id, start, end,
+    speaker id); the postings for each token are one slice of a single
+    array, so counts are O(1) and phrase lookups only touch the positions
+    of the phrase's first token.
+    """
+
+    def __init__(self, vocabulary: List[str], speakers: List[Optional[str]], tokens: array,
+                 starts: array, ends: array, speaker_ids: array, offsets: array, postings: array):
+        self.vocabulary = vocabulary
+        self.speakers = speakers
+        self.tokens = tokens
+        self.starts = starts
+        self.ends = ends
+        self.speaker_ids = speaker_ids
+        self.offsets = offsets
+        self.postings = postings
+        self._token_ids = {token: token_id for token_id, token in enumerate(vocabulary)}
+        self._duration: Optional[float] = None
+
+    @classmethod
+    def from_segments(cls, segments: List[Dict[str, Any]], words: Optional[List[Dict[str, Any]]] = None) -> 'WordIndex':
+        """
+        Build the index from transcription segments
+
+        Word-level timestamps are used where present (inside segments or as a
+        separate word list); otherwise each segment's time span is divided
+        evenly over its words.
+        """
+        vocabulary: List[str] = []
+        token_ids: Dict[str, int] = {}
+        speakers: List[Optional[str]] = []
+        speaker_lookup: Dict[Optional[str], int] = {}
+        tokens = array('I')
+        starts = array('f')
+        ends = array('f')
+        speaker_ids = array('H')
+
+        def add(text: str, start: float, end: float, speaker: Optional[str]):
+            parts = tokenize(text)
+            if not parts:
+                return
+            if speaker not in speaker_lookup:
+                speaker_lookup[speaker] = len(speakers)
+                speakers.append(speaker)
+            step = min((end - start) / len(parts), MAX_SECONDS_PER_WORD) if end > start else 0.0
+            for position, token in enumerate(parts):
+                if token not in token_ids:
+                    token_ids[token] = len(vocabulary)
+                    vocabulary.append(token)
+                tokens.append(token_ids[token])
+                starts.append(start + position * step)
+                ends.append(start + (position + 1) * step)
+                speaker_ids.append(speaker_lookup[speaker])
+
+        segment_starts = [segment.get('start') or 0.0 for segment in segments]
+        if words:
+            # Attribute free-standing words to the segment they fall in
+            for word in words:
+                speaker = word.get('speaker')
+                if speaker is None and segments:
+                    position = max(bisect_right(segment_starts, word.get('start') or 0.0) - 1, 0)
+                    speaker = segments[position].get('speaker')
+                add(word.get('word', ''), word.get('start') or 0.0, word.get('end') or 0.0, speaker)
+        else:
+            for segment in segments:
+                speaker = segment.get('speaker')
+                if segment.get('words'):
+                    for word in segment['words']:
+                        add(word.get('word', ''), word.get('start') or 0.0, word.get('end') or 0.0, word.get('speaker', speaker))
+                else:
+                    start = segment.get('start') or 0.0
+                    add(segment.get('text', ''), start, segment.get('end') or start, speaker)
+
+        # Counting sort of positions by token id gives the postings in one pass
+        offsets = array('I', [0]) * (len(vocabulary) + 1)
+        for token_id in tokens:
+            offsets[token_id + 1] += 1
+        for token_id in range(len(vocabulary)):
+            offsets[token_id + 1] += offsets[token_id]
+        cursor = array('I', offsets[:-1])
+        postings = array('I', [0]) * len(tokens)
+        for position, token_id in enumerate(tokens):
+            postings[cursor[token_id]] = position
+            cursor[token_id] += 1
+
+        return cls(vocabulary, speakers, tokens, starts, ends, speaker_ids, offsets, postings)
+
+    def __len__(self) -> int:
+        return len(self.tokens)
+
+    def _positions(self, token: str) -> memoryview:
+        token_id = self._token_ids.get(token)
+        if token_id is None:
+            return memoryview(array('I'))
+        return memoryview(self.postings)[self.offsets[token_id]:self.offsets[token_id + 1]]
+
+    def find(self, phrase: str) -> List[int]:
+        """
+        Positions of the first word of every occurrence of a word or phrase
+        """
+        terms = tokenize(phrase)
+        if not terms:
+            return []
+        term_ids = [self._token_ids.get(term) for term in terms]
+        if None in term_ids:
+            return []
+        first = self._positions(terms[0])
+        if len(terms) == 1:
+            return list(first)
+
+        total = len(self.tokens)
+        matches = []
+        for position in first:
+            if position + len(terms) > total:
+                break
+            if all(self.tokens[position + k] == term_ids[k] for k in range(1, len(terms))):
+                matches.append(position)
+        return matches
+
+    def duration(self) -> float:
+        """
+        End of the last word, in seconds
+        """
+        if self._duration is None:
+            self._duration = max(self.ends) if len(self.ends) else 0.0
+        return self._duration
+
+    def within(self, positions: List[int], start: Optional[float] = None, end: Optional[float] = None,
+               speakers: Optional[Collection[str]] = None) -> List[int]:
+        """
+        Keep the positions spoken inside a time range and, if given, by one of the speakers
+        """
+        speaker_ids = None
+        if speakers:
+            speaker_ids = {speaker_id for speaker_id, speaker in enumerate(self.speakers) if speaker in speakers}
+        return [
+            position for position in positions
+            if (start is None or self.starts[position] >= start)
+            and (end is None or self.starts[position] <= end)
+            and (speaker_ids is None or self.speaker_ids[position] in speaker_ids)
+        ]
+
+    def count(self, phrase: str, **scope: Any) -> int:
+        """
+        Number of occurrences of a word or phrase, optionally limited as in within()
+        """
+        terms = tokenize(phrase)
+        if any(value for value in scope.values()):
+            return len(self.within(self.find(phrase), **scope))
+        if len(terms) == 1:
+            return len(self._positions(terms[0]))
+        return len(self.find(phrase))
+
+    def occurrences(self, phrase: str, limit: Optional[int] = None, **scope: Any) -> List[Dict[str, Any]]:
+        """
+        Timestamps and speakers of each occurrence of a word or phrase, optionally limited as in within()
+        """
+        length = max(len(tokenize(phrase)), 1)
+        positions = self.find(phrase)
+        if any(value for value in scope.values()):
+            positions = self.within(positions, **scope)
+        if limit is not None:
+            positions = positions[:limit]
+        return [
+            {
+                "position": position,
+                "start": round(self.starts[position], 2),
+                "end": round(self.ends[position + length - 1], 2),
+                "speaker": self.speakers[self.speaker_ids[position]],
+            }
+            for position in positions
+        ]
+
+    def save(self, path: str):
+        """
+        Write the index to disk as a JSON header followed by the raw arrays
+        """
+        columns = [self.tokens, self.starts, self.ends, self.speaker_ids, self.offsets, self.postings]
+        header = json.dumps({
+            "vocabulary": self.vocabulary,
+            "speakers": self.speakers,
+            "columns": [[column.typecode, len(column)] for column in columns],
+        }).encode('utf-8')
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(MAGIC)
+            f.write(struct.pack('<I', len(header)))
+            f.write(header)
+            for column in columns:
+                column.tofile(f)
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> 'WordIndex':
+        with open(path, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"Not a word index: {path}")
+            header_length = struct.unpack('<I', f.read(4))[0]
+            header = json.loads(f.read(header_length).decode('utf-8'))
+            columns = []
+            for typecode, length in header["columns"]:
+                column = array(typecode)
+                column.fromfile(f, length)
+                columns.append(column)
+        return cls(header["vocabulary"], header["speakers"], *columns)
+
+
+def load_or_build(transcript: str, segments: Optional[List[Dict[str, Any]]] = None) -> WordIndex:
+    """
+    Load the stored word index for a transcript, building and storing it if missing
+
+    Args:
+        transcript: Formatted transcript the index belongs to
+        segments: Transcription segments with word timestamps; parsed from
+            the formatted transcript when not given
+    """
+    path = word_index_path(transcript)
+    if os.path.exists(path):
+        try:
+            return WordIndex.load(path)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Rebuilding unreadable word index {path}: {str(e)}")
+
+    if segments is None:
+        from .segments import parse_formatted_transcript
+        segments = parse_formatted_transcript(transcript)
+    index = WordIndex.from_segments(segments)
+    index.save(path)
+    logger.info(f"Built word index with {len(index)} words at {path}")
+    return index
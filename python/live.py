@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+import asyncio
+import json
+import os
+import sys
+from common import metrics
+from worker import ServiceRegistry, WorkerUnavailable, call
+
+async def main():
+    # Get the input file path from command line arguments
+    if len(sys.argv) != 2:
+        print("Error: Please provide the path to the input JSON file", file=sys.stderr)
+        sys.exit(1)
+
+    input_file = sys.argv[1]
+
+    try:
+        with metrics.span('read_input', bytes=os.path.getsize(input_file)):
+            with open(input_file, 'r') as f:
+                input_data = json.load(f)
+
+        # Appends of one recording are serialized by the session, whichever worker runs them
+        try:
+            result = call('live', input_data)
+        except WorkerUnavailable:
+            result = await ServiceRegistry().handle('live', input_data)
+
+        with metrics.span('write_output'):
+            json.dump(result, sys.stdout, separators=(',', ':'))
+            sys.stdout.write('\n')
+
+    except Exception as e:
+        print(f"Error: {str(e)}", file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == '__main__':
+    # Stage timings are written to stderr as @metrics lines for the caller to collect
+    with metrics.collect() as records:
+        try:
+            asyncio.run(main())
+        finally:
+            metrics.emit(records)
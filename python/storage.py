@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+import argparse
+import json
+import logging
+import os
+
+from common.paths import data_path
+from knowledge.history import ConversationStore
+from knowledge.storage import StorageManager
+
+
+def _print(data):
+    print(json.dumps(data))
+
+
+def _client():
+    from chromadb import PersistentClient, Settings
+
+    persist_directory = os.path.abspath(data_path('chromadb'))
+    os.makedirs(persist_directory, exist_ok=True)
+    return PersistentClient(path=persist_directory, settings=Settings(anonymized_telemetry=False, is_persistent=True))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Size reporting, eviction and cleanup of the vector store")
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('report', help="Print the on-disk size of each meeting")
+    commands.add_parser('sweep', help="Remove leftover analysis collections and indexes of deleted meetings")
+    commands.add_parser('evict', help="Evict idle meeting indexes while the store is over its budget")
+    commands.add_parser('compact', help="Reclaim the space of deleted collections")
+    commands.add_parser('maintain', help="Sweep, evict and compact, e.g. from a nightly cron job")
+    drop = commands.add_parser('drop', help="Delete everything stored for a meeting")
+    drop.add_argument('meeting_id')
+    args = parser.parse_args()
+
+    # JSON goes to stdout for the routes; logs go to stderr
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    storage = StorageManager(_client())
+    history_store = ConversationStore()
+    try:
+        if args.command == 'report':
+            _print(storage.report(history_store))
+        elif args.command == 'sweep':
+            _print(storage.sweep(history_store))
+        elif args.command == 'evict':
+            evicted = storage.enforce_budget()
+            _print({"evicted": evicted, **(storage.compact() if evicted else {})})
+        elif args.command == 'compact':
+            _print(storage.compact())
+        elif args.command == 'maintain':
+            swept = storage.sweep(history_store)
+            evicted = storage.enforce_budget()
+            _print({"swept": swept, "evicted": evicted, **storage.compact()})
+        elif args.command == 'drop':
+            storage.drop(args.meeting_id, history_store)
+            _print({"dropped": args.meeting_id})
+    finally:
+        storage.close()
+
+
+if __name__ == '__main__':
+    main()
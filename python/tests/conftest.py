@@ -0,0 +1,9 @@
+import os
+import sys
+import tempfile
+
+# Tests import the shared packages the way the scripts in <repo>/python do
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Keep the stores services open on construction out of the repo's data directory
+os.environ.setdefault('DATA_DIR', tempfile.mkdtemp(prefix='law-transcribe-tests-'))
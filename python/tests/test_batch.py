@@ -0,0 +1,67 @@
+import asyncio
+import json
+
+import pytest
+
+from transcription.batch import Manifest, collect_files, run_batch
+
+
+class FakeService:
+    def __init__(self, fail=()):
+        self.fail = set(fail)
+
+    async def transcribe(self, path, filename):
+        if filename in self.fail:
+            raise RuntimeError("upload failed")
+        return {"duration": 60.0, "text": filename}
+
+    async def finish(self, data):
+        return {"speakers": []}, data["text"]
+
+
+def _recordings(tmp_path, count):
+    audio = tmp_path / 'audio'
+    audio.mkdir()
+    for i in range(count):
+        (audio / f"{i}.mp3").write_bytes(b"x" * (i + 1))
+    return collect_files([str(audio)])
+
+
+def _run(files, out_dir, service, concurrency=2):
+    return asyncio.run(asyncio.wait_for(run_batch(files, str(out_dir), concurrency, service), timeout=10))
+
+
+def test_writes_results_and_resumes(tmp_path):
+    files = _recordings(tmp_path, 5)
+    summary = _run(files, tmp_path / 'out', FakeService(fail={'3.mp3'}))
+    assert (summary['done'], summary['failed']) == (4, 1)
+    with open(tmp_path / 'out' / files[0].output_name) as f:
+        assert json.load(f)['transcript'] == '0.mp3'
+
+    summary = _run(files, tmp_path / 'out', FakeService())
+    assert (summary['skipped'], summary['done'], summary['failed']) == (4, 1, 0)
+
+
+def test_unwritable_manifest_does_not_hang(tmp_path, monkeypatch):
+    def record(self, **record):
+        raise OSError("No space left on device")
+    monkeypatch.setattr(Manifest, 'record', record)
+
+    # More recordings than the queue between the stages holds
+    summary = _run(_recordings(tmp_path, 8), tmp_path / 'out', FakeService(), concurrency=1)
+    assert (summary['done'], summary['failed']) == (0, 8)
+
+
+class FinisherCrash(BaseException):
+    pass
+
+
+class CrashingService(FakeService):
+    async def finish(self, data):
+        raise FinisherCrash()
+
+
+def test_failed_finisher_stops_the_batch(tmp_path):
+    # Errors outside the per-recording handling end the run instead of leaving it blocked
+    with pytest.raises(FinisherCrash):
+        _run(_recordings(tmp_path, 8), tmp_path / 'out', CrashingService(), concurrency=1)
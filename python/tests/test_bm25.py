@@ -0,0 +1,56 @@
+from knowledge.bm25 import BM25Index, load_current, reciprocal_rank_fusion
+
+TEXTS = {
+    'c0': "The officer read the suspect his rights at the station.",
+    'c1': "The suspect said he found the knife in the kitchen drawer.",
+    'c2': "Knife knife knife: the detective repeated the word three times.",
+    'c3': "Nothing was said about any weapon during the break.",
+}
+
+
+def _index():
+    return BM25Index.build(list(TEXTS), list(TEXTS.values()), fingerprint='f1')
+
+
+def test_ranks_by_term_frequency_and_rarity():
+    results = _index().search("knife kitchen", limit=10)
+    assert [chunk_id for chunk_id, _ in results] == ['c1', 'c2']
+    assert results[0][1] > results[1][1] > 0
+
+
+def test_leaves_out_chunks_without_query_terms():
+    assert _index().search("alibi", limit=10) == []
+    assert _index().search("knife", limit=0) == []
+    assert BM25Index.build([], [], fingerprint='empty').search("knife", limit=5) == []
+
+
+def test_repeated_query_terms_count_once():
+    index = _index()
+    assert index.search("knife knife knife", limit=10) == index.search("knife", limit=10)
+
+
+def test_restricted_to_ids():
+    index = _index()
+    assert [chunk_id for chunk_id, _ in index.search("knife suspect", limit=10, ids=['c0', 'c2', 'missing'])] == ['c2', 'c0']
+
+
+def test_save_and_load(tmp_path):
+    index = _index()
+    path = str(tmp_path / 'bm25' / 'meeting_1.bm25')
+    index.save(path)
+    assert load_current(path, 'f1').search("knife kitchen", limit=10) == index.search("knife kitchen", limit=10)
+    assert load_current(path, 'f2') is None
+    assert load_current(str(tmp_path / 'missing.bm25'), 'f1') is None
+
+    with open(path, 'wb') as f:
+        f.write(b"not an index")
+    assert load_current(path, 'f1') is None
+
+
+def test_reciprocal_rank_fusion():
+    fused = reciprocal_rank_fusion([['a', 'b', 'c'], ['b', 'd']], limit=10)
+    assert fused == ['b', 'a', 'd', 'c']
+    # Ties keep the order of the earlier lists
+    assert reciprocal_rank_fusion([['a', 'b'], ['b', 'a']], limit=10) == ['a', 'b']
+    assert reciprocal_rank_fusion([['a', 'a', 'b']], limit=1) == ['a']
+    assert reciprocal_rank_fusion([[], []], limit=5) == []
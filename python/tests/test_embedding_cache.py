@@ -0,0 +1,62 @@
+import chromadb
+import pytest
+from chromadb.utils import embedding_functions
+
+from common.disk_cache import DiskCache
+from knowledge.embedding_cache import CachedEmbeddingFunction
+
+
+@pytest.fixture
+def client(tmp_path):
+    return chromadb.PersistentClient(path=str(tmp_path / 'chroma'))
+
+
+@pytest.fixture
+def cached_function(tmp_path):
+    base = embedding_functions.DefaultEmbeddingFunction()
+    return CachedEmbeddingFunction(base, 'test-model', DiskCache(str(tmp_path / 'embeddings.sqlite3'), max_bytes=1 << 20))
+
+
+@pytest.mark.parametrize('legacy_function', [embedding_functions.DefaultEmbeddingFunction, None])
+def test_opens_collection_created_without_the_cache(client, cached_function, legacy_function):
+    # Meeting collections created before the cache, with chroma's default function
+    options = {'embedding_function': legacy_function()} if legacy_function else {}
+    client.get_or_create_collection(name='meeting_legacy', **options)
+
+    collection = client.get_or_create_collection(name='meeting_legacy', embedding_function=cached_function)
+    assert collection.name == 'meeting_legacy'
+
+
+def test_reports_the_wrapped_function(cached_function):
+    base = cached_function.embedding_function
+    assert cached_function.name() == base.name()
+    assert cached_function.get_config() == base.get_config()
+
+
+def test_reopens_collection_created_with_the_cache(client, cached_function):
+    client.get_or_create_collection(name='meeting_new', embedding_function=cached_function)
+
+    for embedding_function in (cached_function, embedding_functions.DefaultEmbeddingFunction()):
+        collection = client.get_or_create_collection(name='meeting_new', embedding_function=embedding_function)
+        assert collection.name == 'meeting_new'
+
+
+class CountingFunction:
+    def __init__(self):
+        self.texts = []
+
+    def __call__(self, input):
+        self.texts.extend(input)
+        return [[float(len(text)), 1.0] for text in input]
+
+
+def test_embeds_each_text_once(tmp_path):
+    base = CountingFunction()
+    function = CachedEmbeddingFunction(base, 'counting', DiskCache(str(tmp_path / 'embeddings.sqlite3'), max_bytes=1 << 20))
+
+    first = [list(map(float, embedding)) for embedding in function(['a', 'bb', 'a'])]
+    second = [list(map(float, embedding)) for embedding in function(['bb', 'ccc'])]
+
+    assert base.texts == ['a', 'bb', 'ccc']
+    assert first == [[1.0, 1.0], [2.0, 1.0], [1.0, 1.0]]
+    assert second == [[2.0, 1.0], [3.0, 1.0]]
@@ -0,0 +1,123 @@
+import asyncio
+import time
+
+import pytest
+
+from worker import jobs
+from worker.jobs import JobQueue, run_jobs
+
+
+class FakeRegistry:
+    async def handle(self, op, payload):
+        return {"echo": payload}
+
+
+@pytest.fixture
+def queue(tmp_path):
+    queue = JobQueue(str(tmp_path / 'jobs.sqlite3'))
+    yield queue
+    queue.close()
+
+
+def finish(queue, op='transcribe'):
+    job_id = queue.submit(op, {"n": 1})
+    queue.complete(queue.claim('runner')['id'], {"done": True})
+    return job_id
+
+
+def test_delivered_result_is_handed_out_once(queue):
+    job_id = finish(queue)
+    assert queue.deliver(job_id) == {"done": True}
+    assert queue.deliver(job_id) is None
+    queue.release(job_id)
+    assert queue.deliver(job_id) == {"done": True}
+
+
+def test_receipt_is_kept_and_stops_release(queue):
+    job_id = finish(queue)
+    queue.deliver(job_id)
+    queue.acknowledge(job_id, 'meeting-1')
+    queue.release(job_id)
+    status = queue.status(job_id)
+    assert status['delivered']
+    assert status['receipt'] == 'meeting-1'
+
+
+def test_undelivered_lists_finished_jobs_of_hooked_ops(queue):
+    stored = finish(queue)
+    queue.deliver(stored)
+    queue.acknowledge(stored, 'meeting-1')
+    waiting = finish(queue)
+    finish(queue, op='analyze')
+    assert queue.undelivered(['transcribe']) == [{"id": waiting, "op": 'transcribe'}]
+
+
+def test_undelivered_releases_deliveries_without_receipt(queue):
+    job_id = finish(queue)
+    queue.deliver(job_id)
+    assert queue.undelivered(['transcribe']) == []
+    assert queue.undelivered(['transcribe'], unreceipted_after=-1) == [{"id": job_id, "op": 'transcribe'}]
+    assert queue.deliver(job_id) == {"done": True}
+
+
+def test_runner_announces_finished_jobs(queue, monkeypatch):
+    announced = []
+
+    async def announce_completion(url, job_id):
+        announced.append(url.format(id=job_id))
+        queue.deliver(job_id)
+        queue.acknowledge(job_id, 'meeting-1')
+        return True
+
+    monkeypatch.setattr(jobs, 'announce_completion', announce_completion)
+    job_id = queue.submit('transcribe', {"n": 1})
+
+    async def run():
+        stop = asyncio.Event()
+        runner = asyncio.create_task(run_jobs(
+            queue, workers=1, registry=FakeRegistry(), stop=stop,
+            completion_urls={'transcribe': 'http://app/jobs/{id}'}
+        ))
+        deadline = time.monotonic() + 10
+        while not announced and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        stop.set()
+        await runner
+
+    asyncio.run(run())
+    assert announced == [f'http://app/jobs/{job_id}']
+    assert queue.status(job_id)['receipt'] == 'meeting-1'
+
+
+def test_jobs_of_runners_without_a_lease_are_requeued(queue):
+    live = queue.submit('transcribe', {"n": 1})
+    lost = queue.submit('transcribe', {"n": 2})
+    queue.heartbeat('live')
+    queue.heartbeat('lost')
+    queue.claim('live')
+    queue.claim('lost')
+    assert queue.requeue_orphans() == 0
+
+    # Heartbeats are compared by time, not by probing processes
+    queue._conn.execute("UPDATE runners SET heartbeat_at = heartbeat_at - 3600 WHERE id = 'lost'")
+    assert queue.requeue_orphans() == 1
+    assert queue.status(live)['state'] == 'running'
+    assert queue.status(lost)['state'] == 'queued'
+
+
+def test_only_one_runner_is_reserved_while_it_is_alive(queue):
+    runner_id = queue.reserve_runner()
+    assert runner_id
+    assert queue.reserve_runner() is None
+    queue.unregister_runner(runner_id)
+    assert queue.reserve_runner()
+
+
+def test_runner_exits_when_idle_and_releases_its_lease(queue, monkeypatch):
+    monkeypatch.setattr(jobs, 'HEARTBEAT_INTERVAL', 0.05)
+    job_id = queue.submit('analyze', {"n": 1})
+    asyncio.run(asyncio.wait_for(
+        run_jobs(queue, workers=1, registry=FakeRegistry(), completion_urls={}, idle_exit=0), timeout=10
+    ))
+    assert queue.status(job_id)['state'] == 'done'
+    assert queue.reserve_runner()
@@ -0,0 +1,20 @@
+from common.lru import LRUCache
+
+
+def test_keeps_the_most_recently_used_entries():
+    cache = LRUCache(2)
+    cache['a'] = 1
+    cache['b'] = 2
+    assert cache.get('a') == 1
+    cache['c'] = 3
+    assert 'b' not in cache
+    assert (cache.get('a'), cache.get('c'), len(cache)) == (1, 3, 2)
+
+
+def test_replacing_an_entry_refreshes_it():
+    cache = LRUCache(2)
+    cache['a'] = 1
+    cache['b'] = 2
+    cache['a'] = 10
+    cache['c'] = 3
+    assert cache.get('a') == 10 and cache.get('b') is None
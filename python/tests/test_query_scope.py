@@ -0,0 +1,93 @@
+import chromadb
+import pytest
+
+from knowledge.query_scope import AROUND_SECONDS, QueryScope, parse_scope
+
+SPEAKERS = ['SPEAKER_00', 'SPEAKER_01', 'SPEAKER_02', 'Detective Morris', 'Unknown']
+
+
+@pytest.mark.parametrize('query, start, end', [
+    ("What was said in the first 10 minutes?", 0.0, 600.0),
+    ("What was said in the first ten minutes?", 0.0, 600.0),
+    ("Summarize the opening half an hour", 0.0, 1800.0),
+    ("What happened during the first hour?", 0.0, 3600.0),
+    ("What was said in the last five minutes?", 3300.0, None),
+    ("Anything between 12:30 and 15:00?", 750.0, 900.0),
+    ("Anything from 15:00 to 12:30?", 750.0, 900.0),
+    ("What was said after the 20 minute mark?", 1200.0, None),
+    ("What was said before 1:00:00?", None, 3600.0),
+    ("Who spoke around 10:00?", 600.0 - AROUND_SECONDS, 600.0 + AROUND_SECONDS),
+    ("After 10:00, what was said before 20:00?", 600.0, 1200.0),
+])
+def test_time_bounds(query, start, end):
+    scope = parse_scope(query, SPEAKERS, duration=3600.0)
+    assert (scope.start, scope.end) == (start, end)
+
+
+def test_last_needs_the_duration():
+    scope = parse_scope("What was said in the last five minutes?", SPEAKERS)
+    assert (scope.start, scope.end) == (None, None)
+
+
+def test_speaker_reference_is_not_a_time_bound():
+    scope = parse_scope("What was said by speaker 2?", SPEAKERS, duration=3600.0)
+    assert scope.speakers == ['SPEAKER_02']
+    assert (scope.start, scope.end) == (None, None)
+
+
+def test_contradictory_bounds_are_dropped():
+    scope = parse_scope("What was said after 30:00 but before 10:00?", SPEAKERS, duration=3600.0)
+    assert (scope.start, scope.end) == (None, None)
+    assert not scope
+
+
+def test_range_bounds_are_not_read_twice():
+    scope = parse_scope("Between 10:00 and 20:00, and after 12:00", SPEAKERS)
+    assert (scope.start, scope.end) == (720.0, 1200.0)
+
+
+@pytest.mark.parametrize('query, speakers', [
+    ("What did speaker 1 say?", ['SPEAKER_01']),
+    ("Compare speaker_0 and speaker #2", ['SPEAKER_00', 'SPEAKER_02']),
+    ("What did Morris ask?", ['Detective Morris']),
+    ("What did the unknown speaker say?", []),
+    ("What did speaker 12 say?", []),
+])
+def test_speakers(query, speakers):
+    assert parse_scope(query, SPEAKERS).speakers == speakers
+
+
+def test_time_phrases_are_removed_from_the_search_text():
+    scope = parse_scope("Did anyone mention the knife in the first 10 minutes?", SPEAKERS)
+    assert scope.query == "Did anyone mention the knife ?"
+    assert parse_scope("in the first 10 minutes", SPEAKERS).query == "in the first 10 minutes"
+
+
+def test_where():
+    assert QueryScope().where() is None
+    assert QueryScope(start=0.0, end=600.0).where() == {"start": {"$lte": 600.0}}
+    assert QueryScope(speakers=['SPEAKER_01'], start=60.0).where() == {"$and": [
+        {"end": {"$gte": 60.0}},
+        {"speakers": {"$contains": 'SPEAKER_01'}},
+    ]}
+    assert QueryScope(speakers=['A', 'B']).where() == {"$or": [
+        {"speakers": {"$contains": 'A'}},
+        {"speakers": {"$contains": 'B'}},
+    ]}
+
+
+def test_where_selects_chunks_in_chroma(tmp_path):
+    collection = chromadb.PersistentClient(path=str(tmp_path)).get_or_create_collection('meeting_scope')
+    collection.add(
+        ids=['a', 'b', 'c'],
+        embeddings=[[1.0, 0.0], [0.0, 1.0], [1.0, 1.0]],
+        documents=['a', 'b', 'c'],
+        metadatas=[
+            {"start": 0.0, "end": 300.0, "speakers": ['SPEAKER_00']},
+            {"start": 300.0, "end": 600.0, "speakers": ['SPEAKER_00', 'SPEAKER_01']},
+            {"start": 600.0, "end": 900.0, "speakers": ['SPEAKER_02']},
+        ]
+    )
+    scope = QueryScope(speakers=['SPEAKER_01', 'SPEAKER_02'], start=350.0, end=650.0)
+    assert sorted(collection.get(where=scope.where())['ids']) == ['b', 'c']
+    assert collection.get(where=QueryScope(speakers=['SPEAKER_00'], start=620.0).where())['ids'] == []
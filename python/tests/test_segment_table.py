@@ -0,0 +1,56 @@
+import json
+
+import pytest
+
+from transcription.segment_table import SegmentTable, expand_analysis
+
+SEGMENTS = [
+    {"start": 0.0, "end": 4.5, "speaker": "SPEAKER_00", "text": "State your name."},
+    {"start": 4.5, "end": 7.0, "speaker": "SPEAKER_01", "text": "John Smith — née Smyth."},
+    {"start": 7.0, "end": 7.0, "speaker": None, "text": ""},
+    {"start": 8.0, "end": 12.25, "speaker": "SPEAKER_00", "text": "Thank you."},
+]
+
+
+def test_compact_round_trip_through_json():
+    table = SegmentTable.from_segments(SEGMENTS)
+    restored = SegmentTable.from_compact(json.loads(json.dumps(table.to_compact())))
+    assert restored.to_segments() == table.to_segments()
+    assert [(s['start'], s['end'], s['speaker'], s['text']) for s in restored.to_segments()] == [
+        (s['start'], s['end'], s['speaker'], s['text']) for s in SEGMENTS
+    ]
+
+
+def test_extend_keeps_speaker_ids():
+    table = SegmentTable.from_segments(SEGMENTS[:2])
+    table.extend(SEGMENTS[2:] + [{"start": 13.0, "end": 14.0, "speaker": "SPEAKER_02", "text": "Objection."}])
+    assert table.speakers == ['SPEAKER_00', 'SPEAKER_01', 'SPEAKER_02']
+    assert table.text_at(4) == "Objection."
+    assert [s['text'] for s in table.speaker_segments('SPEAKER_00')] == ["State your name.", "Thank you."]
+    assert list(table.speaker_segments('SPEAKER_09')) == []
+
+
+def test_speaker_stats():
+    assert SegmentTable.from_segments(SEGMENTS).speaker_stats() == [
+        {"speaker": "SPEAKER_00", "segment_count": 2, "speaking_seconds": 8.75},
+        {"speaker": "SPEAKER_01", "segment_count": 1, "speaking_seconds": 2.5},
+    ]
+
+
+def test_rejects_unknown_format():
+    with pytest.raises(ValueError):
+        SegmentTable.from_compact({"format": "segments/0"})
+
+
+def test_expand_analysis():
+    analysis = {
+        "Segments": SegmentTable.from_segments(SEGMENTS).to_compact(),
+        "Speakers": [{"id": "SPEAKER_01", "segment_count": 1}],
+        "Duration": 12.25,
+    }
+    expanded = expand_analysis(analysis)
+    assert expanded["Duration"] == 12.25
+    assert len(expanded["RawSegments"]) == 4
+    assert expanded["Speakers"] == [
+        {"id": "SPEAKER_01", "segment_count": 1, "segments": [{"start": 4.5, "end": 7.0, "text": "John Smith — née Smyth."}]}
+    ]
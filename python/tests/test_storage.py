@@ -0,0 +1,42 @@
+import os
+import subprocess
+import sys
+
+import chromadb
+import pytest
+
+from common import paths
+from knowledge.storage import StorageManager
+
+PYTHON_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def storage(tmp_path, monkeypatch):
+    monkeypatch.setattr(paths, 'DATA_DIR', str(tmp_path))
+    persist_directory = str(tmp_path / 'chromadb')
+    client = chromadb.PersistentClient(path=persist_directory)
+    client.get_or_create_collection('meeting_kept').add(ids=['a'], embeddings=[[1.0, 0.0]], documents=['a'])
+    manager = StorageManager(client, persist_directory=persist_directory)
+    yield manager
+    manager.close()
+
+
+def test_compact_keeps_collections_in_use(storage):
+    result = storage.compact()
+    assert result['compacted']
+    assert storage.client.get_collection('meeting_kept').get(ids=['a'])['documents'] == ['a']
+
+
+def test_compact_waits_for_other_processes(storage, tmp_path):
+    holder = subprocess.Popen(
+        [sys.executable, '-c', 'from knowledge.storage import hold_store; hold_store(); print("held", flush=True); input()'],
+        cwd=PYTHON_DIR, env={**os.environ, 'DATA_DIR': str(tmp_path)},
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True
+    )
+    try:
+        assert holder.stdout.readline().strip() == 'held'
+        assert not storage.compact()['compacted']
+    finally:
+        holder.communicate('\n')
+    assert storage.compact()['compacted']
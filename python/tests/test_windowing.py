@@ -0,0 +1,94 @@
+import asyncio
+import threading
+import wave
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+from transcription import service as service_module
+from transcription.standin_server import make_handler
+from transcription.windowing import match_speakers, plan_windows, stitch_windows
+
+
+def _segment(speaker, start, end):
+    return {"speaker": speaker, "start": start, "end": end, "text": f"{speaker} {start}"}
+
+
+def test_speakers_talking_in_the_overlap_keep_their_labels():
+    previous = [_segment('SPEAKER_00', 40, 50), _segment('SPEAKER_01', 50, 60)]
+    current = [_segment('A', 40, 50), _segment('B', 50, 60), _segment('A', 60, 70)]
+    mapping = match_speakers(previous, current, (40, 60), {'SPEAKER_00', 'SPEAKER_01'})
+    assert mapping == {'A': 'SPEAKER_00', 'B': 'SPEAKER_01'}
+
+
+def test_speaker_new_to_the_window_gets_a_new_label():
+    # A second officer enters after the overlap while SPEAKER_01 is free
+    previous = [_segment('SPEAKER_00', 40, 60)]
+    current = [_segment('A', 40, 60), _segment('B', 70, 80)]
+    mapping = match_speakers(previous, current, (40, 60), {'SPEAKER_00', 'SPEAKER_01'})
+    assert mapping == {'A': 'SPEAKER_00', 'B': 'SPEAKER_02'}
+
+
+def test_each_known_label_is_given_out_once():
+    previous = [_segment('SPEAKER_00', 40, 60)]
+    current = [_segment('A', 40, 55), _segment('B', 50, 60)]
+    mapping = match_speakers(previous, current, (40, 60), {'SPEAKER_00'})
+    assert mapping == {'A': 'SPEAKER_00', 'B': 'SPEAKER_01'}
+
+
+def test_stitching_drops_the_overlap_once():
+    windows = plan_windows(100, 60, 20)
+    results = [
+        {"segments": [_segment('S', t, t + 10) for t in range(0, 60, 10)]},
+        {"segments": [_segment('S', t, t + 10) for t in range(0, 60, 10)]},
+    ]
+    stitched = stitch_windows(windows, results)
+    assert [s['start'] for s in stitched['segments']] == list(range(0, 100, 10))
+
+
+@pytest.fixture
+def standin_url():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), make_handler(default_duration=60.0, delay=0.0))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/v1/audio/transcriptions"
+    server.shutdown()
+    server.server_close()
+
+
+async def _silent_window(audio_path, start, duration, output_path):
+    # Windows are sent as silent WAVs of the right length, which the stand-in measures, so ffmpeg is not needed
+    with wave.open(output_path, 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(8000)
+        wav.writeframes(b'\0\0' * int(round(duration * 8000)))
+
+
+def test_windowed_transcription_against_the_standin(standin_url, tmp_path, monkeypatch):
+    monkeypatch.setenv('LEMONFOX_API_KEY', 'test')
+    monkeypatch.setenv('LEMONFOX_TRANSCRIBE_URL', standin_url)
+    monkeypatch.setenv('TRANSCRIBE_WINDOW_SECONDS', '60')
+    monkeypatch.setenv('TRANSCRIBE_WINDOW_OVERLAP_SECONDS', '15')
+    monkeypatch.setattr(service_module, 'extract_window', _silent_window)
+    recording = tmp_path / 'interview.wav'
+    recording.write_bytes(b'')
+
+    transcription = asyncio.run(
+        service_module.TranscriptionService().transcribe_windowed(str(recording), recording.name, 150.0)
+    )
+
+    segments = transcription['segments']
+    starts = [segment['start'] for segment in segments]
+    assert transcription['duration'] == 150.0
+    assert starts == sorted(starts) and len(set(starts)) == len(starts)
+    assert starts[0] == 0.0 and segments[-1]['end'] == 150.0
+    assert all(b['start'] >= a['end'] - 0.25 for a, b in zip(segments, segments[1:]))
+    assert [segment['id'] for segment in segments] == list(range(len(segments)))
+
+    # The stand-in restarts its labels in every window: the speaker heard in
+    # the overlap keeps their label, the one first heard after it gets a new one
+    speakers = {segment['start']: segment['speaker'] for segment in segments}
+    assert speakers[45.0] == speakers[50.0] == speakers[55.0] == 'SPEAKER_01'
+    assert speakers[60.0] == 'SPEAKER_02'
+    assert speakers[75.0] == 'SPEAKER_01'
@@ -1,8 +1,10 @@
 #!/usr/bin/env python3
 import asyncio
 import json
+import os
 import sys
-from transcription import TranscriptionService
+from common import metrics
+from worker import ServiceRegistry, WorkerUnavailable, call
 
 async def main():
     # Get the input file path from command line arguments
@@ -14,29 +16,29 @@ async def main():
 
     try:
         # Read the input data
-        with open(input_file, 'r') as f:
-            input_data = json.load(f)
+        with metrics.span('read_input', bytes=os.path.getsize(input_file)):
+            with open(input_file, 'r') as f:
+                input_data = json.load(f)
 
-        # Read the audio file
-        with open(input_data['audio_path'], 'rb') as f:
-            audio_data = f.read()
+        # Hand the job to the resident worker pool, or run it here if none is up
+        try:
+            result = call('transcribe', input_data)
+        except WorkerUnavailable:
+            result = await ServiceRegistry().handle('transcribe', input_data)
 
-        # Initialize the transcription service
-        service = TranscriptionService()
-
-        # Process the audio
-        analysis, transcript = await service.process_audio(audio_data, input_data['filename'])
-
-        # Output the results as JSON
-        result = {
-            'analysis': analysis,
-            'transcript': transcript
-        }
-        print(json.dumps(result))
+        # Stream the results to stdout as compact JSON rather than building one large string
+        with metrics.span('write_output'):
+            json.dump(result, sys.stdout, separators=(',', ':'))
+            sys.stdout.write('\n')
 
     except Exception as e:
         print(f"Error: {str(e)}", file=sys.stderr)
         sys.exit(1)
 
 if __name__ == '__main__':
-    asyncio.run(main()) 
\ No newline at end of file
+    # Stage timings are written to stderr as @metrics lines for the caller to collect
+    with metrics.collect() as records:
+        try:
+            asyncio.run(main())
+        finally:
+            metrics.emit(records) 
@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""
+Bulk transcription of many recordings with a resumable manifest
+
+Uploads and transcriptions run concurrently while finished transcriptions
+are formatted and written as they arrive, so a slow file never holds up
+the rest of the batch:
+
+    python3 -m transcription.batch /path/to/case/audio --out /path/to/results
+    python3 -m transcription.batch --list files.txt --out /path/to/results --concurrency 8
+
+Each recording produces <out>/<name>-<hash>.json holding the analysis and
+formatted transcript that process_audio returns. <out>/manifest.jsonl
+records every finished file; rerunning the same command skips those whose
+size and modification time are unchanged and retries the ones that failed.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sys
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional
+
+from .service import TranscriptionService
+
+logger = logging.getLogger(__name__)
+
+AUDIO_EXTENSIONS = frozenset({'.mp3', '.wav', '.m4a', '.mp4', '.aac', '.flac', '.ogg', '.opus', '.webm', '.wma', '.amr'})
+
+MANIFEST_NAME = 'manifest.jsonl'
+
+# Recordings uploaded and transcribed at the same time
+DEFAULT_CONCURRENCY = int(os.environ.get('TRANSCRIBE_BATCH_CONCURRENCY', '4'))
+
+
+@dataclass
+class BatchFile:
+    path: str
+    size: int
+    mtime: float
+
+    @property
+    def key(self) -> str:
+        return f"{self.path}:{self.size}:{self.mtime:.3f}"
+
+    @property
+    def output_name(self) -> str:
+        stem = os.path.splitext(os.path.basename(self.path))[0]
+        digest = hashlib.sha256(self.path.encode('utf-8')).hexdigest()[:8]
+        return f"{stem}-{digest}.json"
+
+
+def collect_files(inputs: Iterable[str]) -> List[BatchFile]:
+    """
+    Expand directories (recursively, audio extensions only) and file paths
+    into a sorted, de-duplicated list of recordings
+    """
+    paths = []
+    for entry in inputs:
+        entry = os.path.abspath(entry)
+        if os.path.isdir(entry):
+            for root, _, names in os.walk(entry):
+                paths.extend(
+                    os.path.join(root, name) for name in names
+                    if os.path.splitext(name)[1].lower() in AUDIO_EXTENSIONS
+                )
+        elif os.path.isfile(entry):
+            paths.append(entry)
+        else:
+            logger.warning(f"Skipping missing input {entry}")
+
+    files = []
+    for path in sorted(set(paths)):
+        stat = os.stat(path)
+        files.append(BatchFile(path, stat.st_size, stat.st_mtime))
+    return files
+
+
+class Manifest:
+    """
+    Append-only record of finished files, one JSON object per line
+
+    Lines are flushed as files finish, so a run that is interrupted loses at
+    most the files still in flight.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.done: Dict[str, dict] = {}
+        if os.path.exists(path):
+            with open(path, 'r') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # A line cut short by a crash
+                        continue
+                    if record.get('status') == 'done':
+                        self.done[record['key']] = record
+                    else:
+                        self.done.pop(record.get('key'), None)
+        self._file = open(path, 'a')
+
+    def is_done(self, batch_file: BatchFile, out_dir: str) -> bool:
+        record = self.done.get(batch_file.key)
+        return record is not None and os.path.exists(os.path.join(out_dir, record['output']))
+
+    def record(self, **record):
+        self._file.write(json.dumps(record) + '\n')
+        self._file.flush()
+        if record.get('status') == 'done':
+            self.done[record['key']] = record
+
+    def close(self):
+        self._file.close()
+
+
+def _write_json(path: str, data: dict):
+    # Write to a temporary name first so a partial file is never mistaken for a result
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'w') as f:
+        json.dump(data, f, separators=(',', ':'))
+    os.replace(temp_path, path)
+
+
+class BatchStats:
+    def __init__(self, total: int, skipped: int):
+        self.total = total
+        self.skipped = skipped
+        self.done = 0
+        self.failed = 0
+        self.audio_seconds = 0.0
+        self.started = time.monotonic()
+
+    def rates(self) -> Dict[str, float]:
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+        return {
+            "files_per_minute": round(self.done / elapsed * 60, 2),
+            "audio_hours_per_hour": round(self.audio_seconds / elapsed, 2),
+        }
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            "total": self.total,
+            "skipped": self.skipped,
+            "done": self.done,
+            "failed": self.failed,
+            "audio_hours": round(self.audio_seconds / 3600, 3),
+            "elapsed_seconds": round(time.monotonic() - self.started, 1),
+            **self.rates(),
+        }
+
+
+async def run_batch(files: List[BatchFile], out_dir: str, concurrency: int = DEFAULT_CONCURRENCY,
+                    service: Optional[TranscriptionService] = None) -> Dict[str, float]:
+    """
+    Transcribe recordings with bounded concurrency, writing each result and
+    manifest entry as soon as the recording is finished
+
+    Returns:
+        Summary counts and throughput of this run
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    service = service or TranscriptionService()
+    manifest = Manifest(os.path.join(out_dir, MANIFEST_NAME))
+
+    pending = [f for f in files if not manifest.is_done(f, out_dir)]
+    stats = BatchStats(len(files), len(files) - len(pending))
+    logger.info(f"{len(files)} recordings, {stats.skipped} already done, {len(pending)} to transcribe")
+
+    todo: asyncio.Queue = asyncio.Queue()
+    for batch_file in pending:
+        todo.put_nowait(batch_file)
+    # Bounded, so transcription pauses if formatting and writing fall behind
+    transcribed: asyncio.Queue = asyncio.Queue(maxsize=concurrency)
+
+    async def transcribe_stage():
+        while True:
+            try:
+                batch_file = todo.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            started = time.monotonic()
+            try:
+                data = await service.transcribe(batch_file.path, os.path.basename(batch_file.path))
+                await transcribed.put((batch_file, data, started))
+            except Exception as e:
+                await transcribed.put((batch_file, e, started))
+
+    async def finish_stage():
+        while True:
+            item = await transcribed.get()
+            if item is None:
+                return
+            batch_file, data, started = item
+            try:
+                if isinstance(data, Exception):
+                    raise data
+                analysis, transcript = await service.finish(data)
+                await asyncio.to_thread(
+                    _write_json,
+                    os.path.join(out_dir, batch_file.output_name),
+                    {"source": batch_file.path, "analysis": analysis, "transcript": transcript}
+                )
+                duration = float(data.get('duration') or 0.0)
+                manifest.record(
+                    key=batch_file.key, path=batch_file.path, status='done', output=batch_file.output_name,
+                    duration=duration, seconds=round(time.monotonic() - started, 2)
+                )
+                stats.done += 1
+                stats.audio_seconds += duration
+                logger.info(
+                    f"[{stats.done + stats.failed}/{len(pending)}] {batch_file.path} done "
+                    f"({duration / 60:.1f} min of audio) {stats.rates()}"
+                )
+            except Exception as e:
+                stats.failed += 1
+                logger.error(f"[{stats.done + stats.failed}/{len(pending)}] {batch_file.path} failed: {str(e)}")
+                try:
+                    manifest.record(key=batch_file.key, path=batch_file.path, status='failed', error=str(e))
+                except Exception as record_error:
+                    # Unrecorded recordings are simply retried by the next run
+                    logger.error(f"Could not record the failure of {batch_file.path}: {str(record_error)}")
+
+    finisher = asyncio.create_task(finish_stage())
+    transcribers = asyncio.gather(*(transcribe_stage() for _ in range(max(1, concurrency))))
+    closing = None
+    try:
+        # A finisher that dies stops the batch, instead of leaving the
+        # transcribers blocked on the full queue forever
+        await asyncio.wait([finisher, transcribers], return_when=asyncio.FIRST_COMPLETED)
+        if not finisher.done():
+            closing = asyncio.create_task(transcribed.put(None))
+            await asyncio.wait([finisher, closing], return_when=asyncio.FIRST_COMPLETED)
+        await finisher
+    finally:
+        transcribers.cancel()
+        if closing is not None:
+            closing.cancel()
+        await asyncio.gather(transcribers, return_exceptions=True)
+        manifest.close()
+
+    return stats.summary()
+
+
+def _read_list(path: str) -> List[str]:
+    with open(path, 'r') as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith('#')]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Transcribe many recordings with a resumable manifest")
+    parser.add_argument('inputs', nargs='*', help="Audio files or directories to search recursively")
+    parser.add_argument('--list', dest='list_file', help="File with one input path per line")
+    parser.add_argument('--out', required=True, help="Directory for results and the manifest")
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY,
+                        help="Recordings transcribed at the same time (TRANSCRIBE_BATCH_CONCURRENCY)")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        stream=sys.stderr
+    )
+
+    inputs = list(args.inputs)
+    if args.list_file:
+        inputs.extend(_read_list(args.list_file))
+    if not inputs:
+        parser.error("no inputs given")
+
+    summary = asyncio.run(run_batch(collect_files(inputs), args.out, args.concurrency))
+    print(json.dumps(summary))
+    if summary["failed"]:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+from typing import List, Optional
+
+TITLE = "LEGAL PROCEEDING TRANSCRIPT"
+
+
+def format_header(duration: float) -> List[str]:
+    """
+    Header lines of a formatted transcript, followed by an empty line
+    """
+    return [
+        TITLE,
+        f"Duration: {duration:.2f} seconds",
+        "=" * 50,
+        "",  # Empty line after header
+    ]
+
+
+class TranscriptFormatter:
+    """
+    Screenplay-style transcript lines: each speaker's consecutive lines
+    under one label, blocks separated by an empty line
+
+    Segments may arrive in several batches. Only the block of the speaker
+    currently talking can still grow; every other block is final as soon
+    as add() returns it.
+    """
+
+    def __init__(self, current_speaker: Optional[str] = None, current_dialogue: Optional[List[str]] = None):
+        self.current_speaker = current_speaker
+        self.current_dialogue = list(current_dialogue or [])
+
+    def add(self, start_time: float, speaker: Optional[str], text: str) -> List[str]:
+        """
+        Add one segment
+
+        Returns:
+            The lines of the previous speaker's block if this segment closed it
+        """
+        speaker = speaker or 'Unknown'
+        text = text.strip()
+
+        # Skip empty text
+        if not text:
+            return []
+
+        # Skip repeated "transcript with precise punctuation" messages
+        if "transcript with precise punctuation" in text.lower():
+            return []
+
+        # Format timestamp as [MM:SS]
+        minutes = int(start_time) // 60
+        seconds = int(start_time) % 60
+        timestamp = f"[{minutes:02d}:{seconds:02d}]"
+
+        # If speaker changes, output accumulated dialogue
+        finished = []
+        if self.current_speaker and speaker != self.current_speaker:
+            finished = self.open_lines()
+            self.current_dialogue = []
+
+        # Add new line to current dialogue
+        self.current_speaker = speaker
+        self.current_dialogue.append(f"{timestamp} {text}")
+        return finished
+
+    def open_lines(self) -> List[str]:
+        """
+        Lines of the block still open, with the empty line that ends it
+        """
+        if not self.current_dialogue:
+            return []
+        return [
+            f"{self.current_speaker}:",
+            *(f"    {line}" for line in self.current_dialogue),
+            "",  # Add empty line between speakers
+        ]
@@ -0,0 +1,366 @@
+"""
+Incremental transcription of a recording that is still in progress
+
+The client appends the recording piece by piece (e.g. MediaRecorder
+timeslices written one after the other to the same file). Each append
+decodes only the audio added since the last one into the session's raw
+PCM file, and once enough new audio has built up it is transcribed as one
+more window: starting a little before the end of what is already
+transcribed, so speaker labels are carried over through the overlap the
+same way windowed transcription stitches its windows.
+
+The end of a window may cut a sentence short, so the last seconds of each
+window are held back and transcribed again with the next one; only the
+final append transcribes the recording to its very end. Everything before
+that point is final: its segments are appended to the formatted
+transcript and never rewritten.
+
+Session state lives in data/live/<session id> until the final append.
+"""
+import asyncio
+import fcntl
+import json
+import logging
+import os
+import shutil
+import wave
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List, Optional, Tuple
+
+from common import metrics
+from common.paths import data_path
+from knowledge.word_index import WordIndex, word_index_path
+
+from .formatting import TranscriptFormatter, format_header
+from .segment_table import SegmentTable
+from .windowing import (BOUNDARY_TOLERANCE, PCM_BYTES_PER_SECOND, PCM_SAMPLE_RATE, _relabel, _shift,
+                        decode_pcm, match_speakers)
+
+logger = logging.getLogger(__name__)
+
+# New audio gathered before it is sent off; shorter windows cost more requests and diarize worse
+MIN_NEW_SECONDS = float(os.environ.get('TRANSCRIBE_LIVE_MIN_SECONDS', '30'))
+
+SUMMARY_CHARS = 500
+
+
+def session_directory(session_id: str) -> str:
+    return data_path('live', session_id)
+
+
+def _write_wav(pcm_path: str, start: float, end: float, output_path: str):
+    """
+    Copy [start, end) of the raw PCM into a WAV file
+    """
+    first = int(start * PCM_SAMPLE_RATE) * 2
+    last = int(end * PCM_SAMPLE_RATE) * 2
+    with open(pcm_path, 'rb') as source, wave.open(output_path, 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(PCM_SAMPLE_RATE)
+        source.seek(first)
+        remaining = last - first
+        while remaining > 0:
+            block = source.read(min(remaining, 1024 * 1024))
+            if not block:
+                break
+            wav.writeframes(block)
+            remaining -= len(block)
+
+
+class LiveSession:
+    """
+    Transcript of one recording in progress, grown window by window
+
+    Files in the session directory:
+        audio.pcm: The recording decoded so far
+        transcript.txt: Finished speaker blocks of the formatted transcript
+        words.jsonl: Word timings of the final part of the transcript
+        state.json: Everything else, rewritten after each window
+    """
+
+    def __init__(self, session_id: str, directory: Optional[str] = None):
+        self.session_id = session_id
+        self.directory = directory or session_directory(session_id)
+        os.makedirs(self.directory, exist_ok=True)
+        self.pcm_path = os.path.join(self.directory, 'audio.pcm')
+        self.body_path = os.path.join(self.directory, 'transcript.txt')
+        self.words_path = os.path.join(self.directory, 'words.jsonl')
+        self.state_path = os.path.join(self.directory, 'state.json')
+        self.state: Dict[str, Any] = {}
+
+    @asynccontextmanager
+    async def locked(self):
+        """
+        Hold the session for one append; workers in other processes wait their turn
+        """
+        with open(os.path.join(self.directory, 'lock'), 'w') as lock:
+            await asyncio.to_thread(fcntl.flock, lock.fileno(), fcntl.LOCK_EX)
+            try:
+                self.state = self._load_state()
+                yield self
+            finally:
+                fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
+
+    def _load_state(self) -> Dict[str, Any]:
+        if os.path.exists(self.state_path):
+            with open(self.state_path, 'r') as f:
+                return json.load(f)
+        return {
+            "transcribed_seconds": 0.0,
+            "windows": 0,
+            "language": None,
+            "segments": SegmentTable.from_segments([]).to_compact(),
+            "last_segment_end": None,
+            "last_word_end": None,
+            "last_active": {},
+            # Speaker-matched segments of the latest window, for matching the next one through the overlap
+            "previous_segments": [],
+            "previous_end": 0.0,
+            "current_speaker": None,
+            "current_dialogue": [],
+            "summary": "",
+            "word_index": None,
+        }
+
+    def save_state(self):
+        temp_path = f"{self.state_path}.tmp"
+        with open(temp_path, 'w') as f:
+            json.dump(self.state, f, separators=(',', ':'))
+        os.replace(temp_path, self.state_path)
+
+    @property
+    def received_seconds(self) -> float:
+        return os.path.getsize(self.pcm_path) / PCM_BYTES_PER_SECOND if os.path.exists(self.pcm_path) else 0.0
+
+    @property
+    def transcribed_seconds(self) -> float:
+        return self.state["transcribed_seconds"]
+
+    async def receive(self, audio_path: str):
+        """
+        Decode the audio appended to the recording since the last call
+        """
+        received = self.received_seconds
+        with metrics.span('live_decode') as timed:
+            with open(self.pcm_path, 'ab') as output:
+                await decode_pcm(audio_path, received, output)
+            timed.add(seconds=round(self.received_seconds - received, 2))
+
+    async def transcribe_pending(self, service, filename: str, final: bool = False) -> int:
+        """
+        Transcribe the audio received but not yet transcribed, in as many windows as needed
+
+        Waits for MIN_NEW_SECONDS of new audio unless this is the final call.
+
+        Returns:
+            The number of windows transcribed
+        """
+        overlap = service.window_overlap_seconds
+        max_window = service.window_seconds if service.window_seconds > 0 else float('inf')
+        received = self.received_seconds
+        count = 0
+        while True:
+            pending = received - self.transcribed_seconds
+            if pending <= BOUNDARY_TOLERANCE or (not final and pending < MIN_NEW_SECONDS):
+                break
+            start = max(self.transcribed_seconds - overlap, 0.0)
+            end = min(start + max_window, received)
+            last = end >= received
+            # Each window keeps the first half of its overlap with the next one, as stitched windows do
+            upper = float('inf') if last and final else end - overlap / 2
+            result = await self._transcribe_window(service, filename, start, end)
+            self._commit((start, end), result, upper)
+            count += 1
+            if last:
+                break
+        return count
+
+    async def _transcribe_window(self, service, filename: str, start: float, end: float) -> Dict[str, Any]:
+        index = self.state["windows"]
+        window_path = os.path.join(self.directory, f"window_{index:04d}.wav")
+        try:
+            await asyncio.to_thread(_write_wav, self.pcm_path, start, end, window_path)
+            upload_name = f"{os.path.splitext(filename)[0]}.part{index:04d}.wav"
+            result = await service.transcribe_audio(window_path, upload_name)
+        finally:
+            if os.path.exists(window_path):
+                os.unlink(window_path)
+        self.state["windows"] = index + 1
+        return result
+
+    def _commit(self, window: Tuple[float, float], result: Dict[str, Any], upper: float):
+        """
+        Append the final part of a window's transcription to the transcript
+        """
+        start, end = window
+        state = self.state
+        state["language"] = state["language"] or result.get('language')
+        segments = sorted((_shift(segment, start) for segment in result.get('segments', [])), key=lambda s: s['start'])
+        words = [_shift(word, start) for word in result.get('words', [])]
+
+        if state["previous_segments"]:
+            mapping = match_speakers(state["previous_segments"], segments, (start, state["previous_end"]), state["last_active"])
+        else:
+            mapping = {s['speaker']: s['speaker'] for s in segments if s.get('speaker') is not None}
+        segments = [_relabel(segment, mapping) for segment in segments]
+        words = [_relabel(word, mapping) for word in words]
+        for segment in segments:
+            if segment.get('speaker') is not None:
+                state["last_active"][segment['speaker']] = max(state["last_active"].get(segment['speaker'], 0.0), segment['end'])
+
+        # Skip what the previous window already covered; stop before a segment the held-back tail cuts into
+        floor = state["last_segment_end"] - BOUNDARY_TOLERANCE if state["last_segment_end"] is not None else float('-inf')
+        kept: List[Dict[str, Any]] = []
+        cut = upper
+        for segment in segments:
+            if segment['start'] < floor:
+                continue
+            if segment['end'] > upper:
+                cut = segment['start']
+                break
+            kept.append(segment)
+        if cut <= self.transcribed_seconds:
+            # A segment longer than the overlap: keep it as transcribed rather than never getting past it
+            kept = [segment for segment in segments if floor <= segment['start'] < upper]
+            cut = upper
+        transcribed = min(cut, end)
+
+        word_floor = state["last_word_end"] - BOUNDARY_TOLERANCE if state["last_word_end"] is not None else float('-inf')
+        if not words:
+            words = [
+                {**word, "speaker": word.get('speaker', segment.get('speaker'))}
+                for segment in segments for word in segment.get('words') or []
+            ]
+        kept_words = [word for word in words if word_floor <= word['start'] < transcribed]
+
+        self._append(kept, kept_words)
+        state["transcribed_seconds"] = max(transcribed, self.transcribed_seconds)
+        if kept:
+            state["last_segment_end"] = kept[-1]['end']
+        if kept_words:
+            state["last_word_end"] = kept_words[-1]['end']
+        state["previous_segments"] = [
+            {"start": s['start'], "end": s['end'], "speaker": s.get('speaker')} for s in segments
+        ]
+        state["previous_end"] = end
+        logger.info(
+            f"Live session {self.session_id}: window {start:.1f}-{end:.1f}s added {len(kept)} segments, "
+            f"transcribed up to {self.transcribed_seconds:.1f}s"
+        )
+
+    def _append(self, segments: List[Dict[str, Any]], words: List[Dict[str, Any]]):
+        state = self.state
+        with metrics.span('formatting', segments=len(segments)):
+            table = SegmentTable.from_compact(state["segments"])
+            table.extend(segments)
+            state["segments"] = table.to_compact()
+
+            formatter = TranscriptFormatter(state["current_speaker"], state["current_dialogue"])
+            finished: List[str] = []
+            for segment in segments:
+                finished.extend(formatter.add(segment['start'], segment.get('speaker'), segment.get('text') or ''))
+            state["current_speaker"] = formatter.current_speaker
+            state["current_dialogue"] = formatter.current_dialogue
+            if finished:
+                with open(self.body_path, 'a') as f:
+                    f.write("".join(f"{line}\n" for line in finished))
+
+        if words:
+            with open(self.words_path, 'a') as f:
+                for word in words:
+                    f.write(json.dumps({key: word.get(key) for key in ('word', 'start', 'end', 'speaker')}) + '\n')
+
+        for segment in segments:
+            if len(state["summary"]) >= SUMMARY_CHARS:
+                break
+            text = (segment.get('text') or '').strip()
+            if text:
+                state["summary"] = f"{state['summary']} {text}".strip()
+
+    def transcript(self) -> str:
+        """
+        The formatted transcript so far, laid out as analyze_transcript lays it out
+        """
+        header = "\n".join(format_header(self.transcribed_seconds))
+        open_lines = TranscriptFormatter(self.state["current_speaker"], self.state["current_dialogue"]).open_lines()
+        if not open_lines:
+            return header
+        body = ""
+        if os.path.exists(self.body_path):
+            with open(self.body_path, 'r') as f:
+                body = f.read()
+        return f"{header}\n{body}" + "\n".join(open_lines)
+
+    def analysis(self, service) -> Dict[str, Any]:
+        segments = SegmentTable.from_compact(self.state["segments"])
+        duration = self.transcribed_seconds
+        summary = self.state["summary"]
+        return {
+            "Description": f"Live audio transcription ({duration:.2f} seconds so far) with speaker identification",
+            "Summary": summary[:SUMMARY_CHARS] + "..." if len(summary) > SUMMARY_CHARS else summary,
+            "Language": self.state["language"] or 'english',
+            "Duration": duration,
+            "Speakers": service._extract_speakers(segments),
+        }
+
+    def save_word_index(self, transcript: str):
+        """
+        Store the word index of the current transcript in place of the previous one
+        """
+        words = []
+        if os.path.exists(self.words_path):
+            with open(self.words_path, 'r') as f:
+                words = [json.loads(line) for line in f if line.strip()]
+        segments = SegmentTable.from_compact(self.state["segments"]).to_segments()
+        with metrics.span('word_index') as timed:
+            word_index = WordIndex.from_segments(segments, words or None)
+            path = word_index_path(transcript)
+            word_index.save(path)
+            timed.add(words=len(word_index))
+        previous = self.state["word_index"]
+        if previous and previous != path and os.path.exists(previous):
+            os.remove(previous)
+        self.state["word_index"] = path
+
+    def remove(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+async def append_audio(service, session_id: str, audio_path: str, filename: str, final: bool = False) -> Dict[str, Any]:
+    """
+    Take in what was appended to a recording in progress and extend its transcript
+
+    Args:
+        service: TranscriptionService used for each window
+        session_id: Identifies the recording, e.g. the meeting it belongs to
+        audio_path: The recording so far; each call sees the same file grown
+        filename: Name of the recording, for the uploads
+        final: The recording is complete: transcribe it to the end and close the session
+
+    Returns:
+        The transcript and analysis so far, with updated set when this call
+        added to the transcript
+    """
+    session = LiveSession(session_id)
+    async with session.locked():
+        await session.receive(audio_path)
+        windows = await session.transcribe_pending(service, filename, final=final)
+        transcript = session.transcript()
+        if windows or final:
+            try:
+                session.save_word_index(transcript)
+            except Exception as e:
+                logger.warning(f"Could not store word index: {str(e)}")
+        session.save_state()
+        result = {
+            "transcript": transcript,
+            "analysis": session.analysis(service),
+            "received_seconds": round(session.received_seconds, 2),
+            "transcribed_seconds": round(session.transcribed_seconds, 2),
+            "updated": windows > 0,
+            "final": final,
+        }
+    if final:
+        session.remove()
+    return result
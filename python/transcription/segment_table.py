@@ -0,0 +1,162 @@
+from array import array
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Identifies the layout of SegmentTable.to_compact() output
+COMPACT_FORMAT = "segments/1"
+# Speaker id of segments without a speaker label
+NO_SPEAKER = -1
+
+
+class SegmentTable:
+    """
+    Column-oriented transcript segments
+
+    Start and end times are flat arrays, speaker labels are interned to small
+    integer ids and every segment's text lives in one string addressed by
+    offsets. A multi-hour transcript costs a handful of arrays instead of a
+    dict per segment, and per-speaker views are computed when asked for
+    rather than stored as copies.
+    """
+
+    def __init__(self, starts: array, ends: array, speaker_ids: array, speakers: List[str], text: str, offsets: array):
+        self.starts = starts
+        self.ends = ends
+        self.speaker_ids = speaker_ids
+        self.speakers = speakers
+        self.text = text
+        self.offsets = offsets
+
+    @classmethod
+    def from_segments(cls, segments: Iterable[Dict[str, Any]]) -> "SegmentTable":
+        """
+        Build a table from API segments; word lists are not kept
+        """
+        table = cls(array('d'), array('d'), array('i'), [], "", array('Q', [0]))
+        table.extend(segments)
+        return table
+
+    def extend(self, segments: Iterable[Dict[str, Any]]):
+        """
+        Append API segments, e.g. as a live recording is transcribed
+        """
+        interned = {label: speaker_id for speaker_id, label in enumerate(self.speakers)}
+        texts = [self.text]
+        for segment in segments:
+            start = segment.get('start') or 0.0
+            self.starts.append(start)
+            self.ends.append(segment.get('end') if segment.get('end') is not None else start)
+            label = segment.get('speaker')
+            if label:
+                speaker_id = interned.get(label)
+                if speaker_id is None:
+                    speaker_id = interned[label] = len(self.speakers)
+                    self.speakers.append(label)
+                self.speaker_ids.append(speaker_id)
+            else:
+                self.speaker_ids.append(NO_SPEAKER)
+            text = segment.get('text') or ''
+            texts.append(text)
+            self.offsets.append(self.offsets[-1] + len(text))
+        self.text = "".join(texts)
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def text_at(self, index: int) -> str:
+        return self.text[self.offsets[index]:self.offsets[index + 1]]
+
+    def speaker_at(self, index: int) -> Optional[str]:
+        speaker_id = self.speaker_ids[index]
+        return self.speakers[speaker_id] if speaker_id != NO_SPEAKER else None
+
+    def __iter__(self) -> Iterator[Tuple[float, float, Optional[str], str]]:
+        """
+        Yield (start, end, speaker, text) for each segment in order
+        """
+        for index in range(len(self)):
+            yield self.starts[index], self.ends[index], self.speaker_at(index), self.text_at(index)
+
+    def segment(self, index: int) -> Dict[str, Any]:
+        return {
+            "id": index,
+            "start": self.starts[index],
+            "end": self.ends[index],
+            "speaker": self.speaker_at(index),
+            "text": self.text_at(index),
+        }
+
+    def speaker_segments(self, speaker: str) -> Iterator[Dict[str, Any]]:
+        """
+        Lazily yield the segments of one speaker
+        """
+        if speaker not in self.speakers:
+            return
+        speaker_id = self.speakers.index(speaker)
+        for index, segment_speaker in enumerate(self.speaker_ids):
+            if segment_speaker == speaker_id:
+                yield self.segment(index)
+
+    def speaker_stats(self) -> List[Dict[str, Any]]:
+        """
+        Segment count and speaking time of each speaker, ordered by label
+        """
+        counts = [0] * len(self.speakers)
+        seconds = [0.0] * len(self.speakers)
+        for index, speaker_id in enumerate(self.speaker_ids):
+            if speaker_id != NO_SPEAKER:
+                counts[speaker_id] += 1
+                seconds[speaker_id] += max(self.ends[index] - self.starts[index], 0.0)
+        return [
+            {"speaker": label, "segment_count": counts[speaker_id], "speaking_seconds": round(seconds[speaker_id], 2)}
+            for speaker_id, label in sorted(enumerate(self.speakers), key=lambda item: item[1])
+        ]
+
+    def to_compact(self) -> Dict[str, Any]:
+        """
+        Encode as JSON-ready columns
+        """
+        return {
+            "format": COMPACT_FORMAT,
+            "speakers": self.speakers,
+            "start": self.starts.tolist(),
+            "end": self.ends.tolist(),
+            "speaker": self.speaker_ids.tolist(),
+            "text": self.text,
+            "offsets": self.offsets.tolist(),
+        }
+
+    @classmethod
+    def from_compact(cls, data: Dict[str, Any]) -> "SegmentTable":
+        if data.get("format") != COMPACT_FORMAT:
+            raise ValueError(f"Unsupported segment format: {data.get('format')}")
+        return cls(
+            array('d', data["start"]),
+            array('d', data["end"]),
+            array('i', data["speaker"]),
+            list(data["speakers"]),
+            data["text"],
+            array('Q', data["offsets"]),
+        )
+
+    def to_segments(self) -> List[Dict[str, Any]]:
+        """
+        Expand back into one dict per segment
+        """
+        return [self.segment(index) for index in range(len(self))]
+
+
+def expand_analysis(analysis: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Convert a compact analysis to the expanded layout, with RawSegments and
+    each speaker's segments listed under Speakers
+    """
+    table = SegmentTable.from_compact(analysis["Segments"])
+    expanded = {key: value for key, value in analysis.items() if key != "Segments"}
+    expanded["RawSegments"] = table.to_segments()
+    expanded["Speakers"] = [
+        {**speaker, "segments": [
+            {"start": s["start"], "end": s["end"], "text": s["text"]} for s in table.speaker_segments(speaker["id"])
+        ]}
+        for speaker in analysis.get("Speakers", [])
+    ]
+    return expanded
@@ -1,8 +1,36 @@
-import requests
+import asyncio
+import hashlib
 import json
+import logging
 import os
-from typing import Dict, Any, Tuple
+import tempfile
+import zlib
+from typing import Dict, Any, Optional, Tuple
 from datetime import datetime
+from common import http, metrics
+from common.disk_cache import DiskCache
+from common.paths import data_path
+from .formatting import TranscriptFormatter, format_header
+from .segment_table import SegmentTable
+from .upload import DEFAULT_BLOCK_SIZE, MultipartFileStream, file_digest
+from knowledge.word_index import WordIndex, word_index_path
+from .windowing import extract_window, plan_windows, probe_duration, stitch_windows, window_filename
+
+logger = logging.getLogger(__name__)
+
+# Generous read timeout for long uploads and processing
+TRANSCRIBE_TIMEOUT = http.endpoint_timeout(300.0)
+# Raw transcriptions of recordings already sent, by content; the same recording is often uploaded several times
+TRANSCRIPTION_CACHE_MAX_MB = int(os.environ.get('TRANSCRIPTION_CACHE_MAX_MB', '1024'))
+
+# Form fields sent with every recording
+TRANSCRIBE_PARAMS = {
+    "response_format": "verbose_json",  # Get the most detailed output
+    "speaker_labels": "true",  # Enable speaker diarization
+    "language": "english",  # Specify language for better accuracy
+    "timestamp_granularities[]": "word",  # Enable word-level timestamps
+    "prompt": "Legal proceeding transcript with precise punctuation and speaker identification.",  # Guide transcription style
+}
 
 class TranscriptionService:
     def __init__(self):
@@ -13,42 +41,75 @@ class TranscriptionService:
         self.headers = {
             "Authorization": f"Bearer {self.lemonfox_api_key}"
         }
-        self.transcribe_endpoint = "https://api.lemonfox.ai/v1/audio/transcriptions"
+        self.transcribe_endpoint = os.environ.get('LEMONFOX_TRANSCRIBE_URL', "https://api.lemonfox.ai/v1/audio/transcriptions")
+        self.upload_block_size = int(os.environ.get('TRANSCRIBE_UPLOAD_BLOCK_SIZE', DEFAULT_BLOCK_SIZE))
+        
+        # Recordings longer than one window are transcribed in overlapping windows (0 disables)
+        self.window_seconds = float(os.environ.get('TRANSCRIBE_WINDOW_SECONDS', '600'))
+        self.window_overlap_seconds = float(os.environ.get('TRANSCRIBE_WINDOW_OVERLAP_SECONDS', '15'))
+        self.window_concurrency = int(os.environ.get('TRANSCRIBE_WINDOW_CONCURRENCY', '4'))
         
-    async def transcribe_audio(self, audio_data: bytes, filename: str) -> Dict[str, Any]:
+        # Raw verbose_json responses by audio content and transcription settings
+        self.result_cache = DiskCache(
+            data_path('transcription_cache.sqlite3'),
+            max_bytes=TRANSCRIPTION_CACHE_MAX_MB * 1024 * 1024
+        )
+        
+    async def transcribe_audio(self, audio_path: str, filename: str) -> Dict[str, Any]:
         """
         Transcribe audio using Lemonfox API with detailed output
+
+        The file is streamed from disk in fixed-size blocks, so memory use
+        does not grow with the size of the recording.
         """
         try:
-            # Prepare the request payload
-            files = {
-                "file": (filename, audio_data)
-            }
-            data = {
-                "response_format": "verbose_json",  # Get the most detailed output
-                "speaker_labels": "true",  # Enable speaker diarization
-                "language": "english",  # Specify language for better accuracy
-                "timestamp_granularities[]": "word",  # Enable word-level timestamps
-                "prompt": "Legal proceeding transcript with precise punctuation and speaker identification.",  # Guide transcription style
-            }
+            body = MultipartFileStream(audio_path, filename, TRANSCRIBE_PARAMS, block_size=self.upload_block_size)
             
-            # Make the API call
-            response = requests.post(
-                self.transcribe_endpoint,
-                headers=self.headers,
-                files=files,
-                data=data,
-                timeout=300  # Increased timeout for larger files
-            )
+            # Make the API call; the body is re-read from disk if the upload is retried
+            with metrics.span('transcription_api', bytes=os.path.getsize(audio_path)) as timed:
+                response = await http.request(
+                    "POST",
+                    self.transcribe_endpoint,
+                    headers={**self.headers, **body.headers},
+                    content=body,
+                    timeout=TRANSCRIBE_TIMEOUT
+                )
+                timed.add(status=response.status_code, response_bytes=len(response.content))
             
             if response.status_code != 200:
-                raise Exception(f"Transcription failed: {response.text}")
+                raise Exception(f"Transcription failed: {metrics.preview(response.text)}")
             
             return response.json()
                 
         except Exception as e:
             raise Exception(f"Error in transcription: {str(e)}")
             
+    async def transcribe_windowed(self, audio_path: str, filename: str, duration: float) -> Dict[str, Any]:
+        """
+        Transcribe a long recording as overlapping windows sent concurrently,
+        then stitch the window transcriptions back together
+        """
+        windows = plan_windows(duration, self.window_seconds, self.window_overlap_seconds)
+        semaphore = asyncio.Semaphore(self.window_concurrency)
+        
+        with tempfile.TemporaryDirectory(prefix="transcribe-windows-") as work_dir:
+            async def transcribe_window(index: int, start: float, end: float) -> Dict[str, Any]:
+                # Cut inside the semaphore so only in-flight windows occupy disk
+                async with semaphore:
+                    window_path = os.path.join(work_dir, f"window_{index:04d}.flac")
+                    with metrics.span('extract_window', seconds=round(end - start, 1)):
+                        await extract_window(audio_path, start, end - start, window_path)
+                    try:
+                        return await self.transcribe_audio(window_path, window_filename(filename, index))
+                    finally:
+                        os.unlink(window_path)
+            
+            results = await asyncio.gather(*(
+                transcribe_window(index, start, end) for index, (start, end) in enumerate(windows)
+            ))
+        
+        return stitch_windows(windows, results)
+            
     async def analyze_transcript(self, transcript_data: Dict[str, Any]) -> Dict[str, Any]:
         """
         Analyze the transcript data and structure it for our needs
@@ -59,60 +120,22 @@ class TranscriptionService:
             duration = transcript_data.get('duration', 0)
             language = transcript_data.get('language', 'english')
             
-            # Get segments with speaker information and timestamps
-            segments = transcript_data.get('segments', [])
+            with metrics.span('formatting') as timed:
+                # Get segments with speaker information and timestamps, held column-wise
+                segments = SegmentTable.from_segments(transcript_data.get('segments', []))
             
-            # Format the transcript in screenplay style with preserved formatting
-            formatted_lines = []
+                # Format the transcript in screenplay style with preserved formatting
+                formatted_lines = format_header(duration)
+                formatter = TranscriptFormatter()
+                for start_time, _, speaker, text in segments:
+                    formatted_lines.extend(formatter.add(start_time, speaker, text))
             
-            # Add header with proper spacing
-            formatted_lines.extend([
-                "LEGAL PROCEEDING TRANSCRIPT",
-                f"Duration: {duration:.2f} seconds",
-                "=" * 50,
-                "",  # Empty line after header
-            ])
+                # Output final speaker's dialogue
+                formatted_lines.extend(formatter.open_lines())
             
-            current_speaker = None
-            current_dialogue = []
-            
-            for segment in segments:
-                speaker = segment.get('speaker', 'Unknown')
-                start_time = segment.get('start', 0)
-                text = segment.get('text', '').strip()
-                
-                # Skip empty text
-                if not text:
-                    continue
-                    
-                # Skip repeated "transcript with precise punctuation" messages
-                if "transcript with precise punctuation" in text.lower():
-                    continue
-                
-                # Format timestamp as [MM:SS]
-                minutes = int(start_time) // 60
-                seconds = int(start_time) % 60
-                timestamp = f"[{minutes:02d}:{seconds:02d}]"
-                
-                # If speaker changes, output accumulated dialogue
-                if current_speaker and speaker != current_speaker:
-                    formatted_lines.append(f"{current_speaker}:")
-                    formatted_lines.extend([f"    {line}" for line in current_dialogue])
-                    formatted_lines.append("")  # Add empty line between speakers
-                    current_dialogue = []
-                
-                # Add new line to current dialogue
-                current_speaker = speaker
-                current_dialogue.append(f"{timestamp} {text}")
-            
-            # Output final speaker's dialogue
-            if current_dialogue:
-                formatted_lines.append(f"{current_speaker}:")
-                formatted_lines.extend([f"    {line}" for line in current_dialogue])
-                formatted_lines.append("")  # Add empty line at the end
-            
-            # Join with explicit newlines and double spacing between speakers
-            formatted_transcript = "\n".join(formatted_lines)
+                # Join with explicit newlines and double spacing between speakers
+                formatted_transcript = "\n".join(formatted_lines)
+                timed.add(segments=len(segments), chars=len(formatted_transcript))
             
             # Structure the analysis
             analysis = {
@@ -123,7 +146,7 @@ class TranscriptionService:
                 "Duration": duration,
                 "Speakers": self._extract_speakers(segments),
                 "FormattedTranscript": formatted_transcript,
-                "RawSegments": segments,  # Include full segment data
+                "Segments": segments.to_compact(),  # Full segment data, column-oriented
                 "Tasks": [],
                 "Decisions": [],
                 "Questions": [],
@@ -139,40 +162,133 @@ class TranscriptionService:
         except Exception as e:
             raise Exception(f"Error in analysis: {str(e)}")
     
-    def _extract_speakers(self, segments: list) -> list:
-        """
-        Extract unique speakers from the transcript segments with their timing information
-        """
-        speakers = {}
-        for segment in segments:
-            speaker = segment.get('speaker')
-            if speaker:
-                if speaker not in speakers:
-                    speakers[speaker] = {
-                        "name": f"Speaker {speaker}",
-                        "role": "Speaker",
-                        "segments": []
-                    }
-                speakers[speaker]["segments"].append({
-                    "start": segment.get('start'),
-                    "end": segment.get('end'),
-                    "text": segment.get('text')
-                })
-        
-        return [{"name": info["name"], "role": info["role"], "segments": info["segments"]} 
-                for speaker, info in sorted(speakers.items())]
+    def _extract_speakers(self, segments: SegmentTable) -> list:
+        """
+        Extract unique speakers with their segment count and speaking time
+
+        A speaker's segments are not copied here; SegmentTable.speaker_segments
+        derives them from the compact segment data when needed.
+        """
+        return [
+            {
+                "id": stats["speaker"],
+                "name": f"Speaker {stats['speaker']}",
+                "role": "Speaker",
+                "segment_count": stats["segment_count"],
+                "speaking_seconds": stats["speaking_seconds"]
+            }
+            for stats in segments.speaker_stats()
+        ]
             
-    async def process_audio(self, audio_data: bytes, filename: str) -> Tuple[Dict[str, Any], str]:
+    async def process_audio(self, audio_path: str, filename: str, use_cache: bool = True) -> Tuple[Dict[str, Any], str]:
         """
         Process audio file through the complete pipeline:
         1. Transcribe audio with detailed output
         2. Analyze transcript
         """
-        # Get the detailed transcription
-        transcript_data = await self.transcribe_audio(audio_data, filename)
+        transcript_data = await self.transcribe(audio_path, filename, use_cache=use_cache)
+        return await self.finish(transcript_data)
+
+    async def transcribe(self, audio_path: str, filename: str, use_cache: bool = True) -> Dict[str, Any]:
+        """
+        Get the detailed transcription, in windows if the recording is long
+
+        Args:
+            use_cache: Reuse the transcription of an earlier upload with the same content
+        """
+        with metrics.span('audio_hash', bytes=os.path.getsize(audio_path)) as timed:
+            digest = await asyncio.to_thread(file_digest, audio_path, self.upload_block_size)
+            cache_key = transcription_cache_key(digest, self._cache_params())
+            cached = self._cached_transcription(cache_key) if use_cache else None
+            timed.add(cached=cached is not None)
+        if cached is not None:
+            logger.info(f"Returning cached transcription {cache_key[:12]} of {filename}")
+            return cached
         
+        duration = await self._probe_duration(audio_path) if self.window_seconds > 0 else None
+        if duration is not None and duration > self.window_seconds:
+            transcript_data = await self.transcribe_windowed(audio_path, filename, duration)
+        else:
+            transcript_data = await self.transcribe_audio(audio_path, filename)
+        self._store_transcription(cache_key, transcript_data)
+        return transcript_data
+
+    def _cache_params(self) -> Dict[str, Any]:
+        """
+        Every setting that shapes a transcription
+        """
+        return {
+            "endpoint": self.transcribe_endpoint,
+            "fields": TRANSCRIBE_PARAMS,
+            "window_seconds": self.window_seconds,
+            "window_overlap_seconds": self.window_overlap_seconds,
+        }
+
+    def _cached_transcription(self, cache_key: str) -> Optional[Dict[str, Any]]:
+        try:
+            value = self.result_cache.get(cache_key)
+        except Exception as e:
+            logger.error(f"Error reading transcription cache: {str(e)}")
+            return None
+        if value is None:
+            return None
+        try:
+            return json.loads(zlib.decompress(value))
+        except Exception as e:
+            # A corrupt entry is dropped so the recording is transcribed and cached again
+            logger.error(f"Discarding unreadable cached transcription {cache_key[:12]}: {str(e)}")
+            try:
+                self.result_cache.delete(cache_key)
+            except Exception as e:
+                logger.error(f"Error deleting cached transcription: {str(e)}")
+            return None
+
+    def _store_transcription(self, cache_key: str, transcript_data: Dict[str, Any]):
+        try:
+            # verbose_json with word timings is mostly repeated keys, so it compresses well
+            value = zlib.compress(json.dumps(transcript_data, separators=(',', ':')).encode('utf-8'))
+            self.result_cache.set(cache_key, value)
+        except Exception as e:
+            logger.error(f"Error writing transcription cache: {str(e)}")
+
+    async def finish(self, transcript_data: Dict[str, Any]) -> Tuple[Dict[str, Any], str]:
+        """
+        Format a transcription and store its word index
+
+        Returns:
+            The analysis and the formatted transcript, as process_audio does
+        """
         # Analyze the transcript with all available data
         analysis = await self.analyze_transcript(transcript_data)
+        # Returned alongside the analysis, so it is not sent twice
+        transcript = analysis.pop("FormattedTranscript")
+        
+        # Keep the exact word timings so chat can answer count and phrase queries
+        try:
+            with metrics.span('word_index') as timed:
+                word_index = WordIndex.from_segments(transcript_data.get('segments', []), transcript_data.get('words'))
+                word_index.save(word_index_path(transcript))
+                timed.add(words=len(word_index))
+        except Exception as e:
+            logger.warning(f"Could not store word index: {str(e)}")
         
         # Return both the analysis and the formatted transcript
-        return analysis, analysis["FormattedTranscript"] 
\ No newline at end of file
+        return analysis, transcript
+
+    async def _probe_duration(self, audio_path: str) -> Optional[float]:
+        """
+        Get the recording duration, or None when ffprobe is unavailable
+        """
+        try:
+            return await probe_duration(audio_path)
+        except Exception as e:
+            logger.warning(f"Could not probe duration of {audio_path}, transcribing in one request: {str(e)}")
+            return None
+
+
+def transcription_cache_key(audio_digest: str, params: Dict[str, Any]) -> str:
+    """
+    Key a transcription by the recording's content and the settings it was made with
+    """
+    request = {"audio": audio_digest, "params": params}
+    return hashlib.sha256(json.dumps(request, sort_keys=True).encode('utf-8')).hexdigest()
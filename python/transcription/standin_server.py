@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Lemonfox transcription endpoint
+
+Answers multipart uploads with a deterministic verbose_json transcription
+so the windowed pipeline can be exercised without the real API:
+
+    python3 -m transcription.standin_server --port 8765
+    LEMONFOX_API_KEY=test LEMONFOX_TRANSCRIBE_URL=http://127.0.0.1:8765/v1/audio/transcriptions ...
+"""
+import argparse
+import io
+import json
+import subprocess
+import tempfile
+import time
+import wave
+from email.parser import BytesParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from .windowing import FFPROBE
+
+
+def _audio_duration(audio: bytes, default: float) -> float:
+    if audio[:4] == b'RIFF':
+        with wave.open(io.BytesIO(audio)) as wav:
+            return wav.getnframes() / float(wav.getframerate())
+    try:
+        with tempfile.NamedTemporaryFile() as f:
+            f.write(audio)
+            f.flush()
+            output = subprocess.run(
+                [FFPROBE, '-v', 'error', '-show_entries', 'format=duration',
+                 '-of', 'default=noprint_wrappers=1:nokey=1', f.name],
+                capture_output=True, check=True, text=True
+            ).stdout
+        return float(output.strip())
+    except (OSError, subprocess.CalledProcessError, ValueError):
+        return default
+
+
+def fake_transcription(duration: float, segment_seconds: float = 5.0, speakers: int = 2) -> dict:
+    """
+    Build a verbose_json response with evenly spaced segments and words
+    """
+    segments = []
+    words = []
+    start = 0.0
+    index = 0
+    while start < duration:
+        end = min(start + segment_seconds, duration)
+        speaker = f"SPEAKER_{(index // 3) % speakers:02d}"
+        segment_words = []
+        step = (end - start) / 4
+        for position in range(4):
+            segment_words.append({
+                "word": f"w{index}_{position}",
+                "start": round(start + position * step, 3),
+                "end": round(start + (position + 1) * step, 3),
+                "speaker": speaker,
+            })
+        segments.append({
+            "id": index,
+            "start": round(start, 3),
+            "end": round(end, 3),
+            "text": " ".join(word["word"] for word in segment_words) + ".",
+            "speaker": speaker,
+            "words": segment_words,
+        })
+        words.extend(segment_words)
+        start = end
+        index += 1
+    return {
+        "text": " ".join(segment["text"] for segment in segments),
+        "language": "english",
+        "duration": duration,
+        "segments": segments,
+        "words": words,
+    }
+
+
+def make_handler(default_duration: float, delay: float):
+    class StandInHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            message = BytesParser().parsebytes(
+                f"Content-Type: {self.headers.get('Content-Type')}\r\n\r\n".encode() + body
+            )
+            audio = b''
+            for part in message.get_payload() if message.is_multipart() else []:
+                if part.get_param('name', header='content-disposition') == 'file':
+                    audio = part.get_payload(decode=True) or b''
+
+            if delay:
+                time.sleep(delay)
+
+            payload = json.dumps(fake_transcription(_audio_duration(audio, default_duration))).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass
+
+    return StandInHandler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the Lemonfox transcription API")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--default-duration', type=float, default=60.0,
+                        help="Duration reported when the upload cannot be probed")
+    parser.add_argument('--delay', type=float, default=0.0, help="Seconds to wait before answering")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(('127.0.0.1', args.port), make_handler(args.default_duration, args.delay))
+    print(f"Stand-in transcription server on http://127.0.0.1:{args.port}/v1/audio/transcriptions")
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+import asyncio
+import hashlib
+import os
+import time
+import uuid
+from typing import AsyncIterator, Dict
+
+from common import metrics
+
+# Bytes read from disk per step; bounds upload memory regardless of file size
+DEFAULT_BLOCK_SIZE = 1024 * 1024
+
+
+def file_digest(path: str, block_size: int = DEFAULT_BLOCK_SIZE) -> str:
+    """
+    SHA-256 of a file's content, read in fixed-size blocks like the upload itself
+    """
+    digest = hashlib.sha256()
+    buffer = bytearray(block_size)
+    view = memoryview(buffer)
+    with open(path, 'rb', buffering=0) as f:
+        while True:
+            read = f.readinto(buffer)
+            if not read:
+                break
+            digest.update(view[:read])
+    return digest.hexdigest()
+
+
+class MultipartFileStream:
+    """
+    multipart/form-data body that streams a file from disk in fixed-size blocks
+
+    Iterating again reopens the file, so the same body can be replayed.
+    """
+
+    def __init__(self, path: str, filename: str, fields: Dict[str, str], file_field: str = "file",
+                 block_size: int = DEFAULT_BLOCK_SIZE):
+        self.path = path
+        self.block_size = block_size
+        self.boundary = uuid.uuid4().hex
+
+        parts = []
+        for name, value in fields.items():
+            parts.append(
+                f'--{self.boundary}\r\n'
+                f'Content-Disposition: form-data; name="{name}"\r\n\r\n'
+                f'{value}\r\n'
+            )
+        safe_filename = filename.replace('"', '%22').replace('\r', '').replace('\n', '')
+        parts.append(
+            f'--{self.boundary}\r\n'
+            f'Content-Disposition: form-data; name="{file_field}"; filename="{safe_filename}"\r\n'
+            'Content-Type: application/octet-stream\r\n\r\n'
+        )
+        self._head = "".join(parts).encode('utf-8')
+        self._tail = f'\r\n--{self.boundary}--\r\n'.encode('utf-8')
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        return {
+            "Content-Type": f"multipart/form-data; boundary={self.boundary}",
+            "Content-Length": str(len(self._head) + os.path.getsize(self.path) + len(self._tail)),
+        }
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        started = time.perf_counter()
+        read_seconds = 0.0
+        sent = 0
+        yield self._head
+        with open(self.path, 'rb') as f:
+            while True:
+                # Keep blocking disk reads off the event loop
+                read_started = time.perf_counter()
+                block = await asyncio.to_thread(f.read, self.block_size)
+                read_seconds += time.perf_counter() - read_started
+                if not block:
+                    break
+                sent += len(block)
+                yield block
+        yield self._tail
+        # Reading overlaps sending, so the upload time includes the reads
+        metrics.record({"stage": "file_read", "ms": round(read_seconds * 1000, 2), "bytes": sent})
+        metrics.record({"stage": "upload", "ms": round((time.perf_counter() - started) * 1000, 2), "bytes": sent})
@@ -0,0 +1,217 @@
+import asyncio
+import copy
+import os
+import re
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+FFMPEG = os.environ.get('FFMPEG_PATH', 'ffmpeg')
+FFPROBE = os.environ.get('FFPROBE_PATH', 'ffprobe')
+
+# Tolerance in seconds when dropping overlap duplicates at a window boundary
+BOUNDARY_TOLERANCE = 0.25
+
+# Raw audio kept for recordings still in progress: mono 16 kHz signed 16-bit little-endian
+PCM_SAMPLE_RATE = 16000
+PCM_BYTES_PER_SECOND = PCM_SAMPLE_RATE * 2
+
+Window = Tuple[float, float]
+
+
+async def _run(*args: str) -> str:
+    process = await asyncio.create_subprocess_exec(
+        *args,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE
+    )
+    stdout, stderr = await process.communicate()
+    if process.returncode != 0:
+        raise Exception(f"{os.path.basename(args[0])} failed: {stderr.decode(errors='replace').strip()}")
+    return stdout.decode()
+
+
+async def probe_duration(audio_path: str) -> float:
+    """
+    Get the duration of an audio file in seconds using ffprobe
+    """
+    output = await _run(
+        FFPROBE, '-v', 'error',
+        '-show_entries', 'format=duration',
+        '-of', 'default=noprint_wrappers=1:nokey=1',
+        audio_path
+    )
+    return float(output.strip())
+
+
+async def extract_window(audio_path: str, start: float, duration: float, output_path: str):
+    """
+    Cut one time window out of an audio file as mono 16 kHz FLAC
+    """
+    await _run(
+        FFMPEG, '-v', 'error', '-y',
+        '-ss', f"{start:.3f}", '-t', f"{duration:.3f}",
+        '-i', audio_path,
+        '-vn', '-ac', '1', '-ar', '16000', '-c:a', 'flac',
+        output_path
+    )
+
+
+async def decode_pcm(audio_path: str, start: float, output) -> None:
+    """
+    Decode an audio file from start seconds on as raw PCM, appending to an open binary file
+
+    A file that is still being written decodes up to its last complete frame.
+    """
+    process = await asyncio.create_subprocess_exec(
+        FFMPEG, '-v', 'error',
+        '-ss', f"{start:.3f}",
+        '-i', audio_path,
+        '-vn', '-ac', '1', '-ar', str(PCM_SAMPLE_RATE), '-f', 's16le', '-',
+        stdout=output,
+        stderr=asyncio.subprocess.PIPE
+    )
+    _, stderr = await process.communicate()
+    if process.returncode != 0:
+        raise Exception(f"{os.path.basename(FFMPEG)} failed: {stderr.decode(errors='replace').strip()}")
+
+
+def plan_windows(duration: float, window_seconds: float, overlap_seconds: float) -> List[Window]:
+    """
+    Split [0, duration] into windows of window_seconds that overlap by overlap_seconds
+    """
+    if window_seconds <= overlap_seconds:
+        raise ValueError("window_seconds must be larger than overlap_seconds")
+    windows = []
+    start = 0.0
+    while True:
+        end = min(start + window_seconds, duration)
+        windows.append((start, end))
+        if end >= duration:
+            break
+        start = end - overlap_seconds
+    return windows
+
+
+def _shift(item: Dict[str, Any], offset: float) -> Dict[str, Any]:
+    item = copy.deepcopy(item)
+    for key in ('start', 'end'):
+        if isinstance(item.get(key), (int, float)):
+            item[key] = item[key] + offset
+    for word in item.get('words') or []:
+        for key in ('start', 'end'):
+            if isinstance(word.get(key), (int, float)):
+                word[key] = word[key] + offset
+    return item
+
+
+def _relabel(item: Dict[str, Any], mapping: Dict[str, str]) -> Dict[str, Any]:
+    if item.get('speaker') in mapping:
+        item['speaker'] = mapping[item['speaker']]
+    for word in item.get('words') or []:
+        if word.get('speaker') in mapping:
+            word['speaker'] = mapping[word['speaker']]
+    return item
+
+
+def _fresh_label(known: set) -> str:
+    index = 0
+    while f"SPEAKER_{index:02d}" in known:
+        index += 1
+    return f"SPEAKER_{index:02d}"
+
+
+def match_speakers(previous: List[Dict[str, Any]], current: List[Dict[str, Any]],
+                   overlap: Window, known_labels: Iterable[str]) -> Dict[str, str]:
+    """
+    Map a window's local speaker labels onto the labels used so far
+
+    Labels are paired greedily by how long they talk at the same time inside
+    the overlap. A speaker left unpaired, such as someone who first talks
+    in this window, gets a new label: guessing one of the known speakers
+    would attribute their words to someone else.
+    """
+    overlap_start, overlap_end = overlap
+    scores: Dict[Tuple[str, str], float] = {}
+    for segment in current:
+        local = segment.get('speaker')
+        if local is None:
+            continue
+        for other in previous:
+            known_label = other.get('speaker')
+            if known_label is None:
+                continue
+            start = max(segment['start'], other['start'], overlap_start)
+            end = min(segment['end'], other['end'], overlap_end)
+            if end > start:
+                scores[(local, known_label)] = scores.get((local, known_label), 0.0) + end - start
+
+    mapping: Dict[str, str] = {}
+    taken = set()
+    for (local, known_label), _ in sorted(scores.items(), key=lambda item: item[1], reverse=True):
+        if local not in mapping and known_label not in taken:
+            mapping[local] = known_label
+            taken.add(known_label)
+
+    for segment in current:
+        local = segment.get('speaker')
+        if local is None or local in mapping:
+            continue
+        mapping[local] = _fresh_label(set(known_labels) | taken)
+        taken.add(mapping[local])
+    return mapping
+
+
+def stitch_windows(windows: List[Window], results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Stitch per-window verbose_json transcriptions into one transcription
+
+    Timestamps are shifted by each window's start, the overlap between two
+    windows is cut at its midpoint (dropping anything already covered by the
+    previous window) and speaker labels are reconciled across windows.
+    """
+    segments: List[Dict[str, Any]] = []
+    words: List[Dict[str, Any]] = []
+    known_labels = set()
+    previous_segments: List[Dict[str, Any]] = []
+    language: Optional[str] = None
+
+    for index, ((start, end), result) in enumerate(zip(windows, results)):
+        language = language or result.get('language')
+        window_segments = [_shift(segment, start) for segment in result.get('segments', [])]
+        window_words = [_shift(word, start) for word in result.get('words', [])]
+
+        if index == 0:
+            mapping = {s['speaker']: s['speaker'] for s in window_segments if s.get('speaker') is not None}
+        else:
+            mapping = match_speakers(previous_segments, window_segments, (start, windows[index - 1][1]), known_labels)
+        window_segments = [_relabel(segment, mapping) for segment in window_segments]
+        window_words = [_relabel(word, mapping) for word in window_words]
+        known_labels.update(segment['speaker'] for segment in window_segments if segment.get('speaker') is not None)
+
+        # Each window owns the time between the midpoints of its overlaps
+        lower = float('-inf') if index == 0 else (windows[index - 1][1] + start) / 2
+        upper = float('inf') if index == len(windows) - 1 else (end + windows[index + 1][0]) / 2
+        segment_floor = max(lower, segments[-1]['end'] - BOUNDARY_TOLERANCE) if segments else lower
+        word_floor = max(lower, words[-1]['end'] - BOUNDARY_TOLERANCE) if words else lower
+
+        segments.extend(s for s in window_segments if segment_floor <= s['start'] < upper)
+        words.extend(w for w in window_words if word_floor <= w['start'] < upper)
+        previous_segments = window_segments
+
+    for position, segment in enumerate(segments):
+        segment['id'] = position
+
+    return {
+        "text": " ".join(segment.get('text', '').strip() for segment in segments).strip(),
+        "language": language,
+        "duration": windows[-1][1] if windows else 0,
+        "segments": segments,
+        "words": words,
+    }
+
+
+def window_filename(filename: str, index: int) -> str:
+    """
+    Name of the upload for one window of a recording
+    """
+    stem = re.sub(r'\.[^.]+$', '', filename)
+    return f"{stem}.part{index:04d}.flac"
@@ -0,0 +1,4 @@
+from .client import WorkerError, WorkerUnavailable, call, stream
+from .handlers import ServiceRegistry
+
+__all__ = ['ServiceRegistry', 'WorkerError', 'WorkerUnavailable', 'call', 'stream']
@@ -0,0 +1,33 @@
+import argparse
+import logging
+import os
+
+from .protocol import DEFAULT_SOCKET_PATH
+from .server import serve
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(process)d - %(name)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.FileHandler('worker.log'),
+        logging.StreamHandler()
+    ]
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Resident worker pool for chat, analysis and transcription jobs")
+    parser.add_argument('--socket', default=DEFAULT_SOCKET_PATH, help="Unix socket to listen on")
+    parser.add_argument('--pool-size', type=int, default=int(os.environ.get('WORKER_POOL_SIZE', '2')),
+                        help="Number of worker processes")
+    parser.add_argument('--max-concurrency', type=int, default=int(os.environ.get('WORKER_MAX_CONCURRENCY', '4')),
+                        help="Jobs handled at once by each worker process")
+    parser.add_argument('--no-warm', action='store_true', help="Skip loading services and models at startup")
+    args = parser.parse_args()
+
+    serve(args.socket, pool_size=args.pool_size, max_concurrency=args.max_concurrency, warm=not args.no_warm)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+import itertools
+import os
+import socket
+from typing import Any, Dict, Iterator, Optional
+
+from common import metrics
+
+from .protocol import DEFAULT_SOCKET_PATH, decode_message, encode_message
+
+_request_ids = itertools.count(1)
+
+
+class WorkerUnavailable(Exception):
+    """Raised when no resident worker is listening on the socket."""
+
+
+class WorkerError(Exception):
+    """Raised when the worker accepted a job but the job itself failed."""
+
+
+def _connect(socket_path: Optional[str]) -> socket.socket:
+    """
+    Connect to the worker pool socket
+    """
+    if os.environ.get('WORKER_DISABLED') == '1':
+        raise WorkerUnavailable("Resident worker disabled via WORKER_DISABLED")
+
+    socket_path = socket_path or DEFAULT_SOCKET_PATH
+    if not os.path.exists(socket_path):
+        raise WorkerUnavailable(f"No worker socket at {socket_path}")
+
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(5.0)
+    try:
+        sock.connect(socket_path)
+    except (ConnectionRefusedError, FileNotFoundError, socket.timeout) as e:
+        sock.close()
+        raise WorkerUnavailable(f"Could not connect to worker at {socket_path}: {str(e)}")
+    return sock
+
+
+def _send(sock: socket.socket, op: str, payload: Dict[str, Any], stream: bool = False):
+    message = {"id": f"{os.getpid()}-{next(_request_ids)}", "op": op, "payload": payload}
+    if stream:
+        message["stream"] = True
+    sock.sendall(encode_message(message))
+
+
+def _read_messages(sock: socket.socket) -> Iterator[Dict[str, Any]]:
+    """
+    Yield the messages the worker sends back, one per line
+    """
+    buffer = bytearray()
+    while True:
+        data = sock.recv(1024 * 1024)
+        if not data:
+            raise WorkerError("Worker closed the connection before replying")
+        buffer.extend(data)
+        while True:
+            end = buffer.find(b'\n')
+            if end < 0:
+                break
+            line = bytes(buffer[:end + 1])
+            del buffer[:end + 1]
+            yield decode_message(line)
+
+
+def call(op: str, payload: Dict[str, Any], socket_path: Optional[str] = None, timeout: Optional[float] = None) -> Any:
+    """
+    Send a single job to the resident worker pool and wait for its result
+
+    Args:
+        op: Name of the operation (chat, analyze, transcribe, live, ping)
+        payload: Operation input, the same shape the CLI input files use
+        socket_path: Unix socket of the worker pool
+        timeout: Seconds to wait for the result, None to wait indefinitely
+    """
+    sock = _connect(socket_path)
+    try:
+        sock.settimeout(timeout)
+        _send(sock, op, payload)
+        response = next(_read_messages(sock))
+    finally:
+        sock.close()
+
+    # Stage timings of the job, as if it had run in this process
+    metrics.extend(response.get('metrics', []))
+    if not response.get('ok'):
+        raise WorkerError(response.get('error', 'Unknown worker error'))
+    return response.get('result')
+
+
+def stream(op: str, payload: Dict[str, Any], socket_path: Optional[str] = None, timeout: Optional[float] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Send a streaming job to the resident worker pool and yield its events
+    as they arrive
+
+    The connection is made before the first event is requested, so
+    WorkerUnavailable is raised by the call itself rather than mid-stream.
+
+    Args:
+        op: Name of a streaming operation (chat)
+        payload: Operation input, the same shape the CLI input files use
+        socket_path: Unix socket of the worker pool
+        timeout: Seconds to wait between events, None to wait indefinitely
+    """
+    sock = _connect(socket_path)
+    sock.settimeout(timeout)
+
+    def events() -> Iterator[Dict[str, Any]]:
+        try:
+            _send(sock, op, payload, stream=True)
+            for message in _read_messages(sock):
+                if 'event' in message:
+                    yield message['event']
+                    continue
+                metrics.extend(message.get('metrics', []))
+                if not message.get('ok'):
+                    raise WorkerError(message.get('error', 'Unknown worker error'))
+                return
+        finally:
+            sock.close()
+
+    return events()
@@ -0,0 +1,226 @@
+import importlib.util
+import logging
+import os
+import sys
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict
+
+from common.paths import REPO_ROOT
+
+logger = logging.getLogger(__name__)
+
+# Service classes by name: (module name, source file, class name)
+SERVICE_SOURCES = {
+    'chat': ('chat_service', os.path.join(REPO_ROOT, 'app', 'api', 'chat', 'service.py'), 'ChatService'),
+    'analyze': ('analysis_service', os.path.join(REPO_ROOT, 'app', 'api', 'analyze', 'service.py'), 'AnalysisService'),
+    'transcribe': ('transcription', None, 'TranscriptionService'),
+}
+
+
+def _load_service_class(name: str):
+    """
+    Import a service class, loading route-local service modules by path
+    """
+    module_name, path, class_name = SERVICE_SOURCES[name]
+    module = sys.modules.get(module_name)
+    if module is None:
+        if path is None:
+            module = importlib.import_module(module_name)
+        else:
+            spec = importlib.util.spec_from_file_location(module_name, path)
+            module = importlib.util.module_from_spec(spec)
+            sys.modules[module_name] = module
+            spec.loader.exec_module(module)
+    return getattr(module, class_name)
+
+
+class ServiceRegistry:
+    """
+    Holds one instance of each service so that clients, models and
+    connections are built once per process instead of once per request
+    """
+
+    def __init__(self):
+        self._services: Dict[str, Any] = {}
+
+    def get(self, name: str) -> Any:
+        """
+        Get a service instance, constructing it on first use
+        """
+        if name not in self._services:
+            service_class = _load_service_class(name)
+            self._services[name] = service_class()
+            logger.info(f"Initialized {service_class.__name__}")
+        return self._services[name]
+
+    def warm(self):
+        """
+        Construct every service that is configured and load the embedding model
+        """
+        for name in SERVICE_SOURCES:
+            try:
+                service = self.get(name)
+            except ValueError as e:
+                # Missing API keys only disable the affected operation
+                logger.warning(f"Skipping {name} service: {str(e)}")
+                continue
+
+            embedding_function = getattr(service, 'embedding_function', None)
+            if embedding_function is not None:
+                # Call the wrapped model directly so a cache hit cannot skip loading it
+                getattr(embedding_function, 'embedding_function', embedding_function)(["warmup"])
+        logger.info(f"Warmed services: {sorted(self._services)}")
+
+    @property
+    def loaded(self) -> list:
+        return sorted(self._services)
+
+    async def handle(self, op: str, payload: Dict[str, Any]) -> Any:
+        """
+        Run a single operation against the held services
+        """
+        handler = OPERATIONS.get(op)
+        if handler is None:
+            raise ValueError(f"Unknown operation: {op}")
+        return await handler(self, payload)
+
+    def stream(self, op: str, payload: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Run a single operation that reports its progress as a series of events
+        """
+        handler = STREAMING_OPERATIONS.get(op)
+        if handler is None:
+            raise ValueError(f"Operation does not support streaming: {op}")
+        return handler(self, payload)
+
+    async def drain(self):
+        """
+        Wait for the work services carry on after answering, before the process exits
+        """
+        for service in self._services.values():
+            wait_for_background = getattr(service, 'wait_for_background', None)
+            if wait_for_background is not None:
+                await wait_for_background()
+
+
+async def _ping(registry: ServiceRegistry, payload: Dict[str, Any]) -> Dict[str, Any]:
+    return {"pid": os.getpid(), "services": registry.loaded}
+
+
+async def _prepare_chat(registry: ServiceRegistry, payload: Dict[str, Any]):
+    service = registry.get('chat')
+
+    # Initialize knowledge base with transcript if not already done
+    logger.info(f"Initializing knowledge base for meeting {payload['meeting_id']}")
+    await service.initialize_knowledge(
+        transcript=payload['transcript'],
+        meeting_id=payload['meeting_id']
+    )
+    return service
+
+
+async def _chat(registry: ServiceRegistry, payload: Dict[str, Any]) -> Dict[str, Any]:
+    service = await _prepare_chat(registry, payload)
+
+    # Get response for the query with conversation history
+    logger.info(f"Getting response for query with conversation_id: {payload.get('conversation_id')}")
+    return await service.get_response(
+        query=payload['query'],
+        meeting_id=payload['meeting_id'],
+        conversation_id=payload.get('conversation_id')  # Optional conversation ID
+    )
+
+
+async def _chat_stream(registry: ServiceRegistry, payload: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+    service = await _prepare_chat(registry, payload)
+
+    logger.info(f"Streaming response for query with conversation_id: {payload.get('conversation_id')}")
+    async for event in service.stream_response(
+        query=payload['query'],
+        meeting_id=payload['meeting_id'],
+        conversation_id=payload.get('conversation_id')
+    ):
+        yield event
+
+
+async def _analyze(registry: ServiceRegistry, payload: Dict[str, Any]) -> Dict[str, Any]:
+    service = registry.get('analyze')
+
+    # Several analysis types share one prepared transcript
+    if 'type_prompts' in payload:
+        logger.info(f"Processing analysis request with types: {list(payload['type_prompts'])}")
+        results = await service.analyze_many(
+            transcript=payload['transcript'],
+            system_prompt=payload['system_prompt'],
+            base_prompt=payload['base_prompt'],
+            type_prompts=payload['type_prompts'],
+            use_cache=not payload.get('bypass_cache', False)
+        )
+        return {'results': results}
+
+    logger.info(f"Processing analysis request with type: {payload.get('analysis_type', 'base')}")
+    return await service.analyze_transcript(
+        transcript=payload['transcript'],
+        system_prompt=payload['system_prompt'],
+        base_prompt=payload['base_prompt'],
+        type_prompt=payload.get('type_prompt', ''),
+        use_cache=not payload.get('bypass_cache', False)
+    )
+
+
+async def _transcribe(registry: ServiceRegistry, payload: Dict[str, Any]) -> Dict[str, Any]:
+    service = registry.get('transcribe')
+    analysis, transcript = await service.process_audio(
+        payload['audio_path'],
+        payload['filename'],
+        use_cache=not payload.get('bypass_cache', False)
+    )
+    if payload.get('segments') == 'expanded':
+        from transcription.segment_table import expand_analysis
+
+        # One dict per segment, and each speaker's segments listed under Speakers
+        analysis = expand_analysis(analysis)
+    return {
+        'analysis': analysis,
+        'transcript': transcript
+    }
+
+
+async def _live(registry: ServiceRegistry, payload: Dict[str, Any]) -> Dict[str, Any]:
+    from transcription.live import append_audio
+
+    service = registry.get('transcribe')
+    result = await append_audio(
+        service,
+        session_id=payload['meeting_id'],
+        audio_path=payload['audio_path'],
+        filename=payload['filename'],
+        final=payload.get('final', False)
+    )
+
+    # Embed the new chunks now, so chat on the partial transcript does not wait for them
+    result['indexed'] = False
+    if result['updated'] or result['final']:
+        try:
+            chat_service = registry.get('chat')
+        except ValueError as e:
+            logger.warning(f"Not indexing live transcript: {str(e)}")
+        else:
+            result['indexed'] = await chat_service.initialize_knowledge(
+                transcript=result['transcript'],
+                meeting_id=payload['meeting_id']
+            )
+    return result
+
+
+OPERATIONS: Dict[str, Callable[[ServiceRegistry, Dict[str, Any]], Awaitable[Any]]] = {
+    'ping': _ping,
+    'chat': _chat,
+    'analyze': _analyze,
+    'transcribe': _transcribe,
+    'live': _live,
+}
+
+# Operations that yield events instead of returning a single result
+STREAMING_OPERATIONS: Dict[str, Callable[[ServiceRegistry, Dict[str, Any]], AsyncIterator[Dict[str, Any]]]] = {
+    'chat': _chat_stream,
+}
@@ -0,0 +1,486 @@
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+from common import metrics
+from common.paths import data_path
+
+from .handlers import ServiceRegistry
+
+logger = logging.getLogger(__name__)
+
+JOB_STATES = ('queued', 'running', 'done', 'failed')
+
+# Submissions are refused once this many jobs are waiting, so load turns into backpressure
+MAX_QUEUED_JOBS = int(os.environ.get('JOB_QUEUE_MAX_QUEUED', '100'))
+# Jobs run at the same time by one runner
+DEFAULT_JOB_WORKERS = int(os.environ.get('JOB_WORKERS', '2'))
+# Seconds an idle runner waits before looking for new jobs
+POLL_INTERVAL = 0.5
+# Delivered and failed jobs are deleted once they are this old
+JOB_RETENTION_HOURS = float(os.environ.get('JOB_RETENTION_HOURS', '168'))
+# Seconds between purges while a runner is up
+PURGE_INTERVAL = 3600
+# Seconds between a runner's heartbeats
+HEARTBEAT_INTERVAL = 10
+# A runner that has not sent a heartbeat for this long is presumed dead and its running jobs are queued again
+RUNNER_LEASE_SECONDS = float(os.environ.get('JOB_RUNNER_LEASE_SECONDS', '60'))
+# The runner posts finished jobs of these ops to the app, which stores the result; {id} is the job id
+COMPLETION_URLS = {
+    'transcribe': os.environ.get('TRANSCRIBE_COMPLETION_URL',
+                                 os.environ.get('SITE_URL', 'http://localhost:3000') + '/api/transcribe/jobs/{id}'),
+}
+# Seconds the app gets to respond to a completion post
+COMPLETION_TIMEOUT_SECONDS = float(os.environ.get('JOB_COMPLETION_TIMEOUT_SECONDS', '120'))
+# Seconds between retries of completion posts the app did not accept
+COMPLETION_RETRY_INTERVAL = 60
+# A delivered result without a receipt this old is assumed lost with its caller and handed out again
+UNRECEIPTED_DELIVERY_SECONDS = float(os.environ.get('JOB_UNRECEIPTED_DELIVERY_SECONDS', '600'))
+
+
+class QueueFull(Exception):
+    """Raised when a job is submitted while the queue is at capacity."""
+
+
+class JobQueue:
+    """
+    Durable job queue in SQLite
+
+    Jobs move queued -> running -> done | failed. Higher priorities are
+    claimed first, then older jobs. Results stay in the queue until the
+    submitter collects them with deliver() and records where it stored
+    them with acknowledge(), and purge() deletes delivered and failed jobs
+    once they are past retention.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or data_path('jobs.sqlite3')
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, timeout=30.0, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                op TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                priority INTEGER NOT NULL DEFAULT 0,
+                state TEXT NOT NULL,
+                result TEXT,
+                error TEXT,
+                metrics TEXT,
+                runner_id TEXT,
+                created_at REAL NOT NULL,
+                started_at REAL,
+                finished_at REAL,
+                delivered_at REAL,
+                receipt TEXT
+            );
+            CREATE INDEX IF NOT EXISTS jobs_claim ON jobs (state, priority DESC, created_at);
+            CREATE TABLE IF NOT EXISTS runners (
+                id TEXT PRIMARY KEY,
+                pid INTEGER,
+                heartbeat_at REAL NOT NULL
+            );
+        """)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        # Queues created before stage metrics were recorded
+        if 'metrics' not in columns:
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN metrics TEXT")
+        # Queues created before stored results were acknowledged
+        if 'receipt' not in columns:
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN receipt TEXT")
+        # Queues created when runners were told apart by process id
+        if 'runner_id' not in columns:
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN runner_id TEXT")
+
+    def submit(self, op: str, payload: Dict[str, Any], priority: int = 0, max_queued: int = MAX_QUEUED_JOBS) -> str:
+        """
+        Add a job to the queue
+
+        Returns:
+            The job id
+
+        Raises:
+            QueueFull: If max_queued jobs are already waiting
+        """
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                queued = self._conn.execute("SELECT COUNT(*) FROM jobs WHERE state = 'queued'").fetchone()[0]
+                if queued >= max_queued:
+                    raise QueueFull(f"{queued} jobs are already waiting")
+                self._conn.execute(
+                    "INSERT INTO jobs (id, op, payload, priority, state, created_at) VALUES (?, ?, ?, ?, 'queued', ?)",
+                    (job_id, op, json.dumps(payload), priority, time.time())
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return job_id
+
+    def claim(self, runner_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Take the next queued job and mark it running under the given runner
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT id, op, payload FROM jobs WHERE state = 'queued' ORDER BY priority DESC, created_at LIMIT 1"
+                ).fetchone()
+                if row is not None:
+                    self._conn.execute(
+                        "UPDATE jobs SET state = 'running', runner_id = ?, started_at = ? WHERE id = ?",
+                        (runner_id, time.time(), row[0])
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        if row is None:
+            return None
+        return {"id": row[0], "op": row[1], "payload": json.loads(row[2])}
+
+    def complete(self, job_id: str, result: Any, stage_metrics: Optional[List[Dict[str, Any]]] = None):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET state = 'done', result = ?, metrics = ?, finished_at = ? WHERE id = ?",
+                (json.dumps(result), json.dumps(stage_metrics or []), time.time(), job_id)
+            )
+
+    def fail(self, job_id: str, error: str, stage_metrics: Optional[List[Dict[str, Any]]] = None):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET state = 'failed', error = ?, metrics = ?, finished_at = ? WHERE id = ?",
+                (error, json.dumps(stage_metrics or []), time.time(), job_id)
+            )
+
+    def status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the state of a job without its result, or None if it does not exist
+
+        Queued jobs include their position, the number of jobs that will be
+        claimed before them.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT state, priority, error, metrics, created_at, started_at, finished_at, delivered_at, receipt "
+                "FROM jobs WHERE id = ?",
+                (job_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            state, priority, error, stage_metrics, created_at, started_at, finished_at, delivered_at, receipt = row
+            status = {
+                "id": job_id,
+                "state": state,
+                "priority": priority,
+                "created_at": created_at,
+                "started_at": started_at,
+                "finished_at": finished_at,
+                "delivered": delivered_at is not None,
+            }
+            if state == 'queued':
+                status["position"] = self._conn.execute(
+                    "SELECT COUNT(*) FROM jobs WHERE state = 'queued' AND (priority > ? OR (priority = ? AND created_at < ?))",
+                    (priority, priority, created_at)
+                ).fetchone()[0]
+            if error:
+                status["error"] = error
+            if receipt:
+                status["receipt"] = receipt
+            if stage_metrics:
+                status["metrics"] = json.loads(stage_metrics)
+        return status
+
+    def deliver(self, job_id: str) -> Optional[Any]:
+        """
+        Hand out the result of a finished job exactly once
+
+        Returns:
+            The result to the first caller, None to everyone after that or
+            while the job is not done
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT result FROM jobs WHERE id = ? AND state = 'done' AND delivered_at IS NULL", (job_id,)
+                ).fetchone()
+                if row is not None:
+                    self._conn.execute("UPDATE jobs SET delivered_at = ? WHERE id = ?", (time.time(), job_id))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return json.loads(row[0]) if row is not None else None
+
+    def release(self, job_id: str):
+        """
+        Undo deliver() after the result could not be stored, so it is handed out again
+        """
+        with self._lock:
+            self._conn.execute("UPDATE jobs SET delivered_at = NULL WHERE id = ? AND receipt IS NULL", (job_id,))
+
+    def acknowledge(self, job_id: str, receipt: str):
+        """
+        Record where a delivered result was stored, e.g. the meeting id
+        """
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET receipt = ? WHERE id = ? AND delivered_at IS NOT NULL", (receipt, job_id)
+            )
+
+    def undelivered(self, ops: List[str], unreceipted_after: float = UNRECEIPTED_DELIVERY_SECONDS) -> List[Dict[str, str]]:
+        """
+        Find finished jobs of the given ops whose result has not been stored
+
+        Deliveries that got no receipt within unreceipted_after seconds are
+        released first, since whoever took them is not going to store them.
+        """
+        if not ops:
+            return []
+        marks = ', '.join('?' * len(ops))
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    f"UPDATE jobs SET delivered_at = NULL WHERE state = 'done' AND op IN ({marks}) "
+                    "AND receipt IS NULL AND delivered_at < ?",
+                    (*ops, time.time() - unreceipted_after)
+                )
+                rows = self._conn.execute(
+                    f"SELECT id, op FROM jobs WHERE state = 'done' AND op IN ({marks}) AND delivered_at IS NULL "
+                    "ORDER BY finished_at",
+                    tuple(ops)
+                ).fetchall()
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return [{"id": job_id, "op": op} for job_id, op in rows]
+
+    def reserve_runner(self, lease_seconds: float = RUNNER_LEASE_SECONDS) -> Optional[str]:
+        """
+        Register a runner about to be started, unless one is already up
+
+        Checking and registering in one transaction keeps concurrent callers
+        from starting a runner each. The reservation counts as a heartbeat,
+        so it lapses like any other if the runner never comes up.
+
+        Returns:
+            The id the new runner should use, or None if a runner is alive
+        """
+        runner_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                alive = self._conn.execute(
+                    "SELECT 1 FROM runners WHERE heartbeat_at >= ? LIMIT 1", (now - lease_seconds,)
+                ).fetchone()
+                if alive is None:
+                    self._conn.execute("INSERT INTO runners (id, heartbeat_at) VALUES (?, ?)", (runner_id, now))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return None if alive else runner_id
+
+    def heartbeat(self, runner_id: str):
+        """
+        Renew the lease of a runner on its running jobs, registering it if needed
+        """
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO runners (id, pid, heartbeat_at) VALUES (?, ?, ?) "
+                "ON CONFLICT (id) DO UPDATE SET pid = excluded.pid, heartbeat_at = excluded.heartbeat_at",
+                (runner_id, os.getpid(), time.time())
+            )
+
+    def unregister_runner(self, runner_id: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM runners WHERE id = ?", (runner_id,))
+
+    def requeue_orphans(self, lease_seconds: float = RUNNER_LEASE_SECONDS) -> int:
+        """
+        Put running jobs whose runner's lease has lapsed back in the queue
+
+        A runner that stopped sending heartbeats is presumed dead whichever
+        host or process namespace it ran in, and its registration is removed.
+
+        Returns:
+            The number of jobs requeued
+        """
+        cutoff = time.time() - lease_seconds
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute("DELETE FROM runners WHERE heartbeat_at < ?", (cutoff,))
+                requeued = self._conn.execute(
+                    "UPDATE jobs SET state = 'queued', runner_id = NULL, started_at = NULL "
+                    "WHERE state = 'running' AND (runner_id IS NULL OR runner_id NOT IN (SELECT id FROM runners))"
+                ).rowcount
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return requeued
+
+    def purge(self, older_than_hours: float = JOB_RETENTION_HOURS) -> int:
+        """
+        Delete delivered and failed jobs that finished more than older_than_hours ago
+
+        Returns:
+            The number of jobs deleted
+        """
+        cutoff = time.time() - older_than_hours * 3600
+        with self._lock:
+            deleted = self._conn.execute(
+                "DELETE FROM jobs WHERE (state = 'done' AND delivered_at < ?) OR (state = 'failed' AND finished_at < ?)",
+                (cutoff, cutoff)
+            ).rowcount
+        return deleted
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state").fetchall()
+        return {state: dict(rows).get(state, 0) for state in JOB_STATES}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+async def announce_completion(url: str, job_id: str) -> bool:
+    """
+    Tell the app a job is done so it stores the result without waiting for a poll
+
+    Returns:
+        Whether the app accepted it; jobs it did not accept are announced again later
+    """
+    from common import http
+
+    try:
+        response = await http.request("POST", url.format(id=job_id), attempts=1, timeout=COMPLETION_TIMEOUT_SECONDS)
+    except Exception as e:
+        logger.warning(f"Could not announce job {job_id}: {type(e).__name__}: {str(e)}")
+        return False
+    if response.status_code >= 400:
+        logger.warning(f"App refused completion of job {job_id}: {response.status_code} {response.text[:200]}")
+        return False
+    return True
+
+
+async def run_jobs(queue: JobQueue, workers: int = DEFAULT_JOB_WORKERS, registry: Optional[ServiceRegistry] = None,
+                   stop: Optional[asyncio.Event] = None, completion_urls: Optional[Dict[str, str]] = None,
+                   runner_id: Optional[str] = None, idle_exit: Optional[float] = None):
+    """
+    Run queued jobs with a fixed number of concurrent workers until stopped
+
+    The runner holds a lease on its running jobs by sending heartbeats, and
+    requeues the jobs of runners whose lease has lapsed.
+
+    Args:
+        queue: Queue to take jobs from
+        workers: Jobs run at the same time
+        registry: Services to run jobs against
+        stop: Set to finish the running jobs and return
+        completion_urls: Per op, where finished jobs are posted for the app to store; defaults to COMPLETION_URLS
+        runner_id: Id reserved with reserve_runner(), a new one by default
+        idle_exit: Return after this many seconds without a job to run
+    """
+    registry = registry or ServiceRegistry()
+    stop = stop or asyncio.Event()
+    completion_urls = COMPLETION_URLS if completion_urls is None else completion_urls
+    runner_id = runner_id or uuid.uuid4().hex
+    running = 0
+    last_busy = time.monotonic()
+
+    async def announce(job: Dict[str, Any]):
+        url = completion_urls.get(job['op'])
+        if url and await announce_completion(url, job['id']):
+            logger.info(f"Job {job['id']} stored by the app")
+
+    async def heartbeat():
+        while not stop.is_set():
+            try:
+                await asyncio.to_thread(queue.heartbeat, runner_id)
+                requeued = await asyncio.to_thread(queue.requeue_orphans)
+                if requeued:
+                    logger.info(f"Requeued {requeued} jobs left running by a stopped runner")
+                if (idle_exit is not None and running == 0 and time.monotonic() - last_busy >= idle_exit
+                        and (await asyncio.to_thread(queue.counts))['queued'] == 0):
+                    logger.info(f"No jobs for {idle_exit:g}s, stopping")
+                    stop.set()
+            except Exception as e:
+                logger.error(f"Error renewing the runner lease: {str(e)}")
+            try:
+                await asyncio.wait_for(stop.wait(), HEARTBEAT_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+
+    async def housekeeping():
+        last_purge = None
+        while not stop.is_set():
+            try:
+                # Completions the app missed, e.g. because it was restarting
+                for job in await asyncio.to_thread(queue.undelivered, list(completion_urls)):
+                    await announce(job)
+                if last_purge is None or time.monotonic() - last_purge >= PURGE_INTERVAL:
+                    last_purge = time.monotonic()
+                    purged = await asyncio.to_thread(queue.purge)
+                    if purged:
+                        logger.info(f"Purged {purged} jobs older than {JOB_RETENTION_HOURS:g}h")
+            except Exception as e:
+                logger.error(f"Error in job queue housekeeping: {str(e)}")
+            try:
+                await asyncio.wait_for(stop.wait(), COMPLETION_RETRY_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+
+    async def work(worker_id: int):
+        nonlocal running, last_busy
+        while not stop.is_set():
+            job = await asyncio.to_thread(queue.claim, runner_id)
+            if job is None:
+                try:
+                    await asyncio.wait_for(stop.wait(), POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            running += 1
+            started = time.monotonic()
+            logger.info(f"Worker {worker_id} running {job['op']} job {job['id']}")
+            # Stage timings are kept with the job for the polling route to report
+            with metrics.collect() as records:
+                try:
+                    result = await registry.handle(job['op'], job['payload'])
+                    await asyncio.to_thread(queue.complete, job['id'], result, records)
+                    logger.info(f"Job {job['id']} done in {time.monotonic() - started:.1f}s")
+                except Exception as e:
+                    logger.error(f"Job {job['id']} failed: {str(e)}", exc_info=True)
+                    await asyncio.to_thread(queue.fail, job['id'], str(e), records)
+                    continue
+                finally:
+                    running -= 1
+                    last_busy = time.monotonic()
+            await announce(job)
+
+    # Registered before the first claim, so other runners never see its jobs without a lease
+    queue.heartbeat(runner_id)
+    logger.info(f"Runner {runner_id} running jobs with {workers} workers, queue: {queue.counts()}")
+    try:
+        await asyncio.gather(heartbeat(), housekeeping(), *(work(i) for i in range(max(1, workers))))
+    finally:
+        queue.unregister_runner(runner_id)
@@ -0,0 +1,31 @@
+import json
+import os
+from typing import Any, Dict
+
+from common.paths import DATA_DIR
+
+# Unix socket the resident worker pool listens on
+DEFAULT_SOCKET_PATH = os.environ.get(
+    'WORKER_SOCKET_PATH',
+    os.path.join(DATA_DIR, 'worker.sock')
+)
+
+# Transcripts travel inline, so allow generously sized messages
+MAX_MESSAGE_BYTES = 256 * 1024 * 1024
+
+
+def encode_message(message: Dict[str, Any]) -> bytes:
+    """
+    Encode a job message as a single line of JSON
+    """
+    return json.dumps(message, separators=(',', ':')).encode('utf-8') + b'\n'
+
+
+def decode_message(line: bytes) -> Dict[str, Any]:
+    """
+    Decode a single line of JSON into a job message
+    """
+    message = json.loads(line.decode('utf-8'))
+    if not isinstance(message, dict):
+        raise ValueError("Worker message must be a JSON object")
+    return message
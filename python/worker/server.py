@@ -0,0 +1,154 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import time
+
+from common import metrics
+
+from .handlers import ServiceRegistry
+from .protocol import MAX_MESSAGE_BYTES, decode_message, encode_message
+
+logger = logging.getLogger(__name__)
+
+
+def _bind_socket(socket_path: str) -> socket.socket:
+    """
+    Bind the listening Unix socket, replacing a stale one left by a crash
+    """
+    os.makedirs(os.path.dirname(socket_path), exist_ok=True)
+    if os.path.exists(socket_path):
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(socket_path)
+            raise RuntimeError(f"A worker is already listening on {socket_path}")
+        except (ConnectionRefusedError, FileNotFoundError):
+            os.unlink(socket_path)
+        finally:
+            probe.close()
+
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.bind(socket_path)
+    os.chmod(socket_path, 0o600)
+    sock.listen(128)
+    return sock
+
+
+async def _serve_connection(registry: ServiceRegistry, limiter: asyncio.Semaphore,
+                            reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    """
+    Answer every job sent over one client connection
+    """
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+
+            request_id = None
+            # Stage timings travel back with the reply so the caller can report them
+            with metrics.collect() as records:
+                try:
+                    message = decode_message(line)
+                    request_id = message.get('id')
+                    async with limiter:
+                        if message.get('stream'):
+                            # Relay each event as it is produced; the final line carries no result
+                            async for event in registry.stream(message.get('op'), message.get('payload') or {}):
+                                writer.write(encode_message({"id": request_id, "event": event}))
+                                await writer.drain()
+                            result = None
+                        else:
+                            result = await registry.handle(message.get('op'), message.get('payload') or {})
+                    response = {"id": request_id, "ok": True, "result": result}
+                except Exception as e:
+                    logger.error(f"Job {request_id} failed: {str(e)}", exc_info=True)
+                    response = {"id": request_id, "ok": False, "error": str(e)}
+            response["metrics"] = records
+
+            writer.write(encode_message(response))
+            await writer.drain()
+    except (ConnectionResetError, BrokenPipeError):
+        logger.warning("Client disconnected before the job finished")
+    finally:
+        writer.close()
+
+
+async def _serve(sock: socket.socket, registry: ServiceRegistry, max_concurrency: int):
+    limiter = asyncio.Semaphore(max_concurrency)
+    server = await asyncio.start_unix_server(
+        lambda reader, writer: _serve_connection(registry, limiter, reader, writer),
+        sock=sock,
+        limit=MAX_MESSAGE_BYTES
+    )
+    async with server:
+        await server.serve_forever()
+
+
+def _worker_main(sock: socket.socket, max_concurrency: int, warm: bool):
+    """
+    Entry point of a single pooled worker process
+    """
+    # The supervisor owns shutdown; Ctrl-C on the terminal must not race it
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+    registry = ServiceRegistry()
+    if warm:
+        registry.warm()
+    logger.info(f"Worker {os.getpid()} ready")
+    asyncio.run(_serve(sock, registry, max_concurrency))
+
+
+def serve(socket_path: str, pool_size: int = 1, max_concurrency: int = 4, warm: bool = True):
+    """
+    Run a pool of pre-warmed worker processes sharing one listening socket
+
+    Args:
+        socket_path: Unix socket to listen on
+        pool_size: Number of worker processes
+        max_concurrency: Jobs handled at once by each worker process
+        warm: Construct services and load models before accepting jobs
+    """
+    if pool_size < 1:
+        raise ValueError("pool_size must be at least 1")
+
+    sock = _bind_socket(socket_path)
+    logger.info(f"Listening on {socket_path} with {pool_size} worker(s)")
+
+    context = multiprocessing.get_context('fork')
+    workers = []
+    stopping = False
+
+    def _stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, _stop)
+    signal.signal(signal.SIGINT, _stop)
+
+    try:
+        while not stopping:
+            # Replace workers that exited so the pool stays at full size
+            workers = [worker for worker in workers if worker.is_alive()]
+            while len(workers) < pool_size:
+                worker = context.Process(
+                    target=_worker_main,
+                    args=(sock, max_concurrency, warm),
+                    daemon=True
+                )
+                worker.start()
+                logger.info(f"Started worker {worker.pid}")
+                workers.append(worker)
+            time.sleep(0.5)
+    finally:
+        logger.info("Shutting down worker pool")
+        for worker in workers:
+            worker.terminate()
+        for worker in workers:
+            worker.join(timeout=10)
+        sock.close()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)